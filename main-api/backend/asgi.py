@@ -12,5 +12,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Execute GraphQL queries on the event loop (projects.views.AsyncOrganizationGraphQLView)
+os.environ.setdefault('GRAPHQL_ASYNC', 'True')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from projects.schema import schema  # noqa: E402
+from projects.websockets import GraphQLWebSocketApplication  # noqa: E402
+
+# GraphQL over WebSockets (subscriptions) at /graphql/, see projects.websockets
+websocket_application = GraphQLWebSocketApplication(schema)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
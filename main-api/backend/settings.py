@@ -92,8 +92,12 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
     'x-api-key',  # Add this for our custom API key header
+    'if-none-match',
 ]
 
+# Lets the frontend read ETags of POST responses and revalidate with If-None-Match
+CORS_EXPOSE_HEADERS = ['etag']
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -135,17 +139,132 @@ else:
 
 GRAPHENE = {
     'SCHEMA': 'projects.schema.schema',
-    'MIDDLEWARE': [
-        'graphene_django.debug.DjangoDebugMiddleware',
-    ],
+    # DjangoDebugMiddleware is added per request, see GRAPHQL_DEBUG
+    'MIDDLEWARE': [],
     'SCHEMA_OUTPUT': 'graphql',
     'SCHEMA_INDENT': 2,
 }
 
+# API key -> Organization cache used by OrganizationAuthMiddleware.
+# Set BACKEND to an alias from CACHES to share entries between workers.
+ORGANIZATION_CACHE = {
+    'MAX_SIZE': int(os.environ.get('ORGANIZATION_CACHE_MAX_SIZE', 1024)),
+    'TTL': int(os.environ.get('ORGANIZATION_CACHE_TTL', 300)),
+    'BACKEND': os.environ.get('ORGANIZATION_CACHE_BACKEND') or None,
+    'LOCAL_TTL': 5,
+}
+
+# Parsed and validated GraphQL documents kept by projects.documents.DocumentCache
+GRAPHQL_DOCUMENT_CACHE = {
+    'MAX_SIZE': int(os.environ.get('GRAPHQL_DOCUMENT_CACHE_SIZE', 256)),
+}
+
+# Automatic persisted queries (Apollo APQ) for /graphql/. With ALLOW_LIST_ONLY only
+# the documents in ALLOW_LIST_FILE can run; they are parsed and validated at startup.
+GRAPHQL_PERSISTED_QUERIES = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': int(os.environ.get('GRAPHQL_PERSISTED_QUERY_TTL', 24 * 3600)),
+    'MAX_QUERY_LENGTH': 20000,
+    'ALLOW_LIST_ONLY': os.environ.get('GRAPHQL_ALLOW_LIST_ONLY', '') == 'True',
+    'ALLOW_LIST_FILE': os.environ.get('GRAPHQL_ALLOW_LIST_FILE') or None,
+}
+
+# bcrypt for Organization passwords runs on a bounded thread pool (projects.passwords),
+# capping the CPU logins can take; the request thread still waits for the result.
+# Changing ROUNDS upgrades existing hashes the next time each organization logs in.
+PASSWORD_HASHING = {
+    'ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 12)),
+    'MAX_WORKERS': int(os.environ.get('BCRYPT_MAX_WORKERS', 2)),
+    'MAX_QUEUED': 8,
+    'QUEUE_TIMEOUT': 2.0,
+}
+
+# Opt-in cache of read query responses per organization (projects.response_cache).
+# Writes bump the organization's data version instead of deleting entries. ETAGS adds
+# ETag/If-None-Match (304) support derived from the same data version. With several
+# worker processes, CACHE must be an alias shared between them.
+GRAPHQL_RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('GRAPHQL_RESPONSE_CACHE', '') == 'True',
+    'CACHE': 'default',
+    'TIMEOUT': int(os.environ.get('GRAPHQL_RESPONSE_CACHE_TIMEOUT', 300)),
+    'ETAGS': os.environ.get('GRAPHQL_ETAGS', '') == 'True',
+}
+
+# Serve /graphql/ with projects.views.AsyncOrganizationGraphQLView. backend/asgi.py
+# turns this on, so only the ASGI handler executes queries on the event loop.
+GRAPHQL_ASYNC = os.environ.get('GRAPHQL_ASYNC', '') == 'True'
+
+# GraphQL subscriptions over WebSockets (ASGI only, see projects.websockets). The
+# in-memory backend only reaches subscribers of the same process; with several
+# workers use projects.broadcast.PostgresBackend (LISTEN/NOTIFY).
+GRAPHQL_SUBSCRIPTIONS = {
+    'BACKEND': os.environ.get('GRAPHQL_SUBSCRIPTIONS_BACKEND', 'projects.broadcast.InMemoryBackend'),
+    'QUEUE_SIZE': 100,
+    'OPTIONS': {},
+}
+
+# The `_debug` query field (SQL and exceptions recorded by graphene-django's
+# DjangoDebugMiddleware) is only filled for requests sending TOKEN in the
+# X-GraphQL-Debug header, or for every request with ALWAYS; the others pay nothing.
+GRAPHQL_DEBUG = {
+    'ALWAYS': os.environ.get('GRAPHQL_DEBUG', '') == 'True',
+    'HEADER': 'X-GraphQL-Debug',
+    'TOKEN': os.environ.get('GRAPHQL_DEBUG_TOKEN') or None,
+}
+
+# Per-operation and per-field latency and SQL metrics, scraped by Prometheus from
+# /metrics (projects.metrics). ORGANIZATION_TIERS maps organization ids to the
+# tier label; set GRAPHQL_METRICS_TOKEN to require "Authorization: Bearer <token>".
+# Off unless GRAPHQL_METRICS=True: without a token anyone reaching /metrics can read it.
+GRAPHQL_METRICS = {
+    'ENABLED': os.environ.get('GRAPHQL_METRICS', '') == 'True',
+    'ORGANIZATION_TIERS': {},
+    'TOKEN': os.environ.get('GRAPHQL_METRICS_TOKEN') or None,
+}
+
+# Profile single requests with cProfile: requests carrying an X-Profile header made by
+# `manage.py profile_token`, plus a SAMPLE_RATE fraction of all operations. Profiles
+# are written to DIRECTORY as <operation>-<timestamp>.prof.
+GRAPHQL_PROFILING = {
+    'DIRECTORY': os.environ.get('GRAPHQL_PROFILE_DIR', str(BASE_DIR / 'profiles')),
+    'SAMPLE_RATE': float(os.environ.get('GRAPHQL_PROFILE_SAMPLE_RATE', 0)),
+}
+
+# Record SQL statements slower than THRESHOLD_MS, with the GraphQL operation, resolver
+# path and organization, in a ring buffer read by `manage.py slow_queries`
+# (projects.slow_queries). EXPLAIN adds each statement's plan, captured in the background.
+# CACHE must be a cache alias shared between processes (Redis, Memcached, database),
+# preferably one of its own.
+GRAPHQL_SLOW_QUERIES = {
+    'ENABLED': os.environ.get('GRAPHQL_SLOW_QUERIES', '') == 'True',
+    'THRESHOLD_MS': float(os.environ.get('GRAPHQL_SLOW_QUERY_MS', 100)),
+    'EXPLAIN': os.environ.get('GRAPHQL_SLOW_QUERY_EXPLAIN', '') == 'True',
+    'EXPLAIN_ANALYZE': os.environ.get('GRAPHQL_SLOW_QUERY_EXPLAIN_ANALYZE', '') == 'True',
+    'CACHE': os.environ.get('GRAPHQL_SLOW_QUERY_CACHE', 'default'),
+}
+
 # Logging configuration
+# Request threads only put records on a bounded queue; a background thread
+# formats and writes them (projects.log_queue). When the writer falls behind,
+# records are dropped and counted rather than blocking requests. Per-request
+# INFO lines of the auth middleware are sampled at LOG_SAMPLE_RATE.
+# Starts the queue handler with the handlers it writes to, see configure_logging
+LOGGING_CONFIG = 'projects.log_queue.configure_logging'
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'projects.log_queue.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sample_requests': {
+            '()': 'projects.log_queue.SamplingFilter',
+            'rate': float(os.environ.get('LOG_SAMPLE_RATE', 1.0 if DEBUG else 0.1)),
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
@@ -153,15 +272,22 @@ LOGGING = {
         'file': {
             'class': 'logging.FileHandler',
             'filename': 'debug.log',
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'projects.log_queue.BoundedQueueHandler',
+            'handlers': ['console', 'file'],
+            'maxsize': int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
     'loggers': {
         'projects.middleware': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
+            'filters': ['sample_requests'],
             'level': 'DEBUG',
             'propagate': False,
         },
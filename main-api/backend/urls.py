@@ -14,13 +14,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns: path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
 from projects.schema import schema
+from projects.views import AsyncOrganizationGraphQLView, OrganizationGraphQLView, metrics_view
+
+graphql_view = AsyncOrganizationGraphQLView if settings.GRAPHQL_ASYNC else OrganizationGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(schema=schema, graphiql=True))),
+    path('graphql/', csrf_exempt(graphql_view.as_view(schema=schema, graphiql=True))),
+    # Prometheus scrape endpoint, see GRAPHQL_METRICS
+    path('metrics', metrics_view),
 ]
\ No newline at end of file
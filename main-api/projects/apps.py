@@ -1,6 +1,27 @@
+import logging
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .persisted import get_persisted_query_store
+        from .slow_queries import get_slow_query_log
+
+        # Pre-warm the document cache with the allow-listed documents
+        persisted_queries = get_persisted_query_store()
+        if persisted_queries is not None:
+            persisted_queries.warm()
+
+        slow_query_log = get_slow_query_log()
+        if slow_query_log is not None and slow_query_log.is_process_local:
+            logger.warning(
+                "The slow query log uses the local-memory cache '%s': `manage.py slow_queries` "
+                "cannot read it and it evicts other cache entries; set GRAPHQL_SLOW_QUERIES['CACHE'] "
+                "to a shared cache", slow_query_log.cache_alias
+            )
@@ -0,0 +1,471 @@
+import http.client
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from .metrics import SqlRecorder
+from .models import Organization, Project, Task, TaskComment
+
+# Bump when the layout of the results changes, so old files are not compared blindly
+RESULTS_VERSION = 1
+
+# The documents the frontend sends (frontend/src/graphql)
+GET_PROJECTS = '''
+query GetProjects {
+    allProjects {
+        id name description status dueDate taskCount completedTasks
+        organization { id name slug contactEmail }
+    }
+}
+'''
+
+GET_TASKS = '''
+query GetTasks($projectId: String!) {
+    allTasks(projectId: $projectId) {
+        id title description status assigneeEmail dueDate
+        project { id name }
+        taskcommentSet { id content authorEmail timestamp }
+    }
+}
+'''
+
+CREATE_TASK = '''
+mutation CreateTask($projectId: String!, $title: String!, $description: String, $status: String) {
+    createTask(projectId: $projectId, title: $title, description: $description, status: $status) {
+        task { id title description status assigneeEmail dueDate }
+    }
+}
+'''
+
+UPDATE_TASK_STATUS = '''
+mutation UpdateTaskStatus($taskId: String!, $status: String!) {
+    updateTaskStatus(taskId: $taskId, status: $status) {
+        task { id title description status assigneeEmail dueDate }
+    }
+}
+'''
+
+LOGIN_ORGANIZATION = '''
+mutation LoginOrganization($email: String!, $password: String!) {
+    loginOrganization(email: $email, password: $password) {
+        success message apiKey
+        organization { id name slug contactEmail }
+    }
+}
+'''
+
+OPERATIONS = {
+    'GetProjects': GET_PROJECTS,
+    'GetTasks': GET_TASKS,
+    'CreateTask': CREATE_TASK,
+    'UpdateTaskStatus': UPDATE_TASK_STATUS,
+    'LoginOrganization': LOGIN_ORGANIZATION,
+}
+
+# Share of each operation in the requests: mostly browsing, some edits, few logins
+DEFAULT_MIX = {
+    'GetProjects': 40,
+    'GetTasks': 40,
+    'CreateTask': 10,
+    'UpdateTaskStatus': 8,
+    'LoginOrganization': 2,
+}
+
+TASK_STATUSES = ('TODO', 'IN_PROGRESS', 'DONE')
+
+
+def parse_mix(value):
+    """Parse "GetProjects=40,GetTasks=40,..." into {operation: weight}."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class BenchmarkData:
+    """An organization of its own with projects, tasks and comments, seeded through the ORM."""
+
+    PASSWORD = 'benchmark-password'
+
+    def __init__(self, projects=20, tasks=25, comments=1):
+        self.projects = projects
+        self.tasks = tasks
+        self.comments = comments
+        self.organization = None
+        self.project_ids = []
+        self.task_ids = []
+
+    def seed(self):
+        self.organization = Organization.objects.create(
+            name='Benchmark', contact_email=f'benchmark-{uuid.uuid4().hex[:12]}@example.com',
+            password=self.PASSWORD,
+        )
+        projects = Project.objects.bulk_create(
+            Project(organization=self.organization, name=f'Project {n}', description='Benchmark project')
+            for n in range(self.projects)
+        )
+        tasks = Task.objects.bulk_create(
+            Task(project=project, title=f'Task {n}', description='Benchmark task',
+                 status=TASK_STATUSES[n % len(TASK_STATUSES)], assignee_email='assignee@example.com')
+            for project in projects for n in range(self.tasks)
+        )
+        Project.adjust_task_counters_many(added=[(task.project_id, task.status) for task in tasks])
+        TaskComment.objects.bulk_create(
+            TaskComment(task=task, content=f'Comment {n}', author_email='author@example.com')
+            for task in tasks for n in range(self.comments)
+        )
+        self.project_ids = [project.pk for project in projects]
+        self.task_ids = [task.pk for task in tasks]
+
+    def delete(self):
+        if self.organization is not None:
+            self.organization.delete()
+            self.organization = None
+
+
+def build_plan(mix, requests, data, seed=0):
+    """
+    The (operation, variables) of each request, in order.
+
+    Every operation gets exactly its share of `requests` and the order is
+    shuffled with `seed`, so runs with the same arguments send the same
+    requests and can be compared.
+    """
+    rng = random.Random(seed)
+    total = sum(mix.values())
+    shares = {name: requests * weight / total for name, weight in mix.items()}
+    counts = {name: int(share) for name, share in shares.items()}
+    # Largest remainders get the requests lost to rounding down
+    for name in sorted(shares, key=lambda name: counts[name] - shares[name])[:requests - sum(counts.values())]:
+        counts[name] += 1
+    names = [name for name, count in counts.items() for _ in range(count)]
+    rng.shuffle(names)
+
+    plan = []
+    for n, name in enumerate(names):
+        if name == 'GetProjects':
+            variables = {}
+        elif name == 'GetTasks':
+            variables = {'projectId': str(rng.choice(data.project_ids))}
+        elif name == 'CreateTask':
+            variables = {'projectId': str(rng.choice(data.project_ids)), 'title': f'Benchmark task {n}',
+                         'description': 'Created by the benchmark', 'status': rng.choice(TASK_STATUSES)}
+        elif name == 'UpdateTaskStatus':
+            variables = {'taskId': str(rng.choice(data.task_ids)), 'status': rng.choice(TASK_STATUSES)}
+        else:
+            variables = {'email': data.organization.contact_email, 'password': data.PASSWORD}
+        plan.append((name, variables))
+    return plan
+
+
+def request_body(operation, variables):
+    return json.dumps({'query': OPERATIONS[operation], 'operationName': operation, 'variables': variables})
+
+
+def error_message(status, payload):
+    """Why a response failed, or None when it succeeded."""
+    if not isinstance(payload, dict):
+        return f'HTTP {status}'
+    if payload.get('errors'):
+        return payload['errors'][0].get('message') or f'HTTP {status}'
+    if status != 200:
+        return f'HTTP {status}'
+    login = (payload.get('data') or {}).get('loginOrganization')
+    if login is not None and not login['success']:
+        return login['message']
+    return None
+
+
+class InProcessTransport:
+    """
+    Sends requests through django.test.Client: every middleware and the view
+    run as they do behind a server, minus HTTP. Counts each request's SQL.
+    """
+
+    target = 'in-process'
+
+    def __init__(self, api_key):
+        self.client = Client(HTTP_X_API_KEY=api_key)
+
+    def execute(self, operation, variables):
+        recorder = SqlRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.post(
+                '/graphql/', request_body(operation, variables), content_type='application/json'
+            )
+        try:
+            payload = json.loads(response.content)
+        except ValueError:
+            payload = None
+        return error_message(response.status_code, payload), recorder.queries
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Sends requests to a running server over one keep-alive connection."""
+
+    def __init__(self, url, api_key):
+        self.target = url
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.path = parts.path or '/'
+        self.headers = {'Content-Type': 'application/json', 'X-API-Key': api_key}
+
+    def execute(self, operation, variables):
+        body = request_body(operation, variables)
+        try:
+            self.connection.request('POST', self.path, body, self.headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Reconnects on the next request
+            self.connection.close()
+            return str(e) or type(e).__name__, None
+        try:
+            payload = json.loads(content)
+        except ValueError:
+            payload = None
+        return error_message(response.status, payload), None
+
+    def close(self):
+        self.connection.close()
+
+
+def run_plan(make_transport, plan, concurrency=1):
+    """
+    Execute `plan` with `concurrency` workers, each with its own transport.
+
+    Returns the (operation, seconds, error, queries) of every request and
+    the elapsed wall time. With one worker the requests run on the calling
+    thread.
+    """
+    if concurrency <= 1:
+        transport = make_transport()
+        try:
+            started = time.perf_counter()
+            samples = [measure(transport, operation, variables) for operation, variables in plan]
+            return samples, time.perf_counter() - started
+        finally:
+            transport.close()
+
+    results = [None] * concurrency
+    barrier = threading.Barrier(concurrency + 1)
+
+    def work(index):
+        transport = make_transport()
+        try:
+            barrier.wait()
+            results[index] = [measure(transport, operation, variables)
+                              for operation, variables in plan[index::concurrency]]
+        finally:
+            transport.close()
+            connections.close_all()
+
+    threads = [threading.Thread(target=work, args=(index,), name=f'benchmark-{index}')
+               for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return [sample for samples in results for sample in samples or []], elapsed
+
+
+def measure(transport, operation, variables):
+    started = time.perf_counter()
+    error, queries = transport.execute(operation, variables)
+    return operation, time.perf_counter() - started, error, queries
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+def latency_summary(seconds):
+    values = sorted(seconds)
+    if not values:
+        return None
+    return {
+        'mean': round(sum(values) * 1000 / len(values), 3),
+        'p50': round(percentile(values, 50) * 1000, 3),
+        'p95': round(percentile(values, 95) * 1000, 3),
+        'p99': round(percentile(values, 99) * 1000, 3),
+        'max': round(values[-1] * 1000, 3),
+    }
+
+
+def summarize(samples, elapsed, sql_queries=None):
+    """
+    Throughput, latency percentiles (ms) and SQL queries per request, overall
+    and per operation. `sql_queries` ({operation: queries per request}) is
+    used when the samples have no query counts of their own.
+    """
+    operations = {}
+    for name in sorted({sample[0] for sample in samples}):
+        own = [sample for sample in samples if sample[0] == name]
+        queries = [sample[3] for sample in own if sample[3] is not None]
+        if queries:
+            queries_per_request = round(sum(queries) / len(queries), 2)
+        else:
+            queries_per_request = (sql_queries or {}).get(name)
+        errors = Counter(sample[2] for sample in own if sample[2] is not None)
+        operations[name] = {
+            'requests': len(own),
+            'errors': sum(errors.values()),
+            # The most frequent ones, with how often they occurred
+            'error_messages': dict(errors.most_common(5)),
+            'throughput': round(len(own) / elapsed, 2) if elapsed else None,
+            'latency_ms': latency_summary([sample[1] for sample in own]),
+            'queries_per_request': queries_per_request,
+        }
+    summary = {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[2] is not None),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': latency_summary([sample[1] for sample in samples]),
+    }
+    return summary, operations
+
+
+_SQL_QUERY_SAMPLE = re.compile(r'^graphql_operation_sql_queries_(sum|count)\{operation="((?:[^"\\]|\\.)*)"[^}]*\} (\S+)$')
+
+
+def scrape_sql_queries(metrics_url, token=None):
+    """
+    {operation: [queries, operations]} from a server's /metrics, or None when
+    it cannot be read. Each server process keeps its own metrics, so this only
+    covers every request when the server runs a single process.
+    """
+    parts = urlsplit(metrics_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    metrics_connection = connection_class(parts.netloc, timeout=10)
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    try:
+        metrics_connection.request('GET', parts.path or '/', headers=headers)
+        response = metrics_connection.getresponse()
+        if response.status != 200:
+            return None
+        text = response.read().decode('utf-8')
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        metrics_connection.close()
+
+    totals = {}
+    for line in text.splitlines():
+        match = _SQL_QUERY_SAMPLE.match(line)
+        if match:
+            kind, operation, value = match.groups()
+            totals.setdefault(operation, [0.0, 0.0])[kind == 'count'] += float(value)
+    return totals
+
+
+def sql_queries_between(before, after):
+    """Queries per operation from two scrape_sql_queries() results."""
+    if before is None or after is None:
+        return None
+    per_operation = {}
+    for operation, (queries, count) in after.items():
+        previous_queries, previous_count = before.get(operation, (0.0, 0.0))
+        if count > previous_count:
+            per_operation[operation] = round((queries - previous_queries) / (count - previous_count), 2)
+    return per_operation
+
+
+def git_revision():
+    """(commit, whether the work tree has uncommitted changes), or (None, None) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def database_version():
+    if connection.vendor == 'postgresql':
+        return str(connection.pg_version)
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version
+    return None
+
+
+def environment(target):
+    commit, dirty = git_revision()
+    return {
+        'git_commit': commit,
+        'git_dirty': dirty,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+        'database_version': database_version(),
+        'debug': settings.DEBUG,
+        'graphql_async': getattr(settings, 'GRAPHQL_ASYNC', False),
+        'target': target,
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Rows of (name, metric, baseline value, current value, change in percent)
+    for throughput and latency percentiles, overall and per operation.
+    """
+    if baseline.get('version') != current.get('version'):
+        raise ValueError(f"Cannot compare results of version {baseline.get('version')} "
+                         f"with version {current.get('version')}")
+
+    def rows(name, before, after):
+        pairs = [('throughput', before.get('throughput'), after.get('throughput'))]
+        for key in ('p50', 'p95', 'p99'):
+            pairs.append((f'{key} ms', (before.get('latency_ms') or {}).get(key),
+                          (after.get('latency_ms') or {}).get(key)))
+        if 'queries_per_request' in after:
+            pairs.append(('queries', before.get('queries_per_request'), after.get('queries_per_request')))
+        for metric, old, new in pairs:
+            change = round((new - old) * 100 / old, 1) if old and new is not None else None
+            yield name, metric, old, new, change
+
+    comparison = list(rows('all', baseline['summary'], current['summary']))
+    for name, operation in current['operations'].items():
+        if name in baseline['operations']:
+            comparison.extend(rows(name, baseline['operations'][name], operation))
+    return comparison
+
+
+def results_document(config, target, summary, operations):
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': environment(target),
+        'config': config,
+        'summary': summary,
+        'operations': operations,
+    }
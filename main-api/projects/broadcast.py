@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    # Dotted path of the backend class
+    'BACKEND': 'projects.broadcast.InMemoryBackend',
+    # Events buffered per subscriber; a subscriber that falls further behind misses events
+    'QUEUE_SIZE': 100,
+    # Extra keyword arguments for the backend
+    'OPTIONS': {},
+}
+
+
+def task_channel(organization_id, project_id):
+    return f'org.{organization_id}.project.{project_id}.tasks'
+
+
+def project_channel(organization_id):
+    return f'org.{organization_id}.projects'
+
+
+def row_snapshot(instance):
+    """The column values of a model instance, JSON-serializable with DjangoJSONEncoder."""
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def from_snapshot(model, snapshot):
+    """Rebuild an unsaved instance from row_snapshot(); values may have been through JSON."""
+    return model(**{
+        field.attname: field.to_python(snapshot[field.attname])
+        for field in model._meta.concrete_fields if field.attname in snapshot
+    })
+
+
+def publish_on_commit(channel, message):
+    """Publish `message` once the current transaction commits, or now outside of one."""
+    broadcaster = get_broadcaster()
+    transaction.on_commit(lambda: broadcaster.publish(channel, message))
+
+
+class InMemoryBackend:
+    """
+    Fans events out to the subscribers of the current process.
+
+    publish() may be called from any thread (mutations run in worker threads);
+    each subscriber gets the event on its own event loop. A backend for several
+    workers overrides publish() to send events through a shared channel and
+    calls deliver() when one arrives, see PostgresBackend.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, channel, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                pass
+
+    async def subscribe(self, channel):
+        """Async iterator over the messages published to `channel` from now on."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        self._add(channel, subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            self._remove(channel, subscriber)
+
+    def _add(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+
+    def _remove(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    @staticmethod
+    def _put(channel, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Dropping event for slow subscriber on %s", channel)
+
+    def close(self):
+        pass
+
+
+class PostgresBackend(InMemoryBackend):
+    """
+    Broadcasts through PostgreSQL LISTEN/NOTIFY so every worker connected to the
+    same database receives every event.
+
+    Events published inside a transaction are only delivered once it commits.
+    NOTIFY payloads are limited to 8000 bytes; larger messages are sent without
+    their row snapshot and subscribers load the row instead.
+    """
+
+    PG_CHANNEL = 'graphql_events'
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, queue_size=100, using='default', poll_interval=5.0):
+        super().__init__(queue_size)
+        self.using = using
+        self.poll_interval = poll_interval
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def publish(self, channel, message):
+        payload = self._encode(channel, message)
+        if len(payload.encode('utf-8')) > self.MAX_PAYLOAD:
+            payload = self._encode(channel, {**message, 'snapshot': None})
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.PG_CHANNEL, payload])
+
+    async def subscribe(self, channel):
+        self._start_listener()
+        async for message in super().subscribe(channel):
+            yield message
+
+    def close(self):
+        self._closed.set()
+
+    def _encode(self, channel, message):
+        return json.dumps({'channel': channel, 'message': message}, cls=DjangoJSONEncoder)
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='graphql-events-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        wrapper = connections[self.using]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.PG_CHANNEL}')
+            while not self._closed.is_set():
+                if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    try:
+                        event = json.loads(notify.payload)
+                        self.deliver(event['channel'], event['message'])
+                    except (ValueError, KeyError):
+                        logger.warning("Ignoring malformed event: %.100s", notify.payload)
+        except Exception as e:
+            logger.error("Event listener stopped: %s", e)
+        finally:
+            connection.close()
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_SUBSCRIPTIONS', {})}
+                backend = import_string(options['BACKEND'])
+                _broadcaster = backend(queue_size=options['QUEUE_SIZE'], **options['OPTIONS'])
+    return _broadcaster
+
+
+def reset_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is not None:
+            _broadcaster.close()
+        _broadcaster = None
@@ -0,0 +1,45 @@
+import hmac
+from django.conf import settings
+from graphene_django.debug import DjangoDebugMiddleware
+
+DEFAULT_SETTINGS = {
+    # Record SQL and exceptions for every request, e.g. in local development
+    'ALWAYS': False,
+    # Requests whose header matches TOKEN are recorded; no TOKEN disables the header
+    'HEADER': 'X-GraphQL-Debug',
+    'TOKEN': None,
+}
+
+
+def get_debug_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_DEBUG', {})}
+
+
+def debug_requested(request):
+    """
+    Whether `request` asked for the `_debug` field to be recorded.
+
+    DjangoDebugMiddleware wraps every resolver and the database cursor, so it
+    is only installed for these requests. The header needs a shared secret
+    because the recorded SQL is returned to the client.
+    """
+    options = get_debug_settings()
+    if options['ALWAYS']:
+        return True
+    token = options['TOKEN']
+    value = request.headers.get(options['HEADER']) if token else None
+    return bool(value) and hmac.compare_digest(value.encode('utf-8'), token.encode('utf-8'))
+
+
+def get_debug_middleware(request):
+    """Return the middleware to add for `request`: DjangoDebugMiddleware when requested, else none."""
+    return [DjangoDebugMiddleware()] if debug_requested(request) else []
+
+
+def stop_debug(request):
+    # DjangoDebugContext only unwraps the cursor when `_debug` is resolved;
+    # otherwise later queries on this thread would keep being recorded into it
+    django_debug = getattr(request, 'django_debug', None)
+    if django_debug is not None:
+        django_debug.disable_instrumentation()
+        del request.django_debug
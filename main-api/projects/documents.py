@@ -0,0 +1,126 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from graphql import FieldNode, GraphQLError, get_operation_ast, parse, validate
+from .schema import schema
+
+DEFAULT_SETTINGS = {
+    # Number of distinct parsed and validated documents kept in memory
+    'MAX_SIZE': 256,
+}
+
+ParsedDocument = namedtuple('ParsedDocument', ['document', 'validation_errors'])
+
+
+def hash_query(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Bounded LRU cache of parsed and validated GraphQL documents keyed by the
+    sha256 of the query text.
+
+    The frontend sends a small fixed set of documents, so after warm-up nearly
+    every request skips lexing, parsing and validation entirely. Documents that
+    fail to parse are not cached; validation errors are, since they only depend
+    on the query text and the schema.
+    """
+
+    def __init__(self, schema, max_size=256):
+        self.schema = schema
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_DOCUMENT_CACHE', {})}
+        return cls(schema, max_size=options['MAX_SIZE'])
+
+    def get(self, query, query_hash=None):
+        """Return the ParsedDocument for `query`; raises GraphQLError on syntax errors."""
+        key = query_hash or hash_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        document = parse(query)
+        entry = ParsedDocument(document, tuple(validate(self.schema.graphql_schema, document)))
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_document_cache = None
+_document_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    global _document_cache
+    if _document_cache is None:
+        with _document_cache_lock:
+            if _document_cache is None:
+                _document_cache = DocumentCache.from_settings()
+    return _document_cache
+
+
+def reset_document_cache():
+    global _document_cache
+    with _document_cache_lock:
+        _document_cache = None
+
+
+def parse_document(query, query_hash=None):
+    """Return the cached ParsedDocument for `query`, or None if it is not valid syntax."""
+    try:
+        return get_document_cache().get(query, query_hash)
+    except GraphQLError:
+        return None
+
+
+def get_root_fields(document, operation_name=None):
+    """
+    Return (operation_type, root_field_names) of the operation that will run.
+
+    Returns (None, None) when the operation cannot be determined, or when its root
+    selection set contains anything other than plain fields (fragments), so that
+    callers never grant an exemption they cannot fully check.
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return None, None
+    names = set()
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None, None
+        names.add(selection.name.value)
+    return operation.operation, names
@@ -0,0 +1,280 @@
+import asyncio
+import inspect
+from collections import defaultdict
+from django.db.models import QuerySet
+from graphql import FieldNode
+from .models import Organization, Project, Task, TaskComment
+
+
+class BatchLoader:
+    """
+    Per-request loader that turns many single-key lookups into one IN (...) query.
+
+    graphql-core resolves list items depth-first when executing synchronously, so
+    the sibling keys of a list are never all requested before the first one has to
+    be answered. Resolvers that hand out a list of rows therefore queue() the keys
+    of that list up front; the first load() then fetches every queued key in a
+    single batch and the remaining siblings are served from the cache.
+
+    In async mode load() queues the key immediately and returns an awaitable.
+    Siblings are then resolved concurrently; the batch is dispatched one event
+    loop tick after the first of them is awaited, and every load() whose key is
+    part of a batch already in flight awaits that batch instead of querying.
+    """
+
+    def __init__(self, batch_load_fn, default_factory=None, is_async=False):
+        self.batch_load_fn = batch_load_fn
+        self.default_factory = default_factory
+        self.is_async = is_async
+        self._cache = {}
+        self._pending = {}
+        self._in_flight = {}
+
+    def queue(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache and key not in self._in_flight:
+                self._pending[key] = None
+
+    def prime(self, key, value):
+        self._cache[key] = value
+        self._pending.pop(key, None)
+
+    def load(self, key):
+        if self.is_async:
+            self.queue([key])
+            return self._aload(key)
+        if key is None:
+            return None
+        if key not in self._cache:
+            self.queue([key])
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        if self.is_async:
+            self.queue(keys)
+            return self._aload_many(keys)
+        self.queue(keys)
+        self.dispatch()
+        return [self._cache[key] for key in keys]
+
+    def dispatch(self):
+        if not self._pending:
+            return
+        keys = list(self._pending)
+        self._pending = {}
+        self._store(keys, self.batch_load_fn(keys))
+
+    def clear(self, key=None):
+        if key is None:
+            self._cache.clear()
+            self._pending.clear()
+        else:
+            self._cache.pop(key, None)
+            self._pending.pop(key, None)
+
+    async def _aload(self, key):
+        if key is None:
+            return None
+        if key not in self._cache:
+            await self._adispatch([key])
+        return self._cache[key]
+
+    async def _aload_many(self, keys):
+        await self._adispatch(keys)
+        return [self._cache[key] for key in keys]
+
+    async def _adispatch(self, keys):
+        if self._pending:
+            # Give the other coroutines woken in this tick a chance to queue their keys
+            await asyncio.sleep(0)
+        if self._pending:
+            batch = list(self._pending)
+            self._pending = {}
+            future = asyncio.ensure_future(self._afetch(batch))
+            for key in batch:
+                self._in_flight[key] = future
+        waiting = {self._in_flight[key] for key in keys if key in self._in_flight}
+        if waiting:
+            await asyncio.gather(*waiting)
+
+    async def _afetch(self, keys):
+        try:
+            self._store(keys, await self.batch_load_fn(keys))
+        finally:
+            for key in keys:
+                self._in_flight.pop(key, None)
+
+    def _store(self, keys, results):
+        for key in keys:
+            if key in results:
+                self._cache[key] = results[key]
+            else:
+                self._cache[key] = self.default_factory() if self.default_factory else None
+
+
+class LoaderRegistry:
+    """
+    All loaders used by the schema for one request, attached to info.context.
+
+    add_projects/add_tasks/add_comments must be called with every list of rows
+    the schema returns so the next nesting level can be fetched in one query.
+    Only relations selected somewhere in the operation are queued, so that a
+    lookup of one row elsewhere in the query does not fetch them for the
+    whole list.
+    They also accept an unevaluated QuerySet; in async mode it is then fetched
+    with async iteration and an awaitable is returned, so resolvers can hand
+    the result straight back to graphql-core in either mode.
+    """
+
+    def __init__(self, organization=None, is_async=False, selected=None):
+        # Every batch is scoped to this organization with for_org()
+        self.organization = organization
+        self.is_async = is_async
+        # Field names selected in the operation; None queues every relation
+        self.selected = selected
+        self.organizations = BatchLoader(self._load_organizations, is_async=is_async)
+        self.projects = BatchLoader(self._load_projects, is_async=is_async)
+        self.tasks = BatchLoader(self._load_tasks, is_async=is_async)
+        self.tasks_by_project = BatchLoader(self._load_tasks_by_project, default_factory=list,
+                                            is_async=is_async)
+        self.comments_by_task = BatchLoader(self._load_comments_by_task, default_factory=list,
+                                            is_async=is_async)
+
+    def fetch(self, queryset, callback=list):
+        """Evaluate `queryset` and pass the rows to `callback`; awaitable in async mode."""
+        if self.is_async:
+            return self._afetch(queryset, callback)
+        return callback(list(queryset))
+
+    def count(self, queryset):
+        return queryset.acount() if self.is_async else queryset.count()
+
+    def add_projects(self, projects):
+        if isinstance(projects, QuerySet):
+            return self.fetch(projects, self.add_projects)
+        projects = list(projects)
+        for project in projects:
+            self.projects.prime(project.pk, project)
+        if self.selects('organization'):
+            self.organizations.queue(project.organization_id for project in projects)
+        if self.selects('taskSet'):
+            self.tasks_by_project.queue(project.pk for project in projects)
+        return projects
+
+    def add_tasks(self, tasks):
+        if isinstance(tasks, QuerySet):
+            return self.fetch(tasks, self.add_tasks)
+        tasks = list(tasks)
+        for task in tasks:
+            self.tasks.prime(task.pk, task)
+        if self.selects('project'):
+            self.projects.queue(task.project_id for task in tasks)
+        if self.selects('taskcommentSet'):
+            self.comments_by_task.queue(task.pk for task in tasks)
+        return tasks
+
+    def add_comments(self, comments):
+        if isinstance(comments, QuerySet):
+            return self.fetch(comments, self.add_comments)
+        comments = list(comments)
+        if self.selects('task'):
+            self.tasks.queue(comment.task_id for comment in comments)
+        return comments
+
+    def selects(self, field_name):
+        return self.selected is None or field_name in self.selected
+
+    def clear(self):
+        for loader in (self.organizations, self.projects, self.tasks,
+                       self.tasks_by_project, self.comments_by_task):
+            loader.clear()
+
+    def _load_organizations(self, keys):
+        return self.fetch(Organization.objects.filter(pk__in=keys, pk=getattr(self.organization, 'pk', None)), self._by_pk)
+
+    def _load_projects(self, keys):
+        return self.fetch(
+            Project.objects.for_org(self.organization).filter(pk__in=keys),
+            lambda projects: self._by_pk(self.add_projects(projects))
+        )
+
+    def _load_tasks(self, keys):
+        return self.fetch(
+            Task.objects.for_org(self.organization).filter(pk__in=keys),
+            lambda tasks: self._by_pk(self.add_tasks(tasks))
+        )
+
+    def _load_tasks_by_project(self, keys):
+        return self.fetch(
+            Task.objects.for_org(self.organization).filter(project_id__in=keys).order_by('pk'),
+            lambda tasks: self._group(self.add_tasks(tasks), 'project_id')
+        )
+
+    def _load_comments_by_task(self, keys):
+        return self.fetch(
+            TaskComment.objects.for_org(self.organization).filter(task_id__in=keys).order_by('pk'),
+            lambda comments: self._group(self.add_comments(comments), 'task_id')
+        )
+
+    async def _afetch(self, queryset, callback):
+        return callback([row async for row in queryset])
+
+    @staticmethod
+    def _by_pk(rows):
+        return {row.pk: row for row in rows}
+
+    @staticmethod
+    def _group(rows, attname):
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[getattr(row, attname)].append(row)
+        return grouped
+
+
+def then(value, callback):
+    """
+    Apply `callback` to `value` once it is available.
+
+    `value` may be a plain value (sync execution) or an awaitable (async
+    execution); the result is of the same kind, so a resolver can chain loader
+    calls without caring which mode the request is executing in.
+    """
+    if inspect.isawaitable(value):
+        async def chained():
+            result = callback(await value)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        return chained()
+    return callback(value)
+
+
+def selected_field_names(info):
+    """Names of the fields selected anywhere in the operation, fragments included."""
+    names = set()
+    nodes = [info.operation, *info.fragments.values()]
+    while nodes:
+        selection_set = getattr(nodes.pop(), 'selection_set', None)
+        if selection_set is None:
+            continue
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                names.add(selection.name.value)
+            nodes.append(selection)
+    return names
+
+
+def get_loaders(info):
+    """Return the LoaderRegistry for the current request, creating it on first use."""
+    context = info.context
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        organization = getattr(context, 'organization', None)
+        loaders = LoaderRegistry(
+            organization, is_async=getattr(context, 'graphql_async', False), selected=selected_field_names(info)
+        )
+        if organization is not None:
+            loaders.organizations.prime(organization.pk, organization)
+        context.loaders = loaders
+    return loaders
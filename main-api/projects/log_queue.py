@@ -0,0 +1,158 @@
+import atexit
+import json
+import logging
+import logging.config
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_handler_by_name(name):
+    getter = getattr(logging, 'getHandlerByName', None)  # Python 3.12+
+    if getter is not None:
+        return getter(name)
+    # The registry getHandlerByName() reads
+    return logging._handlers.get(name)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to a background thread that writes them to `handlers`, so
+    request threads never wait for the disk or the console.
+
+    The queue is bounded: when the writer falls behind, new records are dropped
+    and counted instead of blocking the caller, and a warning with the number
+    of dropped records is queued as soon as there is room again.
+
+    Records are queued unformatted; the message is only built by the writer
+    thread. Mutable objects passed as arguments are therefore formatted as
+    they are when the record is written.
+
+    Configured from LOGGING like any handler; `handlers` names handlers
+    defined there. They are looked up by configure_logging() once dictConfig
+    has created every handler, so the order of LOGGING['handlers'] does not
+    matter. A handler created some other way starts on its first record.
+    """
+
+    def __init__(self, handlers=(), maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.handler_names = tuple(handlers)
+        self.listener = None
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def start(self, handlers=None):
+        """
+        Start the writer thread, once. The targets are looked up in `handlers`,
+        a name -> handler mapping, or else among the live named handlers.
+        """
+        lookup = handlers.get if handlers is not None else get_handler_by_name
+        with self._lock:
+            if self.listener is not None:
+                return
+            targets = []
+            for name in self.handler_names:
+                handler = lookup(name)
+                if not isinstance(handler, logging.Handler):
+                    raise ValueError(f"Unknown logging handler: {name}")
+                targets.append(handler)
+            self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+            self.listener.start()
+        atexit.register(self.stop)
+
+    def prepare(self, record):
+        # QueueHandler.prepare formats the message in the calling thread
+        return record
+
+    def enqueue(self, record):
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped()
+
+    def _report_dropped(self):
+        with self._lock:
+            count, self._unreported = self._unreported, 0
+        if not count:
+            return
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Log queue full, dropped %d records", (count,), None,
+        )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._unreported += count
+
+    def stop(self):
+        """Write out the queued records and stop the writer thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def configure_logging(config):
+    """
+    LOGGING_CONFIG callable: dictConfig(config), then start the queue handlers.
+
+    The handlers a queue handler writes to are usually attached to no logger,
+    and logging only keeps weak references to named handlers, so they are
+    handed over while dictConfig's own mapping still holds them.
+    """
+    configurator = logging.config.DictConfigurator(config)
+    configurator.configure()
+    handlers = dict(configurator.config.get('handlers', {}))
+    for handler in handlers.values():
+        if isinstance(handler, BoundedQueueHandler):
+            handler.start(handlers)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a `rate` fraction of the records at or below `max_level`; more severe
+    records always pass. For high-volume events logged on every request.
+    """
+
+    def __init__(self, rate=1.0, max_level='INFO'):
+        super().__init__()
+        self.rate = float(rate)
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including the fields passed with extra={...}."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from graphene.test import Client
+from graphene_django.debug import DjangoDebugMiddleware
+from projects.debug import stop_debug
+from projects.models import Organization, Project, Task
+from projects.schema import schema
+
+TASKS_QUERY = '''
+query Tasks($projectId: String!) {
+    allTasks(projectId: $projectId) { id title description status assigneeEmail dueDate version }
+}
+'''
+# Resolvers per task in TASKS_QUERY
+FIELDS_PER_TASK = 7
+
+
+class Command(BaseCommand):
+    help = "Measure what DjangoDebugMiddleware costs on a large allTasks response"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000,
+                            help='Tasks in the benchmarked project')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Requests executed per configuration')
+
+    def handle(self, *args, **options):
+        client = Client(schema)
+        factory = RequestFactory()
+        organization = Organization.objects.create(
+            name='Benchmark', contact_email='benchmark-debug@example.com', password='benchmark'
+        )
+        try:
+            project = Project.objects.create(organization=organization, name='Benchmark', description='')
+            Task.objects.bulk_create(
+                Task(project=project, title=f'Task {i}', description='Benchmark task')
+                for i in range(options['tasks'])
+            )
+
+            def run(middleware):
+                latencies = []
+                for _ in range(options['requests']):
+                    request = factory.post('/graphql/')
+                    request.organization = organization
+                    started = time.perf_counter()
+                    try:
+                        result = client.execute(
+                            TASKS_QUERY, context_value=request, middleware=middleware(),
+                            variable_values={'projectId': str(project.pk)},
+                        )
+                    finally:
+                        stop_debug(request)
+                    latencies.append(time.perf_counter() - started)
+                    assert not result.get('errors'), result['errors']
+                return sorted(latencies)[len(latencies) // 2]
+
+            # Warm up the document and loader code paths
+            run(list)
+            plain = run(list)
+            debug = run(lambda: [DjangoDebugMiddleware()])
+        finally:
+            organization.delete()
+
+        resolvers = options['tasks'] * FIELDS_PER_TASK + 1
+        self.stdout.write(f"{'middleware':>12} {'p50 ms':>8}")
+        self.stdout.write(f"{'none':>12} {plain * 1000:>8.1f}")
+        self.stdout.write(f"{'debug':>12} {debug * 1000:>8.1f}")
+        self.stdout.write(
+            f"DjangoDebugMiddleware adds {(debug - plain) * 1e6 / resolvers:.2f} us "
+            f"per resolver over {resolvers} resolvers"
+        )
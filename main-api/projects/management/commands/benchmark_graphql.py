@@ -0,0 +1,119 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from projects.benchmark import (
+    DEFAULT_MIX, BenchmarkData, HTTPTransport, InProcessTransport, build_plan, compare_results, parse_mix,
+    results_document, run_plan, scrape_sql_queries, sql_queries_between, summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test /graphql/ with the frontend's operation mix and report throughput, latency "
+        "percentiles and SQL queries per operation. Runs against the configured database "
+        "(SQLite, or PostgreSQL with DATABASE_URL) in its own organization, deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Measured requests')
+        parser.add_argument('--warmup', type=int, default=50,
+                            help='Requests sent first and left out of the results')
+        parser.add_argument('--concurrency', type=int, default=4, help='Clients sending requests at the same time')
+        parser.add_argument('--mix', type=parse_mix,
+                            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help='Share of each operation, as GetProjects=40,GetTasks=40,...')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the request order and variables')
+        parser.add_argument('--projects', type=int, default=20, help='Projects seeded')
+        parser.add_argument('--tasks', type=int, default=25, help='Tasks seeded per project')
+        parser.add_argument('--comments', type=int, default=1, help='Comments seeded per task')
+        parser.add_argument('--url', help='GraphQL endpoint of a running server sharing this database, '
+                                          'e.g. http://localhost:8000/graphql/; requests run in-process without it')
+        parser.add_argument('--metrics-url',
+                            help="The server's /metrics, read for SQL queries per operation with --url")
+        parser.add_argument('--metrics-token', help='Bearer token of --metrics-url')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Results JSON of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on: every SQL query is also kept in memory, which slows requests down")
+
+        data = BenchmarkData(options['projects'], options['tasks'], options['comments'])
+        data.seed()
+        try:
+            api_key = data.organization.api_key
+            if options['url']:
+                def make_transport():
+                    return HTTPTransport(options['url'], api_key)
+            else:
+                def make_transport():
+                    return InProcessTransport(api_key)
+
+            warmup = build_plan(options['mix'], options['warmup'], data, seed=options['seed'] - 1)
+            plan = build_plan(options['mix'], options['requests'], data, seed=options['seed'])
+            run_plan(make_transport, warmup, options['concurrency'])
+
+            metrics_url = options['metrics_url'] if options['url'] else None
+            before = scrape_sql_queries(metrics_url, options['metrics_token']) if metrics_url else None
+            samples, elapsed = run_plan(make_transport, plan, options['concurrency'])
+            after = scrape_sql_queries(metrics_url, options['metrics_token']) if metrics_url else None
+            if metrics_url and after is None:
+                self.stderr.write(f"Could not read SQL query metrics from {metrics_url}")
+        finally:
+            data.delete()
+
+        summary, operations = summarize(samples, elapsed, sql_queries_between(before, after))
+        config = {
+            key: options[key] for key in ('requests', 'warmup', 'concurrency', 'mix', 'seed',
+                                          'projects', 'tasks', 'comments')
+        }
+        results = results_document(config, options['url'] or InProcessTransport.target, summary, operations)
+        self.write_table(summary, operations)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+            self.stderr.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            if (baseline.get('config') != results['config']
+                    or baseline['environment'].get('target') != results['environment']['target']):
+                self.stderr.write("The baseline ran with other options or against another target")
+            try:
+                comparison = compare_results(baseline, results)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.write_comparison(baseline, comparison)
+
+    def write_table(self, summary, operations):
+        self.stdout.write(
+            f"{'operation':<18} {'requests':>8} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}"
+        )
+        rows = [(name, operation) for name, operation in operations.items()]
+        rows.append(('all', {**summary, 'queries_per_request': None}))
+        for name, row in rows:
+            latency = row['latency_ms']
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{name:<18} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.1f} "
+                f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+                f"{'-' if queries is None else f'{queries:g}':>7}"
+            )
+        for name, row in rows:
+            for message, count in row.get('error_messages', {}).items():
+                self.stderr.write(f"{name}: {count} x {message}")
+
+    def write_comparison(self, baseline, comparison):
+        commit = baseline['environment'].get('git_commit') or 'unknown commit'
+        self.stdout.write(f"\nCompared with {commit[:12]} ({baseline['created']})")
+        self.stdout.write(f"{'operation':<18} {'metric':<10} {'before':>10} {'after':>10} {'change':>8}")
+        for name, metric, old, new, change in comparison:
+            self.stdout.write(
+                f"{name:<18} {metric:<10} {'-' if old is None else f'{old:g}':>10} "
+                f"{'-' if new is None else f'{new:g}':>10} {'-' if change is None else f'{change:+.1f}%':>8}"
+            )
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from graphene.test import Client
+from projects.models import Organization
+from projects.schema import schema
+
+LOGIN_MUTATION = '''
+mutation Login($email: String!, $password: String!) {
+    loginOrganization(email: $email, password: $password) { success message }
+}
+'''
+
+
+class Command(BaseCommand):
+    help = "Measure LoginOrganization throughput for a range of bcrypt work factors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, nargs='+', default=[4, 8, 10, 12],
+                            help='bcrypt work factors to measure')
+        parser.add_argument('--logins', type=int, default=40,
+                            help='Logins executed per work factor')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Threads issuing logins at the same time')
+
+    def handle(self, *args, **options):
+        client = Client(schema)
+        factory = RequestFactory()
+        self.stdout.write(f"{'rounds':>6} {'logins/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+
+        for rounds in options['rounds']:
+            with override_settings(PASSWORD_HASHING={'ROUNDS': rounds}):
+                email = f'benchmark-{rounds}@example.com'
+                organization = Organization.objects.create(
+                    name='Benchmark', contact_email=email, password='benchmark'
+                )
+
+                def login(_):
+                    started = time.perf_counter()
+                    try:
+                        result = client.execute(
+                            LOGIN_MUTATION,
+                            context_value=factory.post('/graphql/'),
+                            variable_values={'email': email, 'password': 'benchmark'},
+                        )
+                    finally:
+                        connections.close_all()
+                    ok = not result.get('errors') and result['data']['loginOrganization']['success']
+                    return time.perf_counter() - started, ok
+
+                try:
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(options['concurrency']) as pool:
+                        results = list(pool.map(login, range(options['logins'])))
+                    elapsed = time.perf_counter() - started
+                finally:
+                    organization.delete()
+
+            latencies = sorted(latency for latency, _ in results)
+            failed = sum(1 for _, ok in results if not ok)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            self.stdout.write(
+                f"{rounds:>6} {len(results) / elapsed:>10.1f} {p50:>8.1f} {p95:>8.1f} {failed:>7}"
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from projects.profiling import get_profiling_settings, issue_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print an X-Profile header value that makes the GraphQL view profile a request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int,
+                            help='Only profile requests of this organization id')
+
+    def handle(self, *args, **options):
+        settings = get_profiling_settings()
+        self.stdout.write(f"{settings['HEADER']}: {issue_profile_token(options['organization'])}")
+        self.stderr.write(
+            f"Valid for {settings['MAX_AGE']} seconds; profiles are written to {settings['DIRECTORY']}"
+        )
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from projects.models import Project, TASK_COUNTER_FIELDS
+from projects.response_cache import bump_data_version
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized task counters on Project and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of projects recomputed per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without writing the corrected counters')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        counter_fields = ['task_count', *TASK_COUNTER_FIELDS.values()]
+        annotations = {'actual_task_count': Count('task')}
+        for status, field in TASK_COUNTER_FIELDS.items():
+            annotations[f'actual_{field}'] = Count('task', filter=Q(task__status=status))
+
+        checked = 0
+        drifted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                # Lock the batch so concurrent task writes (which update these rows
+                # with F() expressions) wait until the recount has been stored.
+                pks = list(
+                    Project.objects.select_for_update()
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                last_pk = pks[-1]
+
+                stale = []
+                for project in Project.objects.filter(pk__in=pks).annotate(**annotations).order_by('pk'):
+                    drift = {
+                        field: (getattr(project, field), getattr(project, f'actual_{field}'))
+                        for field in counter_fields
+                        if getattr(project, field) != getattr(project, f'actual_{field}')
+                    }
+                    if drift:
+                        details = ', '.join(f'{field} {stored} -> {actual}' for field, (stored, actual) in drift.items())
+                        self.stdout.write(f"Project {project.pk}: {details}")
+                        for field, (_, actual) in drift.items():
+                            setattr(project, field, actual)
+                        stale.append(project)
+                checked += len(pks)
+                drifted += len(stale)
+
+                if stale and not dry_run:
+                    Project.objects.bulk_update(stale, counter_fields)
+                    # bulk_update() sends no signals: drop the cached responses ourselves
+                    for organization_id in {project.organization_id for project in stale}:
+                        bump_data_version(organization_id)
+
+        action = 'would be corrected' if dry_run else 'corrected'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} projects, {drifted} with drifted counters {action}"
+        ))
@@ -0,0 +1,43 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from projects.slow_queries import get_slow_query_log
+
+
+class Command(BaseCommand):
+    help = "Show the SQL statements recorded by the slow query log, most recent last"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Number of records to show (0 for all)')
+        parser.add_argument('--json', action='store_true', help='Print the records as JSON lines')
+        parser.add_argument('--clear', action='store_true', help='Delete the records after showing them')
+
+    def handle(self, *args, **options):
+        slow_query_log = get_slow_query_log()
+        if slow_query_log is None:
+            raise CommandError("The slow query log is disabled (GRAPHQL_SLOW_QUERIES['ENABLED'])")
+        if slow_query_log.is_process_local:
+            raise CommandError(
+                f"The slow query log is kept in the local-memory cache '{slow_query_log.cache_alias}', "
+                "which this command cannot read; set GRAPHQL_SLOW_QUERIES['CACHE'] to a shared cache"
+            )
+
+        records = slow_query_log.records()
+        if options['limit']:
+            records = records[-options['limit']:]
+        for record in records:
+            if options['json']:
+                self.stdout.write(json.dumps(record))
+                continue
+            self.stdout.write(
+                f"{record['time']}  {record['duration_ms']:.1f} ms  "
+                f"operation={record['operation']} path={record['path']} "
+                f"organization={record['organization_id']}"
+            )
+            self.stdout.write(f"  {record['sql']}")
+            if record.get('plan'):
+                for line in record['plan'].splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if options['clear']:
+            slow_query_log.clear()
+        self.stderr.write(f"{len(records)} slow queries shown")
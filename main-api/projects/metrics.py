@@ -0,0 +1,303 @@
+import hmac
+import inspect
+import math
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from django.conf import settings
+from django.db import connection
+from graphql import get_named_type, is_leaf_type
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    # Upper bounds (seconds) of the latency histogram buckets
+    'LATENCY_BUCKETS': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    # Upper bounds of the SQL queries per operation histogram buckets
+    'SQL_QUERY_BUCKETS': (0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+    # Organization id -> tier label; every other organization is DEFAULT_TIER
+    'ORGANIZATION_TIERS': {},
+    'DEFAULT_TIER': 'default',
+    # Operation names are chosen by clients; past this many, new ones are counted as "other"
+    'MAX_OPERATIONS': 200,
+    # Bearer token /metrics requires; None leaves it open to anyone who can reach it
+    'TOKEN': None,
+}
+
+
+def format_labels(labelnames, labels):
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, labels)
+    )
+    return '{' + pairs + '}' if pairs else ''
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label set. observe() only increments the one
+    bucket the value falls in; the cumulative counts Prometheus expects are
+    computed when the metrics are scraped.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in sorted(values):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                bucket_labels = format_labels((*self.labelnames, 'le'), (*labels, format_value(bound)))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}')
+        return lines
+
+
+class SqlRecorder:
+    """connection.execute_wrapper() callable counting queries and their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += perf_counter() - started
+
+
+class GraphQLMetrics:
+    """
+    In-process registry of GraphQL operation, field and SQL metrics, exposed
+    in the Prometheus text format by projects.views.metrics_view.
+
+    Every worker process keeps its own metrics, so each one has to be scraped;
+    Prometheus adds them up across the instances.
+    """
+
+    # cached is "no" for executed operations, "response" for ones answered from
+    # the response cache and "not_modified" for 304s
+    OPERATION_LABELS = ('operation', 'type', 'tier', 'cached')
+
+    def __init__(self, latency_buckets, sql_query_buckets, organization_tiers=None,
+                 default_tier='default', max_operations=200, token=None):
+        self.organization_tiers = {int(key): value for key, value in (organization_tiers or {}).items()}
+        self.default_tier = default_tier
+        self.max_operations = max_operations
+        self.token = token
+        self.operation_duration = Histogram(
+            'graphql_operation_duration_seconds', 'Time spent executing GraphQL operations.',
+            self.OPERATION_LABELS, latency_buckets,
+        )
+        self.operation_errors = Counter(
+            'graphql_operation_errors_total', 'GraphQL operations whose result had errors.',
+            self.OPERATION_LABELS,
+        )
+        self.sql_queries = Histogram(
+            'graphql_operation_sql_queries', 'SQL queries run by one GraphQL operation.',
+            self.OPERATION_LABELS, sql_query_buckets,
+        )
+        self.sql_duration = Histogram(
+            'graphql_operation_sql_duration_seconds', 'Time spent in SQL by one GraphQL operation.',
+            self.OPERATION_LABELS, latency_buckets,
+        )
+        self.field_duration = Histogram(
+            'graphql_field_duration_seconds',
+            'Time spent resolving GraphQL fields, for root fields and fields returning objects.',
+            ('field', 'tier'), latency_buckets,
+        )
+        self._operations = set()
+        self._lock = threading.Lock()
+        # Shared by every request so its per-field decisions are made once
+        self.middleware = MetricsMiddleware(self)
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_METRICS', {})}
+        if not options['ENABLED']:
+            return None
+        return cls(
+            latency_buckets=options['LATENCY_BUCKETS'],
+            sql_query_buckets=options['SQL_QUERY_BUCKETS'],
+            organization_tiers=options['ORGANIZATION_TIERS'],
+            default_tier=options['DEFAULT_TIER'],
+            max_operations=options['MAX_OPERATIONS'],
+            token=options['TOKEN'],
+        )
+
+    def get_tier(self, request):
+        organization_id = getattr(request, 'organization_id', None)
+        return self.organization_tiers.get(organization_id, self.default_tier)
+
+    def operation_label(self, operation_name):
+        name = operation_name or 'anonymous'
+        if name in self._operations:
+            return name
+        with self._lock:
+            if len(self._operations) < self.max_operations:
+                self._operations.add(name)
+                return name
+        return 'other'
+
+    @contextmanager
+    def track_operation(self, request, operation_type, operation_name, record_sql=True):
+        """
+        Time the operation executed inside the block and count its SQL.
+
+        Yields a callback taking the ExecutionResult, to count operations with
+        errors. SQL is only seen on this thread's connection, so the async
+        view, whose queries run in another thread, passes record_sql=False.
+        """
+        tier = request.metrics_tier = self.get_tier(request)
+        labels = (self.operation_label(operation_name), operation_type, tier, 'no')
+        outcome = []
+        recorder = SqlRecorder()
+        started = perf_counter()
+        try:
+            if record_sql:
+                with connection.execute_wrapper(recorder):
+                    yield outcome.append
+            else:
+                yield outcome.append
+        finally:
+            self.operation_duration.observe(labels, perf_counter() - started)
+            if record_sql:
+                self.sql_queries.observe(labels, recorder.queries)
+                self.sql_duration.observe(labels, recorder.duration)
+            if not outcome or outcome[0] is None or outcome[0].errors:
+                self.operation_errors.inc(labels)
+
+    def record_cached(self, request, operation_type, operation_name, cached, duration):
+        """Time an operation answered from the response cache, `cached` being its label."""
+        labels = (self.operation_label(operation_name), operation_type, self.get_tier(request), cached)
+        self.operation_duration.observe(labels, duration)
+
+    def check_token(self, request):
+        if not self.token:
+            return True
+        authorization = request.headers.get('Authorization', '')
+        return hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {self.token}'.encode('utf-8'))
+
+    def expose(self):
+        lines = []
+        for metric in (self.operation_duration, self.operation_errors, self.sql_queries,
+                       self.sql_duration, self.field_duration):
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Graphene middleware observing field resolution times.
+
+    Leaf fields below the root (scalars and enums) are passed straight
+    through, so a large list of rows costs one dictionary lookup per scalar;
+    root fields and fields returning objects are timed, including the wait
+    for their loaders under async execution.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._labels = {}
+
+    def resolve(self, next, root, info, **args):
+        # The parent type also decides whether this is a root field
+        key = (info.parent_type, info.field_name)
+        label = self._labels.get(key, False)
+        if label is False:
+            label = self._labels[key] = self.field_label(info)
+        if label is None:
+            return next(root, info, **args)
+
+        labels = (label, getattr(info.context, 'metrics_tier', self.metrics.default_tier))
+        started = perf_counter()
+        result = next(root, info, **args)
+        if inspect.isawaitable(result):
+            return self.observe_awaitable(result, labels, started)
+        self.metrics.field_duration.observe(labels, perf_counter() - started)
+        return result
+
+    async def observe_awaitable(self, result, labels, started):
+        try:
+            return await result
+        finally:
+            self.metrics.field_duration.observe(labels, perf_counter() - started)
+
+    @staticmethod
+    def field_label(info):
+        if info.path.prev is not None and is_leaf_type(get_named_type(info.return_type)):
+            return None
+        return f'{info.parent_type.name}.{info.field_name}'
+
+
+_metrics = None
+_metrics_loaded = False
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the GraphQLMetrics registry, or None when metrics are disabled."""
+    global _metrics, _metrics_loaded
+    if not _metrics_loaded:
+        with _metrics_lock:
+            if not _metrics_loaded:
+                _metrics = GraphQLMetrics.from_settings()
+                _metrics_loaded = True
+    return _metrics
+
+
+def reset_metrics():
+    global _metrics, _metrics_loaded
+    with _metrics_lock:
+        _metrics = None
+        _metrics_loaded = False
@@ -1,58 +1,224 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core import signing
 from django.http import JsonResponse
-from .models import Organization
+from graphql import OperationType
+from .documents import parse_document, get_root_fields
+from .org_cache import get_organization_cache
+from .persisted import (
+    PersistedQueryError, PersistedQueryNotFound, get_persisted_query_store,
+    persisted_query_error_response,
+)
+from .tokens import is_token, verify_token
+from .views import OrganizationGraphQLView
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Root mutation fields that may run without an API key
+AUTH_EXEMPT_FIELDS = {'signUpOrganization', 'loginOrganization', '__typename'}
+
+# Query string parameters of a GET /graphql/ request
+GET_PARAMS = ('query', 'variables', 'operationName', 'extensions')
+
 class OrganizationAuthMiddleware:
+    """
+    Authenticates POST and GET /graphql/ requests by their X-API-Key header.
+
+    Works in both the WSGI and the ASGI handler: under ASGI the organization
+    lookup on a cache miss goes through the async ORM instead of blocking the
+    event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
         # Skip auth for signup and login mutations
-        if request.method == 'POST' and request.path == '/graphql/':
+        if self.is_graphql_request(request):
             try:
-                data = json.loads(request.body)
-                query = data.get('query', '')
-                
-                logger.info(f"GraphQL query: {query[:100]}...")  # Log first 100 chars
-                
-                # Allow these mutations without API key
-                if 'signUpOrganization' in query or 'loginOrganization' in query:
-                    logger.info("Allowing auth mutation without API key")
-                    return self.get_response(request)
-
-                # Check API key for all other operations
-                api_key = request.headers.get('X-API-Key')
-                logger.info(f"API Key present: {bool(api_key)}")
-                
-                if not api_key:
-                    logger.warning("No API key provided")
-                    return JsonResponse({
-                        'errors': [{'message': 'API key is required'}]
-                    }, status=401)
-
-                try:
-                    organization = Organization.objects.get(api_key=api_key)
-                    logger.info(f"Organization found: {organization.name}")
-                    # Add organization to request for use in resolvers
-                    request.organization = organization
-                except Organization.DoesNotExist:
-                    logger.warning(f"Invalid API key: {api_key}")
-                    return JsonResponse({
-                        'errors': [{'message': 'Invalid API key'}]
-                    }, status=401)
-                    
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {e}")
-                return JsonResponse({
-                    'errors': [{'message': 'Invalid JSON in request body'}]
-                }, status=400)
+                response, api_key = self.process_graphql_request(request)
+                if response is None and api_key is not None:
+                    organization = key_version = None
+                    if is_token(api_key):
+                        organization_id, key_version = self.decode_token(api_key)
+                        if organization_id is not None:
+                            organization = get_organization_cache().get_organization_by_id(organization_id)
+                    else:
+                        organization = get_organization_cache().get_organization(api_key)
+                    response = self.authenticate(request, api_key, organization, key_version)
+                if response is not None:
+                    return response
+                registration = getattr(request, 'persisted_query_registration', None)
+                if registration is not None:
+                    get_persisted_query_store().register(*registration)
             except Exception as e:
-                logger.error(f"Middleware error: {e}")
-                return JsonResponse({
-                    'errors': [{'message': f'Middleware error: {str(e)}'}]
-                }, status=500)
+                return self.error_response(e)
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.is_graphql_request(request):
+            try:
+                response, api_key = await self.aprocess_graphql_request(request)
+                if response is None and api_key is not None:
+                    organization = key_version = None
+                    if is_token(api_key):
+                        organization_id, key_version = self.decode_token(api_key)
+                        if organization_id is not None:
+                            organization = await get_organization_cache().aget_organization_by_id(organization_id)
+                    else:
+                        organization = await get_organization_cache().aget_organization(api_key)
+                    response = self.authenticate(request, api_key, organization, key_version)
+                if response is not None:
+                    return response
+                registration = getattr(request, 'persisted_query_registration', None)
+                if registration is not None:
+                    await get_persisted_query_store().aregister(*registration)
+            except Exception as e:
+                return self.error_response(e)
+
+        return await self.get_response(request)
+
+    def is_graphql_request(self, request):
+        if request.path != '/graphql/':
+            return False
+        if request.method == 'POST':
+            return True
+        # GET queries execute too; only the bare GraphiQL page needs no key
+        return (
+            request.method == 'GET'
+            and any(param in request.GET for param in GET_PARAMS)
+            and not OrganizationGraphQLView.can_display_graphiql(request, request.GET)
+        )
+
+    def process_graphql_request(self, request):
+        """
+        Decode and parse the request, returning (response, api_key).
+
+        A response short-circuits the request; otherwise api_key is the key to
+        authenticate with, or None if the operation is exempt from auth. A
+        query sent with its hash is only registered once the request passed
+        authentication (request.persisted_query_registration).
+        """
+        data, query = self.decode_graphql_request(request)
+        query_hash = None
+        # Automatic persisted queries: the body may carry only a sha256 hash
+        persisted_queries = get_persisted_query_store()
+        if persisted_queries is not None and isinstance(data, dict):
+            try:
+                query, query_hash = persisted_queries.resolve(query, data.get('extensions'))
+            except (PersistedQueryNotFound, PersistedQueryError) as e:
+                return self.persisted_query_error_response(e), None
+            self.queue_registration(request, data, query, query_hash)
+        return self.check_graphql_request(request, data, query, query_hash)
+
+    async def aprocess_graphql_request(self, request):
+        """process_graphql_request() without blocking the event loop on the cache."""
+        data, query = self.decode_graphql_request(request)
+        query_hash = None
+        persisted_queries = get_persisted_query_store()
+        if persisted_queries is not None and isinstance(data, dict):
+            try:
+                query, query_hash = await persisted_queries.aresolve(query, data.get('extensions'))
+            except (PersistedQueryNotFound, PersistedQueryError) as e:
+                return self.persisted_query_error_response(e), None
+            self.queue_registration(request, data, query, query_hash)
+        return self.check_graphql_request(request, data, query, query_hash)
+
+    def queue_registration(self, request, data, query, query_hash):
+        # A full query sent together with its hash: register it after authentication
+        if data.get('query') and query_hash is not None:
+            request.persisted_query_registration = (query, query_hash)
+        data['query'] = query
+
+    def decode_graphql_request(self, request):
+        if request.method == 'GET':
+            data = {param: request.GET[param] for param in GET_PARAMS if param in request.GET}
+        else:
+            data = json.loads(request.body)
+        query = (data.get('query') or '') if isinstance(data, dict) else ''
+        return data, query
+
+    def persisted_query_error_response(self, e):
+        if isinstance(e, PersistedQueryNotFound):
+            # Apollo Client retries with the full query text
+            return JsonResponse(persisted_query_error_response(e))
+        logger.warning("Persisted query rejected: %s", e)
+        return JsonResponse(persisted_query_error_response(e), status=400)
+
+    def check_graphql_request(self, request, data, query, query_hash):
+        logger.info("GraphQL query: %.100s...", query)  # Log first 100 chars
+
+        # Parse once and hand the payload and document to GraphQLView
+        document = parse_document(query, query_hash) if query else None
+        if isinstance(data, dict):
+            request.graphql_payload = data
+            request.graphql_query = query
+            request.graphql_document = document
+
+        # Allow these mutations without API key
+        if document is not None:
+            operation_type, root_fields = get_root_fields(document.document, data.get('operationName'))
+            if operation_type == OperationType.MUTATION and root_fields <= AUTH_EXEMPT_FIELDS:
+                logger.info("Allowing auth mutation without API key")
+                return None, None
+
+        # Check API key for all other operations
+        api_key = request.headers.get('X-API-Key')
+        logger.info("API Key present: %s", bool(api_key))
+
+        if not api_key:
+            logger.warning("No API key provided")
+            return JsonResponse({
+                'errors': [{'message': 'API key is required'}]
+            }, status=401), None
+        return None, api_key
+
+    def decode_token(self, api_key):
+        """Return (organization_id, key_version) of a signed token, or (None, None) if it is forged."""
+        try:
+            return verify_token(api_key)
+        except signing.BadSignature:
+            logger.warning("Invalid API token")
+            return None, None
+
+    def authenticate(self, request, api_key, organization, key_version=None):
+        """Attach the organization to the request, or return a 401 response."""
+        if organization is None:
+            logger.warning("Invalid API key")
+            return JsonResponse({
+                'errors': [{'message': 'Invalid API key'}]
+            }, status=401)
+        # Checked for every operation, whether or not a resolver reads the organization
+        if key_version is not None and key_version != organization.key_version:
+            logger.warning("Revoked API token", extra={'organization_id': organization.pk})
+            return JsonResponse({
+                'errors': [{'message': 'API token has been revoked'}]
+            }, status=401)
+        logger.info("Organization found: %s", organization.name, extra={'organization_id': organization.pk})
+        # Add organization to request for use in resolvers
+        request.organization_id = organization.pk
+        if key_version is not None:
+            request.organization_key_version = key_version
+        request.organization = organization
+        return None
 
-        return self.get_response(request)
\ No newline at end of file
+    def error_response(self, e):
+        if isinstance(e, json.JSONDecodeError):
+            logger.error("JSON decode error: %s", e)
+            return JsonResponse({
+                'errors': [{'message': 'Invalid JSON in request body'}]
+            }, status=400)
+        logger.error("Middleware error: %s", e)
+        return JsonResponse({
+            'errors': [{'message': f'Middleware error: {str(e)}'}]
+        }, status=500)
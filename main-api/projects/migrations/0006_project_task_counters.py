@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:47
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_task_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    projects = Project.objects.annotate(
+        total=Count('task'),
+        todo=Count('task', filter=Q(task__status='TODO')),
+        in_progress=Count('task', filter=Q(task__status='IN_PROGRESS')),
+        done=Count('task', filter=Q(task__status='DONE')),
+    )
+    for project in projects.iterator():
+        Project.objects.filter(pk=project.pk).update(
+            task_count=project.total,
+            todo_task_count=project.todo,
+            in_progress_task_count=project.in_progress,
+            done_task_count=project.done,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_remove_task_priority_alter_task_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
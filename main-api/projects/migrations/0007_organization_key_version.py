@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='key_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
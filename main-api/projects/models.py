@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.sql import UpdateQuery
 from django.utils.text import slugify
 from django.urls import reverse
 from datetime import date
 import uuid
-import bcrypt
+from .passwords import get_password_hasher
+from .response_cache import bump_data_version
 
 STATUS_CHOICES = (
     ('ACTIVE', 'Active'),
@@ -17,12 +20,104 @@ TASK_STATUS_CHOICES = (
     ('DONE', 'Done'),
 )
 
+# Denormalized per-status counter column on Project for each task status
+TASK_COUNTER_FIELDS = {
+    'TODO': 'todo_task_count',
+    'IN_PROGRESS': 'in_progress_task_count',
+    'DONE': 'done_task_count',
+}
+
+class TenantQuerySet(models.QuerySet):
+    """
+    QuerySet that can be narrowed to the rows of one organization.
+
+    for_org() puts the tenant check into the query itself (a WHERE on the
+    organization id, joined through the parents where needed), so fetching and
+    authorizing a row is one query and other organizations' rows are simply
+    not found.
+    """
+
+    # Path from the model to the owning organization's id
+    organization_lookup = None
+
+    def for_org(self, organization):
+        # Accepts an Organization or its id
+        organization_id = getattr(organization, 'pk', organization)
+        if organization_id is None:
+            return self.none()
+        return self.filter(**{self.organization_lookup: organization_id})
+
+    def update_returning(self, **changes):
+        """
+        Like update(), but return the updated rows as model instances.
+
+        Only the columns in `changes` are written, in a single UPDATE whose WHERE
+        carries every filter of this queryset (including for_org()). Where the
+        backend supports UPDATE ... RETURNING the rows come back from that same
+        statement; elsewhere they are locked, updated and selected again.
+        """
+        fields = self.model._meta.concrete_fields
+        if not supports_update_returning(self.db):
+            with transaction.atomic(using=self.db):
+                pks = list(self.select_for_update().values_list('pk', flat=True))
+                manager = self.model._base_manager.using(self.db)
+                manager.filter(pk__in=pks).update(**changes)
+                return list(manager.filter(pk__in=pks).order_by('pk'))
+
+        query = self.query.chain(UpdateQuery)
+        query.add_update_values(changes)
+        query.annotations = {}
+        compiler = query.get_compiler(self.db)
+        sql, params = compiler.as_sql()
+        columns = ', '.join(compiler.quote_name_unless_alias(field.column) for field in fields)
+        with transaction.mark_for_rollback_on_error(using=self.db):
+            with compiler.connection.cursor() as cursor:
+                cursor.execute(f'{sql} RETURNING {columns}', params)
+                rows = cursor.fetchall()
+
+        # Convert raw column values the same way a SELECT of these fields would
+        select_compiler = self.query.get_compiler(self.db)
+        converters = select_compiler.get_converters(
+            [field.get_col(self.model._meta.db_table) for field in fields]
+        )
+        if converters:
+            rows = select_compiler.apply_converters(rows, converters)
+        attnames = [field.attname for field in fields]
+        return sorted(
+            (self.model.from_db(self.db, attnames, row) for row in rows),
+            key=lambda instance: instance.pk
+        )
+
+def supports_update_returning(using):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return True
+    # SQLite has RETURNING since 3.35; MySQL and MariaDB only for INSERT/DELETE
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35)
+
+class ProjectQuerySet(TenantQuerySet):
+    organization_lookup = 'organization_id'
+
+class TaskQuerySet(TenantQuerySet):
+    organization_lookup = 'project__organization_id'
+
+class TaskCommentQuerySet(TenantQuerySet):
+    organization_lookup = 'task__project__organization_id'
+
 class Organization(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     contact_email = models.EmailField()
     password = models.CharField(max_length=255, default='')  # Storing hashed password
     api_key = models.CharField(max_length=100, unique=True, blank=True)
+    # Embedded in signed API tokens; bump it to revoke every issued token
+    key_version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # SignUpOrganization/LoginOrganization look organizations up by email
+            models.Index(fields=['contact_email'], name='org_contact_email_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -37,51 +132,200 @@ class Organization(models.Model):
 
         # Hash password if it's not already hashed
         if not self.password.startswith('$2b$'):
-            self.password = bcrypt.hashpw(
-                self.password.encode('utf-8'), 
-                bcrypt.gensalt()
-            ).decode('utf-8')
+            self.password = get_password_hasher().hash(self.password)
             
         super().save(*args, **kwargs)
 
+    def revoke_tokens(self):
+        Organization.objects.filter(pk=self.pk).update(key_version=F('key_version') + 1)
+        self.refresh_from_db(fields=['key_version'])
+        # update() sends no post_save, so drop the cached organization here;
+        # imported late because org_cache imports this module
+        from .org_cache import get_organization_cache
+        get_organization_cache().invalidate(organization_id=self.pk)
+        # Cached responses must not be served to the revoked tokens
+        bump_data_version(self)
+
     def check_password(self, raw_password):
-        return bcrypt.checkpw(
-            raw_password.encode('utf-8'), 
-            self.password.encode('utf-8')
-        )
+        return get_password_hasher().check(raw_password, self.password)
+
+    def password_needs_rehash(self):
+        # True when the stored hash was made with a different work factor than configured
+        return get_password_hasher().needs_rehash(self.password)
 
     def __str__(self):
         return self.name
 
 class Project(models.Model):
-    organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    # Covered by project_org_id_idx, a separate single-column index would be redundant
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, db_index=False)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
     due_date = models.DateField(null=True, blank=True)
+    # Maintained by Task.save()/Task.delete(), see adjust_task_counters()
+    task_count = models.IntegerField(default=0)
+    todo_task_count = models.IntegerField(default=0)
+    in_progress_task_count = models.IntegerField(default=0)
+    done_task_count = models.IntegerField(default=0)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # allProjects / allProjectsConnection: WHERE organization_id = ? ORDER BY id
+            models.Index(fields=['organization', 'id'], name='project_org_id_idx'),
+            # Per-organization due date ordering, skipping projects without one
+            models.Index(fields=['organization', 'due_date'], name='project_org_due_date_idx',
+                         condition=Q(due_date__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
 
+    def task_counts(self):
+        return {status: getattr(self, field) for status, field in TASK_COUNTER_FIELDS.items()}
+
+    @staticmethod
+    def task_counter_deltas(added=(), removed=()):
+        """{counter field: non-zero delta} for tasks with the statuses `added` and `removed`."""
+        deltas = {}
+        for status in added:
+            deltas[status] = deltas.get(status, 0) + 1
+        for status in removed:
+            deltas[status] = deltas.get(status, 0) - 1
+
+        fields = {}
+        total = len(added) - len(removed)
+        if total:
+            fields['task_count'] = total
+        for status, delta in deltas.items():
+            field = TASK_COUNTER_FIELDS.get(status)
+            if field and delta:
+                fields[field] = delta
+        return fields
+
+    @classmethod
+    def adjust_task_counters(cls, project_id, added=(), removed=()):
+        """
+        Atomically apply task counter deltas for one project with F() expressions.
+
+        `added` and `removed` are the statuses of the tasks that entered or left the
+        project, so a status change is added=[new], removed=[old].
+        """
+        updates = {
+            field: F(field) + delta for field, delta in cls.task_counter_deltas(added, removed).items()
+        }
+        if updates:
+            cls.objects.filter(pk=project_id).update(**updates)
+
+    @classmethod
+    def adjust_task_counters_many(cls, added=(), removed=()):
+        """
+        Bulk variant of adjust_task_counters() for writes that bypass Task.save(),
+        such as bulk_create/bulk_update. Takes (project_id, status) pairs and
+        applies the deltas of every affected project with a single UPDATE.
+        """
+        changes = {}
+        for project_id, status in added:
+            changes.setdefault(project_id, ([], []))[0].append(status)
+        for project_id, status in removed:
+            changes.setdefault(project_id, ([], []))[1].append(status)
+        if len(changes) == 1:
+            [(project_id, (project_added, project_removed))] = changes.items()
+            cls.adjust_task_counters(project_id, added=project_added, removed=project_removed)
+            return
+
+        # field -> [When(pk=project_id, then=delta)], so each column gets one CASE
+        whens = {}
+        for project_id in sorted(changes):
+            for field, delta in cls.task_counter_deltas(*changes[project_id]).items():
+                whens.setdefault(field, []).append(When(pk=project_id, then=Value(delta)))
+        if whens:
+            cls.objects.filter(pk__in=changes).update(**{
+                field: F(field) + Case(*field_whens, default=Value(0))
+                for field, field_whens in whens.items()
+            })
+
 class Task(models.Model):
-    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    # Covered by task_project_id_idx, a separate single-column index would be redundant
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=TASK_STATUS_CHOICES, default='TODO')
     assignee_email = models.EmailField(blank=True, null=True)
     due_date = models.DateField(null=True, blank=True)
+    # Bumped by every update, checked by UpdateTask/UpdateTaskStatus' expectedVersion
+    version = models.PositiveIntegerField(default=1)
 
-    def __str__(self):
-        return self.title
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # allTasks / allTasksConnection and the task loaders: WHERE project_id = ? ORDER BY id
+            models.Index(fields=['project', 'id'], name='task_project_id_idx'),
+            # Per-status counts and filters within a project
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # Tasks of a project ordered by due date, skipping tasks without one
+            models.Index(fields=['project', 'due_date'], name='task_project_due_date_idx',
+                         condition=Q(due_date__isnull=False)),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the project counters currently account for
+        instance._counted = (instance.__dict__.get('project_id'), instance.__dict__.get('status'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            adding = self._state.adding
+            counted = getattr(self, '_counted', None)
+            if not adding and (counted is None or None in counted):
+                # Loaded with project or status deferred, so read what is counted now
+                counted = Task.objects.filter(pk=self.pk).select_for_update().values_list(
+                    'project_id', 'status'
+                ).first()
+            if not adding:
+                # Incremented by the database, so concurrent F() updates are not lost
+                self.version = F('version') + 1
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+            super().save(*args, **kwargs)
+            if not adding:
+                self.refresh_from_db(fields=['version'])
+            current = (self.project_id, self.status)
+            if adding:
+                Project.adjust_task_counters(self.project_id, added=[self.status])
+            elif counted is not None and counted != current:
+                Project.adjust_task_counters(counted[0], removed=[counted[1]])
+                Project.adjust_task_counters(self.project_id, added=[self.status])
+            self._counted = current
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Project.adjust_task_counters(self.project_id, removed=[self.status])
+        return result
+
 class TaskComment(models.Model):
-    task = models.ForeignKey(Task, on_delete=models.CASCADE)
+    # Covered by comment_task_id_idx, a separate single-column index would be redundant
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, db_index=False)
     content = models.TextField()
     author_email = models.EmailField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = TaskCommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # taskcommentSet loader: WHERE task_id IN (...) ORDER BY id
+            models.Index(fields=['task', 'id'], name='comment_task_id_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"
\ No newline at end of file
@@ -0,0 +1,250 @@
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from .models import Organization
+
+DEFAULT_SETTINGS = {
+    'MAX_SIZE': 1024,
+    # Seconds an API key -> Organization entry stays valid
+    'TTL': 300,
+    # Optional alias from settings.CACHES shared by all workers
+    'BACKEND': None,
+    # With a shared backend the in-process tier only absorbs bursts, so other
+    # workers see an invalidation after at most this many seconds
+    'LOCAL_TTL': 5,
+}
+
+# Shared-tier key changed by every invalidation, so that a worker whose
+# database load raced one does not write the stale entry back
+SHARED_GENERATION_KEY = 'org-api-key:generation'
+# Never put credentials into a shared cache: the shared tier keeps the other
+# fields only, the API key being the lookup key itself
+SECRET_FIELDS = ('api_key', 'password')
+
+
+class OrganizationCache:
+    """
+    Bounded LRU + TTL cache mapping API keys, and the organization ids of
+    signed tokens, to Organization instances.
+
+    Lookups go to the in-process tier first, then to the optional shared Django
+    cache backend, and only then to the database. Entries are dropped explicitly
+    by the Organization post_save/post_delete signals (see projects.signals).
+    Organizations from the shared tier have their password deferred: it is
+    loaded from the database when something reads it.
+    """
+
+    def __init__(self, max_size=1024, ttl=300, backend=None, local_ttl=5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = caches[backend] if backend else None
+        self.local_ttl = min(ttl, local_ttl) if self.backend is not None else ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'ORGANIZATION_CACHE', {})}
+        return cls(
+            max_size=options['MAX_SIZE'],
+            ttl=options['TTL'],
+            backend=options['BACKEND'],
+            local_ttl=options['LOCAL_TTL'],
+        )
+
+    def get_organization(self, api_key):
+        """Return the Organization owning `api_key`, or None if the key is unknown."""
+        return self._get(api_key, {'api_key': api_key})
+
+    async def aget_organization(self, api_key):
+        """Async variant of get_organization for the ASGI request path."""
+        return await self._aget(api_key, {'api_key': api_key})
+
+    def get_organization_by_id(self, organization_id):
+        """Return the Organization with `organization_id`, or None; used to check signed tokens."""
+        return self._get(self._id_key(organization_id), {'id': organization_id})
+
+    async def aget_organization_by_id(self, organization_id):
+        return await self._aget(self._id_key(organization_id), {'id': organization_id})
+
+    def _get(self, key, lookup):
+        organization, generation = self._get_local(key)
+        if organization is not None:
+            return organization
+
+        shared_generation = None
+        if self.backend is not None:
+            shared_key = self._shared_key(key)
+            shared = self.backend.get_many([shared_key, SHARED_GENERATION_KEY])
+            if shared_key in shared:
+                return self._shared_hit(key, lookup, shared[shared_key], generation)
+            shared_generation = shared.get(SHARED_GENERATION_KEY)
+
+        with self._lock:
+            self.misses += 1
+        try:
+            organization = Organization.objects.get(**lookup)
+        except Organization.DoesNotExist:
+            return None
+
+        if self.backend is not None and self._is_current(generation):
+            self.backend.set(shared_key, self._shared_fields(organization), self.ttl)
+            if self.backend.get(SHARED_GENERATION_KEY) != shared_generation:
+                # Invalidated by another worker while loading
+                self.backend.delete(shared_key)
+        return self._loaded(key, organization, generation)
+
+    async def _aget(self, key, lookup):
+        organization, generation = self._get_local(key)
+        if organization is not None:
+            return organization
+
+        shared_generation = None
+        if self.backend is not None:
+            shared_key = self._shared_key(key)
+            shared = await self.backend.aget_many([shared_key, SHARED_GENERATION_KEY])
+            if shared_key in shared:
+                return self._shared_hit(key, lookup, shared[shared_key], generation)
+            shared_generation = shared.get(SHARED_GENERATION_KEY)
+
+        with self._lock:
+            self.misses += 1
+        try:
+            organization = await Organization.objects.aget(**lookup)
+        except Organization.DoesNotExist:
+            return None
+
+        if self.backend is not None and self._is_current(generation):
+            await self.backend.aset(shared_key, self._shared_fields(organization), self.ttl)
+            if await self.backend.aget(SHARED_GENERATION_KEY) != shared_generation:
+                await self.backend.adelete(shared_key)
+        return self._loaded(key, organization, generation)
+
+    def invalidate(self, *api_keys, organization_id=None):
+        """Drop the given keys, and every entry of `organization_id`, from both tiers."""
+        with self._lock:
+            self._generation += 1
+            keys = {key for key in api_keys if key}
+            if organization_id is not None:
+                keys.add(self._id_key(organization_id))
+                keys.update(
+                    key for key, (organization, _) in self._entries.items()
+                    if organization.pk == organization_id
+                )
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.backend is not None and keys:
+            # Before deleting, so that a racing load sees it after writing its entry
+            self.backend.set(SHARED_GENERATION_KEY, uuid.uuid4().hex, None)
+            self.backend.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _get_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                organization, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.copy(organization), None
+                del self._entries[key]
+            return None, self._generation
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _shared_hit(self, key, lookup, fields, generation):
+        organization = self._from_shared_fields(lookup, fields)
+        with self._lock:
+            self.shared_hits += 1
+            self._store(key, organization, generation)
+        return copy.copy(organization)
+
+    def _loaded(self, key, organization, generation):
+        with self._lock:
+            self._store(key, organization, generation)
+        return copy.copy(organization)
+
+    def _store(self, key, organization, generation):
+        # An invalidation that happened while the entry was being loaded wins
+        if generation != self._generation:
+            return
+        self._entries[key] = (organization, time.monotonic() + self.local_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _shared_fields(organization):
+        return {
+            field.attname: getattr(organization, field.attname)
+            for field in Organization._meta.concrete_fields
+            if field.attname not in SECRET_FIELDS
+        }
+
+    @staticmethod
+    def _from_shared_fields(lookup, fields):
+        # Entries looked up by id keep the api_key deferred as well
+        values = {**fields, **lookup}
+        # from_db() defers the fields left out, in concrete field order
+        names = [field.attname for field in Organization._meta.concrete_fields if field.attname in values]
+        return Organization.from_db(Organization.objects.db, names, [values[name] for name in names])
+
+    @staticmethod
+    def _id_key(organization_id):
+        # A tuple, so it can never collide with an API key
+        return ('id', organization_id)
+
+    @staticmethod
+    def _shared_key(key):
+        if isinstance(key, tuple):
+            return 'org-id:%d' % key[1]
+        # Not the raw key either
+        return 'org-api-key:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+_organization_cache = None
+_organization_cache_lock = threading.Lock()
+
+
+def get_organization_cache():
+    global _organization_cache
+    if _organization_cache is None:
+        with _organization_cache_lock:
+            if _organization_cache is None:
+                _organization_cache = OrganizationCache.from_settings()
+    return _organization_cache
+
+
+def reset_organization_cache():
+    global _organization_cache
+    with _organization_cache_lock:
+        _organization_cache = None
@@ -0,0 +1,101 @@
+import graphene
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql_relay.utils import base64, unbase64
+
+CURSOR_PREFIX = 'keyset:'
+
+
+def encode_cursor(pk):
+    return base64(f"{CURSOR_PREFIX}{pk}")
+
+
+def decode_cursor(cursor):
+    try:
+        value = unbase64(cursor)
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError
+        return int(value[len(CURSOR_PREFIX):])
+    except (ValueError, TypeError):
+        raise Exception(f"Invalid cursor: {cursor}")
+
+
+class CountableConnection(graphene.relay.Connection):
+    """Connection whose totalCount is only computed when the client selects it."""
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(self, info):
+        return self.count()
+
+
+def keyset_paginate(queryset, connection_type, first=None, after=None, last=None, before=None,
+                    count=None, fetch=None):
+    """
+    Slice `queryset` into a relay connection by seeking on the primary key.
+
+    Pages are fetched with `WHERE pk > after ORDER BY pk LIMIT n` (or the reverse
+    for last/before) instead of OFFSET, so every page costs the same regardless of
+    how deep the client has paged. One extra row is fetched to tell whether
+    another page exists. `count` is an optional callable used for totalCount;
+    by default the unsliced queryset is counted, and only if totalCount is selected.
+    `fetch(page, callback)` evaluates the page; LoaderRegistry.fetch is passed
+    when executing asynchronously, in which case an awaitable is returned.
+    """
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    for name, value in (('first', first), ('last', last)):
+        if value is not None and value < 0:
+            raise Exception(f"Argument '{name}' must be a non-negative integer")
+        if value is not None and max_limit and value > max_limit:
+            raise Exception(f"Requesting {value} records exceeds the limit of {max_limit}")
+    if first is None and last is None:
+        first = max_limit
+
+    page = queryset
+    if after is not None:
+        page = page.filter(pk__gt=decode_cursor(after))
+    if before is not None:
+        page = page.filter(pk__lt=decode_cursor(before))
+
+    if last is not None and first is None:
+        return fetch_page(page.order_by('-pk')[:last + 1], lambda rows: build_connection(
+            queryset, connection_type, rows[:last][::-1],
+            has_previous_page=len(rows) > last, has_next_page=False, count=count,
+        ), fetch)
+
+    def forward(rows):
+        has_next_page = len(rows) > first
+        rows = rows[:first]
+        has_previous_page = False
+        if last is not None and len(rows) > last:
+            rows = rows[-last:]
+            has_previous_page = True
+        return build_connection(
+            queryset, connection_type, rows,
+            has_previous_page=has_previous_page, has_next_page=has_next_page, count=count,
+        )
+    return fetch_page(page.order_by('pk')[:first + 1], forward, fetch)
+
+
+def fetch_page(page, callback, fetch=None):
+    if fetch is None:
+        return callback(list(page))
+    return fetch(page, callback)
+
+
+def build_connection(queryset, connection_type, rows, has_previous_page, has_next_page, count=None):
+    edge_type = connection_type.Edge
+    connection = connection_type(
+        edges=[edge_type(node=row, cursor=encode_cursor(row.pk)) for row in rows],
+        page_info=PageInfo(
+            start_cursor=encode_cursor(rows[0].pk) if rows else None,
+            end_cursor=encode_cursor(rows[-1].pk) if rows else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+    connection.count = count or queryset.count
+    return connection
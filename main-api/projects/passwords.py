@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from django.conf import settings
+
+DEFAULT_SETTINGS = {
+    # bcrypt work factor for new hashes; existing hashes are upgraded on login
+    'ROUNDS': 12,
+    # Threads hashing or verifying passwords at the same time
+    'MAX_WORKERS': 2,
+    # Extra operations allowed to wait for a worker before new ones are refused
+    'MAX_QUEUED': 8,
+    # Seconds an operation may wait for a queue slot before it is refused
+    'QUEUE_TIMEOUT': 2.0,
+}
+
+
+class PasswordHasherBusy(Exception):
+    def __init__(self):
+        super().__init__("Too many password operations in progress, please retry")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool.
+
+    The calling request thread still waits for the result, so the pool does not
+    free it; what it bounds is how many bcrypt operations burn CPU at once, so
+    that a login storm cannot take every core from regular GraphQL traffic.
+    At most MAX_WORKERS + MAX_QUEUED operations are admitted at once; anything
+    beyond that waits QUEUE_TIMEOUT seconds and is then refused with
+    PasswordHasherBusy instead of piling up.
+    """
+
+    def __init__(self, rounds=12, max_workers=2, max_queued=8, queue_timeout=2.0):
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'PASSWORD_HASHING', {})}
+        return cls(
+            rounds=options['ROUNDS'],
+            max_workers=options['MAX_WORKERS'],
+            max_queued=options['MAX_QUEUED'],
+            queue_timeout=options['QUEUE_TIMEOUT'],
+        )
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, raw_password):
+        return self.submit(self._hash, raw_password, self.rounds).result()
+
+    def check(self, raw_password, hashed):
+        return self.submit(self._check, raw_password, hashed).result()
+
+    def needs_rehash(self, hashed):
+        return get_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _hash(raw_password, rounds):
+        return bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+    @staticmethod
+    def _check(raw_password, hashed):
+        return bcrypt.checkpw(raw_password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def get_rounds(hashed):
+    # bcrypt hashes look like $2b$<rounds>$<salt+hash>
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+_password_hasher = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    global _password_hasher
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher.from_settings()
+    return _password_hasher
+
+
+def reset_password_hasher():
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is not None:
+            _password_hasher.shutdown()
+        _password_hasher = None
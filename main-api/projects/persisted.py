@@ -0,0 +1,202 @@
+import json
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from .documents import get_document_cache, hash_query
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    # Alias from settings.CACHES holding hash -> query registrations
+    'CACHE': 'default',
+    # Seconds a registration is kept
+    'TIMEOUT': 24 * 3600,
+    # Longer queries still run but are not registered; clients keep sending them in full
+    'MAX_QUERY_LENGTH': 20000,
+    # Only run documents whose hash is in the allow list, never register new ones
+    'ALLOW_LIST_ONLY': False,
+    # JSON file with either {"<sha256>": "<query>"} or a list of query strings
+    'ALLOW_LIST_FILE': None,
+}
+
+
+class PersistedQueryNotFound(Exception):
+    code = 'PERSISTED_QUERY_NOT_FOUND'
+
+    def __init__(self):
+        super().__init__('PersistedQueryNotFound')
+
+
+class PersistedQueryError(Exception):
+    code = 'PERSISTED_QUERY_ERROR'
+
+
+class PersistedQueryStore:
+    """
+    Automatic persisted queries (Apollo APQ protocol, version 1).
+
+    A client sends only extensions.persistedQuery.sha256Hash; unknown hashes
+    get PersistedQueryNotFound and the client retries with the full query,
+    which is then registered. In allow-list mode only hashes loaded from
+    ALLOW_LIST_FILE may run and nothing is registered at request time.
+
+    resolve() never writes to the cache: the middleware calls register() once
+    the request is authenticated, so anonymous clients cannot fill the cache.
+    """
+
+    def __init__(self, cache_alias='default', timeout=24 * 3600, allow_list=None, allow_list_only=False,
+                 max_query_length=20000):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+        self.max_query_length = max_query_length
+        self.allow_list = allow_list or {}
+        self.allow_list_only = allow_list_only
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_PERSISTED_QUERIES', {})}
+        if not options['ENABLED']:
+            return None
+        allow_list = load_allow_list(options['ALLOW_LIST_FILE']) if options['ALLOW_LIST_FILE'] else {}
+        return cls(
+            cache_alias=options['CACHE'],
+            timeout=options['TIMEOUT'],
+            allow_list=allow_list,
+            allow_list_only=options['ALLOW_LIST_ONLY'],
+            max_query_length=options['MAX_QUERY_LENGTH'],
+        )
+
+    def resolve(self, query, extensions):
+        """
+        Return (query, query_hash) for a request's `query` and `extensions`.
+
+        Raises PersistedQueryNotFound for an unknown hash sent without a query,
+        and PersistedQueryError for a hash mismatch or a document outside the
+        allow list.
+        """
+        query, query_hash, lookup = self._check(query, extensions)
+        if lookup:
+            query = self._found(self.cache.get(self._cache_key(query_hash)))
+        return query, query_hash
+
+    async def aresolve(self, query, extensions):
+        """resolve() for the ASGI handler, with the cache's async API."""
+        query, query_hash, lookup = self._check(query, extensions)
+        if lookup:
+            query = self._found(await self.cache.aget(self._cache_key(query_hash)))
+        return query, query_hash
+
+    def register(self, query, query_hash):
+        """Store a query resolve() accepted with its hash, for later hash-only requests."""
+        if self._registers(query, query_hash):
+            self.cache.set(self._cache_key(query_hash), query, self.timeout)
+
+    async def aregister(self, query, query_hash):
+        if self._registers(query, query_hash):
+            await self.cache.aset(self._cache_key(query_hash), query, self.timeout)
+
+    def _registers(self, query, query_hash):
+        return (
+            not self.allow_list_only and query_hash not in self.allow_list
+            and len(query) <= self.max_query_length
+        )
+
+    def _check(self, query, extensions):
+        """
+        Validate the request against the hash and allow list. Returns
+        (query, query_hash, lookup), where lookup is True when the query has
+        to be read from the cache.
+        """
+        query_hash = get_persisted_query_hash(extensions)
+        if query_hash is None:
+            if query and self.allow_list_only:
+                query_hash = hash_query(query)
+                if query_hash not in self.allow_list:
+                    raise PersistedQueryError('Query is not in the allow list')
+            return query, query_hash, False
+
+        if query:
+            if hash_query(query) != query_hash:
+                raise PersistedQueryError('Provided sha256Hash does not match query')
+            if self.allow_list_only and query_hash not in self.allow_list:
+                raise PersistedQueryError('Query is not in the allow list')
+            return query, query_hash, False
+
+        query = self.allow_list.get(query_hash)
+        if query is not None:
+            return query, query_hash, False
+        if self.allow_list_only:
+            raise PersistedQueryNotFound()
+        return None, query_hash, True
+
+    @staticmethod
+    def _found(query):
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+
+    def warm(self):
+        """Parse and validate every allow-listed document ahead of the first request."""
+        document_cache = get_document_cache()
+        for query_hash, query in self.allow_list.items():
+            document_cache.get(query, query_hash)
+
+    @staticmethod
+    def _cache_key(query_hash):
+        return 'apq:' + query_hash
+
+
+def load_allow_list(path):
+    with open(path) as f:
+        entries = json.load(f)
+    if isinstance(entries, list):
+        return {hash_query(query): query for query in entries}
+    for query_hash, query in entries.items():
+        if hash_query(query) != query_hash:
+            raise ValueError(f"Allow list entry {query_hash} does not match its query")
+    return dict(entries)
+
+
+def get_persisted_query_hash(extensions):
+    if not extensions:
+        return None
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise PersistedQueryError('Extensions are invalid JSON')
+    persisted_query = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+    if not persisted_query:
+        return None
+    if persisted_query.get('version') != 1:
+        raise PersistedQueryError('Unsupported persisted query version')
+    query_hash = persisted_query.get('sha256Hash')
+    if not isinstance(query_hash, str):
+        raise PersistedQueryError('Missing sha256Hash in persisted query')
+    return query_hash.lower()
+
+
+def persisted_query_error_response(error):
+    return {'errors': [{'message': str(error), 'extensions': {'code': error.code}}]}
+
+
+_persisted_query_store = None
+_persisted_query_store_loaded = False
+_persisted_query_store_lock = threading.Lock()
+
+
+def get_persisted_query_store():
+    """Return the configured PersistedQueryStore, or None when APQ is disabled."""
+    global _persisted_query_store, _persisted_query_store_loaded
+    if not _persisted_query_store_loaded:
+        with _persisted_query_store_lock:
+            if not _persisted_query_store_loaded:
+                _persisted_query_store = PersistedQueryStore.from_settings()
+                _persisted_query_store_loaded = True
+    return _persisted_query_store
+
+
+def reset_persisted_query_store():
+    global _persisted_query_store, _persisted_query_store_loaded
+    with _persisted_query_store_lock:
+        _persisted_query_store = None
+        _persisted_query_store_loaded = False
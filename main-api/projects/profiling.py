@@ -0,0 +1,67 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    # Profiles are written here as <operation>-<timestamp>.prof (open with pstats or snakeviz)
+    'DIRECTORY': 'profiles',
+    # Fraction of all operations profiled without a header; 0 disables sampling
+    'SAMPLE_RATE': 0.0,
+    'HEADER': 'X-Profile',
+    # Seconds a header value from issue_profile_token() stays valid
+    'MAX_AGE': 3600,
+}
+
+_signer = signing.TimestampSigner(salt='projects.profiling')
+
+
+def get_profiling_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_PROFILING', {})}
+
+
+def issue_profile_token(organization_id=None):
+    """
+    Return a value for the X-Profile header. With `organization_id` it only
+    profiles that organization's requests.
+    """
+    return _signer.sign('*' if organization_id is None else str(organization_id))
+
+
+def profile_requested(request):
+    options = get_profiling_settings()
+    value = request.headers.get(options['HEADER'])
+    if value:
+        try:
+            scope = _signer.unsign(value, max_age=options['MAX_AGE'])
+        except signing.BadSignature:
+            logger.warning("Ignoring invalid %s header", options['HEADER'])
+            return False
+        return scope == '*' or scope == str(getattr(request, 'organization_id', None))
+    rate = options['SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profile_operation(operation_name):
+    """Run the block under cProfile and write the profile to DIRECTORY."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        directory = get_profiling_settings()['DIRECTORY']
+        os.makedirs(directory, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_]', '_', operation_name or 'anonymous')
+        timestamp = time.strftime('%Y%m%dT%H%M%S') + f'{time.time() % 1:.6f}'[1:]
+        path = os.path.join(directory, f'{name}-{timestamp}.prof')
+        profiler.dump_stats(path)
+        logger.info("Profile written to %s", path)
@@ -0,0 +1,94 @@
+import re
+from collections import Counter
+from functools import wraps
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Numbers of seeded rows an operation is measured against
+SIZES = (1, 10, 100)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\(\?(?:, \?)*\)')
+
+
+def normalize_sql(sql):
+    """Replace the literals of a captured statement so repeats of it compare equal."""
+    return _LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+def repeated_statements(queries):
+    """(statement, times) for every normalized statement run more than once, most repeated first."""
+    counts = Counter(normalize_sql(query['sql']) for query in queries)
+    return [(sql, times) for sql, times in counts.most_common() if times > 1]
+
+
+def format_report(name, counts, queries):
+    sizes = ', '.join(f'{rows} rows: {count}' for rows, count in counts.items())
+    lines = [f'{name} ran {sizes} SQL queries']
+    repeated = repeated_statements(queries)
+    if repeated:
+        lines.append(f'Repeated statements with {max(counts)} rows:')
+        lines.extend(f'  {times}x {sql}' for sql, times in repeated)
+    else:
+        lines.append(f'No statement was repeated; queries with {max(counts)} rows:')
+        lines.extend(f'  {query["sql"]}' for query in queries)
+    return '\n'.join(lines)
+
+
+def measure_queries(prepare, sizes=SIZES, using=DEFAULT_DB_ALIAS):
+    """
+    Count the queries of an operation against each number of seeded rows.
+
+    prepare(rows) seeds the data and returns a callable running the
+    operation; only the callable's queries are counted. The rows of each size
+    are rolled back before the next one is seeded. Returns {rows: count} and
+    the queries captured for the last size.
+    """
+    counts = {}
+    captured = None
+    for rows in sizes:
+        with transaction.atomic(using=using):
+            operation = prepare(rows)
+            with CaptureQueriesContext(connections[using]) as captured:
+                operation()
+            transaction.set_rollback(True, using=using)
+        counts[rows] = len(captured)
+    return counts, captured.captured_queries
+
+
+def assert_query_budget(testcase, prepare, max_queries=None, sizes=SIZES, using=DEFAULT_DB_ALIAS, name=None):
+    """
+    Fail `testcase` unless the operation runs the same number of queries for
+    every size, and no more than `max_queries`. The failure message lists
+    the statements that were repeated, which is where an N+1 shows up.
+    """
+    counts, queries = measure_queries(prepare, sizes, using)
+    over_budget = max_queries is not None and max(counts.values()) > max_queries
+    if len(set(counts.values())) > 1 or over_budget:
+        report = format_report(name or getattr(prepare, '__name__', 'operation'), counts, queries)
+        if over_budget:
+            report = f'Budget of {max_queries} queries exceeded\n{report}'
+        testcase.fail(report)
+    return counts
+
+
+def query_budget(max_queries=None, sizes=SIZES, using=DEFAULT_DB_ALIAS):
+    """
+    Decorator form of assert_query_budget() for TestCase methods.
+
+    The decorated method takes the number of rows to seed and returns the
+    callable running the operation:
+
+        @query_budget(2)
+        def test_all_projects(self, rows):
+            self.seed_projects(rows)
+            return lambda: self.execute(ALL_PROJECTS)
+    """
+    def decorator(test):
+        @wraps(test)
+        def wrapper(self):
+            assert_query_budget(
+                self, lambda rows: test(self, rows), max_queries, sizes, using, name=test.__name__
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.http import parse_etags
+from graphql import parse, print_ast
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    # Alias from settings.CACHES; local-memory, file, database and shared backends all work
+    'CACHE': 'default',
+    # Seconds a response is kept; outdated ones are unreachable long before that
+    'TIMEOUT': 300,
+    # Send ETags and answer a matching If-None-Match with 304; works without ENABLED
+    'ETAGS': False,
+}
+
+
+@lru_cache(maxsize=256)
+def normalized_query_hash(query):
+    """sha256 of the query re-printed from its AST, so whitespace and comments don't matter."""
+    return hashlib.sha256(print_ast(parse(query)).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Caches the data of successful read queries per organization, and derives
+    their ETags.
+
+    Every key embeds the organization's data version. Writes never delete
+    entries: they bump the version (see bump_data_version), which makes every
+    response cached for the previous version unreachable at once, and the cache
+    backend expires those on its own. A version missing from the cache (evicted
+    or never set) restarts from the current time, so it cannot collide with a
+    version used before.
+
+    Data versions live in the cache backend, so with several worker processes
+    it must be one they share (file, database, Redis or Memcached); each
+    process has its own local-memory cache.
+    """
+
+    def __init__(self, cache_alias='default', timeout=300, enabled=True, etags=False):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+        self.enabled = enabled
+        self.etags = etags
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {})}
+        if not options['ENABLED'] and not options['ETAGS']:
+            return None
+        return cls(
+            cache_alias=options['CACHE'],
+            timeout=options['TIMEOUT'],
+            enabled=options['ENABLED'],
+            etags=options['ETAGS'],
+        )
+
+    def data_version(self, organization_id):
+        key = self._version_key(organization_id)
+        version = self.cache.get(key)
+        if version is None:
+            version = time.time_ns()
+            if not self.cache.add(key, version, None):
+                version = self.cache.get(key, version)
+        return version
+
+    async def adata_version(self, organization_id):
+        key = self._version_key(organization_id)
+        version = await self.cache.aget(key)
+        if version is None:
+            version = time.time_ns()
+            if not await self.cache.aadd(key, version, None):
+                version = await self.cache.aget(key, version)
+        return version
+
+    def bump(self, organization_id):
+        try:
+            self.cache.incr(self._version_key(organization_id))
+        except ValueError:
+            # No version yet, so nothing has been cached under it either
+            pass
+
+    def make_key(self, request, data_version, query, variables, operation_name):
+        """Return the cache key for a read query, or None if it cannot be cached."""
+        organization_id = get_organization_id(request)
+        if organization_id is None:
+            return None
+        scope = json.dumps(
+            [get_key_version(request), operation_name, variables],
+            sort_keys=True, cls=DjangoJSONEncoder,
+        )
+        return 'graphql-response:{}:{}:{}:{}'.format(
+            organization_id,
+            data_version,
+            normalized_query_hash(query),
+            hashlib.sha256(scope.encode('utf-8')).hexdigest(),
+        )
+
+    def get_key(self, request, query, variables, operation_name):
+        organization_id = get_organization_id(request)
+        if organization_id is None:
+            return None
+        return self.make_key(
+            request, self.data_version(organization_id), query, variables, operation_name
+        )
+
+    async def aget_key(self, request, query, variables, operation_name):
+        organization_id = get_organization_id(request)
+        if organization_id is None:
+            return None
+        return self.make_key(
+            request, await self.adata_version(organization_id), query, variables, operation_name
+        )
+
+    def get(self, key):
+        return self.cache.get(key) if self.enabled else None
+
+    async def aget(self, key):
+        return await self.cache.aget(key) if self.enabled else None
+
+    def set(self, key, data):
+        if self.enabled:
+            self.cache.set(key, data, self.timeout)
+
+    async def aset(self, key, data):
+        if self.enabled:
+            await self.cache.aset(key, data, self.timeout)
+
+    def get_etag(self, key):
+        # Strong: the key pins the organization, its data version and the operation
+        if not self.etags:
+            return None
+        return '"{}"'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def _version_key(organization_id):
+        return f'graphql-data-version:{organization_id}'
+
+
+def get_organization_id(request):
+    organization_id = getattr(request, 'organization_id', None)
+    if organization_id is None:
+        organization = getattr(request, 'organization', None)
+        organization_id = getattr(organization, 'pk', None)
+    return organization_id
+
+
+def get_key_version(request):
+    # Signed tokens carry the key version they were issued for; revoking tokens
+    # bumps the data version, so a revoked token cannot reach older entries and
+    # cannot share entries with the tokens issued afterwards
+    key_version = getattr(request, 'organization_key_version', None)
+    if key_version is None:
+        key_version = getattr(getattr(request, 'organization', None), 'key_version', None)
+    return key_version
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not etag or not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison
+    return etag in (tag.removeprefix('W/') for tag in parse_etags(if_none_match))
+
+
+def bump_data_version(organization):
+    """Invalidate every cached response of `organization` once the current transaction commits."""
+    response_cache = get_response_cache()
+    organization_id = getattr(organization, 'pk', organization)
+    if response_cache is not None and organization_id is not None:
+        transaction.on_commit(lambda: response_cache.bump(organization_id))
+
+
+_response_cache = None
+_response_cache_loaded = False
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the configured ResponseCache, or None when both caching and ETags are disabled."""
+    global _response_cache, _response_cache_loaded
+    if not _response_cache_loaded:
+        with _response_cache_lock:
+            if not _response_cache_loaded:
+                _response_cache = ResponseCache.from_settings()
+                _response_cache_loaded = True
+    return _response_cache
+
+
+def reset_response_cache():
+    global _response_cache, _response_cache_loaded
+    with _response_cache_lock:
+        _response_cache = None
+        _response_cache_loaded = False
@@ -1,61 +1,180 @@
 import graphene
+from django.db import transaction
+from django.db.models import F
 from graphene_django import DjangoObjectType
-from .models import Organization, Project, Task, TaskComment
+from graphene_django.debug import DjangoDebug
+from .models import Organization, Project, Task, TaskComment, TASK_STATUS_CHOICES
+from .broadcast import (
+    from_snapshot, get_broadcaster, project_channel, publish_on_commit, row_snapshot, task_channel,
+)
+from .loaders import get_loaders, then
+from .pagination import CountableConnection, keyset_paginate
+from .passwords import PasswordHasherBusy
+from .response_cache import bump_data_version
+from .tokens import issue_token
 from datetime import date
 
+TASK_STATUSES = [status for status, _ in TASK_STATUS_CHOICES]
+
 # Object Types: Define GraphQL types for your Django models
 class OrganizationType(DjangoObjectType):
     class Meta:
         model = Organization
         fields = ("id", "name", "slug", "contact_email")
 
+class TaskStatusCountType(graphene.ObjectType):
+    status = graphene.String()
+    count = graphene.Int()
+
 class ProjectType(DjangoObjectType):
     taskCount = graphene.Int()
     completedTasks = graphene.Int()
+    taskCountsByStatus = graphene.List(TaskStatusCountType)
 
     class Meta:
         model = Project
         fields = ("id", "name", "description", "status", "due_date", "organization", "task_set")
 
+    def resolve_organization(self, info):
+        return get_loaders(info).organizations.load(self.organization_id)
+
+    def resolve_task_set(self, info):
+        return get_loaders(info).tasks_by_project.load(self.pk)
+
     def resolve_taskCount(self, info):
-        return self.task_set.count()
+        return self.task_count
 
     def resolve_completedTasks(self, info):
-        return self.task_set.filter(status='DONE').count()
+        return self.done_task_count
+
+    def resolve_taskCountsByStatus(self, info):
+        counts = self.task_counts()
+        return [
+            TaskStatusCountType(status=status, count=counts.get(status, 0))
+            for status in TASK_STATUSES
+        ]
 
 class TaskType(DjangoObjectType):
     class Meta:
         model = Task
-        fields = ("id", "title", "description", "status", "assignee_email", "due_date", "project", "taskcomment_set")
+        fields = ("id", "title", "description", "status", "assignee_email", "due_date", "version", "project", "taskcomment_set")
+
+    def resolve_project(self, info):
+        return get_loaders(info).projects.load(self.project_id)
+
+    def resolve_taskcomment_set(self, info):
+        return get_loaders(info).comments_by_task.load(self.pk)
 
 class TaskCommentType(DjangoObjectType):
     class Meta:
         model = TaskComment
         fields = ("id", "content", "author_email", "timestamp", "task")
 
+    def resolve_task(self, info):
+        return get_loaders(info).tasks.load(self.task_id)
+
+class ProjectConnection(CountableConnection):
+    class Meta:
+        node = ProjectType
+
+class TaskConnection(CountableConnection):
+    class Meta:
+        node = TaskType
+
+def get_project_for_tasks(info, project_id):
+    try:
+        # Convert string project_id to int
+        project_id_int = int(project_id)
+    except ValueError:
+        raise Exception(f"Project with ID {project_id} does not exist")
+
+    def found(project):
+        # The projects loader only returns projects of the request's organization
+        if project is None:
+            raise Exception(f"Project with ID {project_id} does not exist")
+        return project
+
+    return then(get_loaders(info).projects.load(project_id_int), found)
+
 class Query(graphene.ObjectType):
     organization = graphene.Field(OrganizationType)
     all_projects = graphene.List(ProjectType)
     all_tasks = graphene.List(TaskType, project_id=graphene.String(required=True))
+    # Keyset-paginated variants of all_projects/all_tasks
+    all_projects_connection = graphene.relay.ConnectionField(ProjectConnection)
+    all_tasks_connection = graphene.relay.ConnectionField(TaskConnection, project_id=graphene.String(required=True))
+    # SQL and exceptions of this request; null unless debugging was requested (see projects.debug)
+    debug = graphene.Field(DjangoDebug, name='_debug')
+
+    # Under ASGI these resolvers return awaitables (see LoaderRegistry), so
+    # sibling root fields are fetched concurrently
 
     def resolve_organization(self, info):
         return info.context.organization
 
     def resolve_all_projects(self, info):
         request_org = info.context.organization
-        return Project.objects.filter(organization=request_org)
+        projects = Project.objects.for_org(request_org)
+        return get_loaders(info).add_projects(projects)
 
     def resolve_all_tasks(self, info, project_id):
+        loaders = get_loaders(info)
+        return then(
+            get_project_for_tasks(info, project_id),
+            lambda project: loaders.tasks_by_project.load(project.pk)
+        )
+
+    def resolve_all_projects_connection(self, info, **kwargs):
         request_org = info.context.organization
-        try:
-            # Convert string project_id to int
-            project_id_int = int(project_id)
-            project = Project.objects.get(id=project_id_int)
-            if project.organization != request_org:
-                raise Exception("Not authorized to access this project's tasks")
-            return Task.objects.filter(project_id=project_id_int)
-        except (ValueError, Project.DoesNotExist):
-            raise Exception(f"Project with ID {project_id} does not exist")   
+        loaders = get_loaders(info)
+        projects = Project.objects.for_org(request_org)
+
+        def add_nodes(connection):
+            loaders.add_projects(edge.node for edge in connection.edges)
+            return connection
+
+        return then(keyset_paginate(
+            projects, ProjectConnection,
+            count=lambda: loaders.count(projects), fetch=loaders.fetch,
+            **kwargs
+        ), add_nodes)
+
+    def resolve_all_tasks_connection(self, info, project_id, **kwargs):
+        loaders = get_loaders(info)
+
+        def paginate(project):
+            return keyset_paginate(
+                # project came from the tenant-scoped loader, so its tasks need no join
+                Task.objects.filter(project_id=project.pk), TaskConnection,
+                # The denormalized counter saves a COUNT(*) over the project's tasks
+                count=lambda: project.task_count, fetch=loaders.fetch,
+                **kwargs
+            )
+
+        def add_nodes(connection):
+            loaders.add_tasks(edge.node for edge in connection.edges)
+            return connection
+
+        return then(then(get_project_for_tasks(info, project_id), paginate), add_nodes)
+
+def data_changed(info):
+    # Every mutation calls this after writing: rows loaded earlier in the request
+    # are stale, and so are the organization's cached responses
+    get_loaders(info).clear()
+    bump_data_version(info.context.organization)
+
+def tasks_changed(info, action, tasks):
+    # Delivered to taskChanged subscribers once the mutation commits
+    organization_id = info.context.organization.pk
+    for task in tasks:
+        publish_on_commit(task_channel(organization_id, task.project_id), {
+            'action': action, 'id': task.pk, 'snapshot': row_snapshot(task),
+        })
+
+def project_changed(info, action, project):
+    publish_on_commit(project_channel(info.context.organization.pk), {
+        'action': action, 'id': project.pk, 'snapshot': row_snapshot(project),
+    })
 
 class CreateProject(graphene.Mutation):
     class Arguments:
@@ -90,6 +209,8 @@ class CreateProject(graphene.Mutation):
             due_date=parsed_due_date,
             organization=request_org
         )
+        data_changed(info)
+        project_changed(info, 'CREATED', project)
         return CreateProject(project=project)
 
 class CreateTask(graphene.Mutation):
@@ -109,9 +230,7 @@ class CreateTask(graphene.Mutation):
         try:
             # Convert string projectId to int
             project_id_int = int(projectId)
-            project = Project.objects.get(id=project_id_int)
-            if project.organization != request_org:
-                raise Exception("Not authorized to create tasks for this project")
+            project = Project.objects.for_org(request_org).get(id=project_id_int)
             
             # Parse dueDate if provided
             due_date_obj = None
@@ -134,6 +253,8 @@ class CreateTask(graphene.Mutation):
                 assignee_email=assigneeEmail,
                 due_date=due_date_obj
             )
+            data_changed(info)
+            tasks_changed(info, 'CREATED', [task])
             return CreateTask(task=task)
         except ValueError:
             raise Exception(f"Invalid project ID: {projectId}")
@@ -144,26 +265,25 @@ class UpdateTaskStatus(graphene.Mutation):
     class Arguments:
         taskId = graphene.String(required=True)
         status = graphene.String(required=True)
+        expectedVersion = graphene.Int()
 
     task = graphene.Field(TaskType)
 
     @staticmethod
-    def mutate(root, info, taskId, status):
-        request_org = info.context.organization
+    @transaction.atomic
+    def mutate(root, info, taskId, status, expectedVersion=None):
         try:
             # Convert string taskId to int
             task_id_int = int(taskId)
-            task = Task.objects.get(pk=task_id_int)
-            if task.project.organization != request_org:
-                raise Exception("Not authorized to update this task")
-            
-            task.status = status
-            task.save()
-            return UpdateTaskStatus(task=task)
         except ValueError:
             raise Exception(f"Invalid task ID: {taskId}")
-        except Task.DoesNotExist:
-            raise Exception(f"Task with ID {taskId} does not exist")
+        task = update_task(
+            info, task_id_int, {'status': status}, expectedVersion,
+            missing_message=f"Task with ID {taskId} does not exist"
+        )
+        data_changed(info)
+        tasks_changed(info, 'UPDATED', [task])
+        return UpdateTaskStatus(task=task)
 
 class DeleteTask(graphene.Mutation):
     class Arguments:
@@ -173,16 +293,18 @@ class DeleteTask(graphene.Mutation):
     message = graphene.String()
 
     @staticmethod
+    @transaction.atomic
     def mutate(root, info, taskId):
         request_org = info.context.organization
         try:
             # Convert string taskId to int
             task_id_int = int(taskId)
-            task = Task.objects.get(pk=task_id_int)
-            if task.project.organization != request_org:
-                raise Exception("Not authorized to delete this task")
+            task = Task.objects.for_org(request_org).select_for_update(of=('self',)).get(pk=task_id_int)
             
+            deleted = Task(**row_snapshot(task))
             task.delete()
+            data_changed(info)
+            tasks_changed(info, 'DELETED', [deleted])
             return DeleteTask(success=True, message="Task deleted successfully")
         except ValueError:
             raise Exception(f"Invalid task ID: {taskId}")
@@ -202,17 +324,28 @@ class DeleteProject(graphene.Mutation):
         try:
             # Convert string projectId to int
             project_id_int = int(projectId)
-            project = Project.objects.get(id=project_id_int)
-            if project.organization != request_org:
-                raise Exception("Not authorized to delete this project")
+            project = Project.objects.for_org(request_org).get(id=project_id_int)
             
+            deleted = Project(**row_snapshot(project))
             project.delete()
+            data_changed(info)
+            project_changed(info, 'DELETED', deleted)
             return DeleteProject(success=True, message="Project deleted successfully")
         except ValueError:
             raise Exception(f"Invalid project ID: {projectId}")
         except Project.DoesNotExist:
             raise Exception(f"Project {projectId} does not exist")
 
+def parse_due_date(value):
+    from datetime import datetime
+    # Extract just the date part from ISO string or parse date string
+    try:
+        if 'T' in value:
+            return datetime.fromisoformat(value.split('T')[0]).date()
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise Exception("Invalid date format")
+
 class UpdateTask(graphene.Mutation):
     class Arguments:
         taskId = graphene.String(required=True)
@@ -221,47 +354,293 @@ class UpdateTask(graphene.Mutation):
         status = graphene.String()
         assigneeEmail = graphene.String()
         dueDate = graphene.String()
+        expectedVersion = graphene.Int()
 
     task = graphene.Field(TaskType)
 
     @staticmethod
-    def mutate(root, info, taskId, title=None, description=None, status=None, assigneeEmail=None, dueDate=None):
-        request_org = info.context.organization
+    @transaction.atomic
+    def mutate(root, info, taskId, title=None, description=None, status=None, assigneeEmail=None, dueDate=None,
+               expectedVersion=None):
         try:
             # Convert string taskId to int
             task_id_int = int(taskId)
-            task = Task.objects.get(pk=task_id_int)
-            if task.project.organization != request_org:
-                raise Exception("Not authorized to update this task")
-            
-            # Update fields if provided
-            if title is not None:
-                task.title = title
-            if description is not None:
-                task.description = description
-            if status is not None:
-                task.status = status
-            if assigneeEmail is not None:
-                task.assignee_email = assigneeEmail
-            if dueDate is not None:
-                # Parse dueDate if provided
-                try:
-                    from datetime import datetime
-                    # Extract just the date part from ISO string or parse date string
-                    if 'T' in dueDate:
-                        due_date_obj = datetime.fromisoformat(dueDate.split('T')[0]).date()
-                    else:
-                        due_date_obj = datetime.strptime(dueDate, '%Y-%m-%d').date()
-                    task.due_date = due_date_obj
-                except ValueError:
-                    raise Exception("Invalid date format")
-            
-            task.save()
-            return UpdateTask(task=task)
         except ValueError:
             raise Exception(f"Invalid task ID: {taskId}")
-        except Task.DoesNotExist:
-            raise Exception(f"Task {taskId} does not exist")
+
+        # Only the provided fields are written
+        changes = {}
+        if title is not None:
+            changes['title'] = title
+        if description is not None:
+            changes['description'] = description
+        if status is not None:
+            changes['status'] = status
+        if assigneeEmail is not None:
+            changes['assignee_email'] = assigneeEmail
+        if dueDate is not None:
+            changes['due_date'] = parse_due_date(dueDate)
+
+        task = update_task(
+            info, task_id_int, changes, expectedVersion,
+            missing_message=f"Task {taskId} does not exist"
+        )
+        if changes:
+            data_changed(info)
+            tasks_changed(info, 'UPDATED', [task])
+        return UpdateTask(task=task)
+
+def update_task(info, task_id, changes, expected_version=None, missing_message=None):
+    """
+    Apply `changes` to one task of the request's organization with a single
+    UPDATE of just those columns, returning the updated Task.
+
+    With `expected_version` the update only happens if nobody else has changed
+    the task since the client read that version. Without changes nothing is
+    written and the current row is returned.
+    """
+    tasks = Task.objects.for_org(info.context.organization).filter(pk=task_id)
+    if not changes:
+        task = tasks.first()
+        if task is None:
+            raise Exception(missing_message)
+        if expected_version is not None and task.version != expected_version:
+            raise version_conflict(task_id, task.version)
+        return task
+
+    previous = None
+    if 'status' in changes:
+        # The project counters need the status being replaced, which RETURNING
+        # cannot report, so it is read (and locked) first
+        previous = tasks.select_for_update(of=('self',)).values_list(
+            'project_id', 'status', 'version'
+        ).first()
+        if previous is None:
+            raise Exception(missing_message)
+        if expected_version is not None and previous[2] != expected_version:
+            raise version_conflict(task_id, previous[2])
+
+    if expected_version is not None:
+        tasks = tasks.filter(version=expected_version)
+    updated = tasks.update_returning(**changes, version=F('version') + 1)
+    if not updated:
+        # Tell a missing task apart from a stale expectedVersion
+        current = Task.objects.for_org(info.context.organization).filter(pk=task_id).values_list(
+            'version', flat=True
+        ).first()
+        if current is None:
+            raise Exception(missing_message)
+        raise version_conflict(task_id, current)
+
+    task = updated[0]
+    if previous is not None and previous[1] != task.status:
+        Project.adjust_task_counters(task.project_id, added=[task.status], removed=[previous[1]])
+    return task
+
+def version_conflict(task_id, current_version):
+    return Exception(f"Task {task_id} was modified by someone else (current version is {current_version})")
+
+class TaskInput(graphene.InputObjectType):
+    projectId = graphene.String(required=True)
+    title = graphene.String(required=True)
+    description = graphene.String()
+    status = graphene.String()
+    assigneeEmail = graphene.String()
+    dueDate = graphene.String()
+
+class TaskUpdateInput(graphene.InputObjectType):
+    taskId = graphene.String(required=True)
+    title = graphene.String()
+    description = graphene.String()
+    status = graphene.String()
+    assigneeEmail = graphene.String()
+    dueDate = graphene.String()
+
+class TaskStatusInput(graphene.InputObjectType):
+    taskId = graphene.String(required=True)
+    status = graphene.String(required=True)
+
+class BulkItemError(graphene.ObjectType):
+    index = graphene.Int()
+    message = graphene.String()
+
+def load_tasks_for_update(info, items, errors):
+    # Parse task ids and fetch every referenced task of the request's organization
+    # with one locked query; items that fail either step are reported in `errors`.
+    request_org = info.context.organization
+    task_ids = {}
+    for index, item in enumerate(items):
+        try:
+            task_ids[index] = int(item.taskId)
+        except ValueError:
+            errors.append(BulkItemError(index=index, message=f"Invalid task ID: {item.taskId}"))
+    tasks = Task.objects.for_org(request_org).select_for_update(of=('self',)).filter(
+        pk__in=set(task_ids.values())
+    ).in_bulk()
+    found = {}
+    for index, task_id in task_ids.items():
+        if task_id in tasks:
+            found[index] = tasks[task_id]
+        else:
+            errors.append(BulkItemError(index=index, message=f"Task {items[index].taskId} does not exist"))
+    return found
+
+def save_task_updates(tasks, previous, fields):
+    # tasks: updated Task instances, previous: {pk: (project_id, status)} before the changes,
+    # fields: {pk: names of the fields changed on that task}
+    by_fields = {}
+    for task in tasks:
+        task.version += 1
+        by_fields.setdefault(tuple(sorted(fields[task.pk])), []).append(task)
+    # One bulk_update per field set, so a row only gets the columns it changed
+    for names, group in by_fields.items():
+        Task.objects.bulk_update(group, [*names, 'version'])
+    Project.adjust_task_counters_many(
+        added=[(task.project_id, task.status) for task in tasks if previous[task.pk][1] != task.status],
+        removed=[previous[task.pk] for task in tasks if previous[task.pk][1] != task.status],
+    )
+    for task in tasks:
+        task._counted = (task.project_id, task.status)
+
+class BulkCreateTasks(graphene.Mutation):
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(TaskInput), required=True)
+        allOrNothing = graphene.Boolean()
+
+    tasks = graphene.List(TaskType)
+    errors = graphene.List(BulkItemError)
+
+    @staticmethod
+    @transaction.atomic
+    def mutate(root, info, tasks, allOrNothing=False):
+        request_org = info.context.organization
+        errors = []
+        project_ids = {}
+        for index, item in enumerate(tasks):
+            try:
+                project_ids[index] = int(item.projectId)
+            except ValueError:
+                errors.append(BulkItemError(index=index, message=f"Invalid project ID: {item.projectId}"))
+
+        # Authorize every referenced project in one query
+        allowed = set(Project.objects.for_org(request_org).filter(
+            pk__in=set(project_ids.values())
+        ).values_list('pk', flat=True))
+
+        new_tasks = []
+        for index, project_id in project_ids.items():
+            item = tasks[index]
+            if project_id not in allowed:
+                errors.append(BulkItemError(index=index, message=f"Project with ID {item.projectId} does not exist"))
+                continue
+            try:
+                due_date = parse_due_date(item.dueDate) if item.dueDate else None
+            except Exception as e:
+                errors.append(BulkItemError(index=index, message=str(e)))
+                continue
+            new_tasks.append(Task(
+                project_id=project_id,
+                title=item.title,
+                description=item.description,
+                status=item.status or 'TODO',
+                assignee_email=item.assigneeEmail,
+                due_date=due_date
+            ))
+
+        errors.sort(key=lambda error: error.index)
+        if errors and allOrNothing:
+            return BulkCreateTasks(tasks=[], errors=errors)
+
+        created = Task.objects.bulk_create(new_tasks)
+        Project.adjust_task_counters_many(added=[(task.project_id, task.status) for task in created])
+        for task in created:
+            task._counted = (task.project_id, task.status)
+        data_changed(info)
+        tasks_changed(info, 'CREATED', created)
+        return BulkCreateTasks(tasks=get_loaders(info).add_tasks(created), errors=errors)
+
+class BulkUpdateTasks(graphene.Mutation):
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(TaskUpdateInput), required=True)
+        allOrNothing = graphene.Boolean()
+
+    tasks = graphene.List(TaskType)
+    errors = graphene.List(BulkItemError)
+
+    @staticmethod
+    @transaction.atomic
+    def mutate(root, info, tasks, allOrNothing=False):
+        errors = []
+        found = load_tasks_for_update(info, tasks, errors)
+
+        updated = {}
+        previous = {}
+        fields = {}
+        for index, task in sorted(found.items()):
+            item = tasks[index]
+            changes = {}
+            if item.title is not None:
+                changes['title'] = item.title
+            if item.description is not None:
+                changes['description'] = item.description
+            if item.status is not None:
+                changes['status'] = item.status
+            if item.assigneeEmail is not None:
+                changes['assignee_email'] = item.assigneeEmail
+            if item.dueDate is not None:
+                try:
+                    changes['due_date'] = parse_due_date(item.dueDate)
+                except Exception as e:
+                    errors.append(BulkItemError(index=index, message=str(e)))
+                    continue
+            if not changes:
+                continue
+            previous.setdefault(task.pk, (task.project_id, task.status))
+            for field, value in changes.items():
+                setattr(task, field, value)
+            fields.setdefault(task.pk, set()).update(changes)
+            updated[task.pk] = task
+
+        errors.sort(key=lambda error: error.index)
+        if errors and allOrNothing:
+            return BulkUpdateTasks(tasks=[], errors=errors)
+
+        if updated:
+            save_task_updates(list(updated.values()), previous, fields)
+            data_changed(info)
+            tasks_changed(info, 'UPDATED', updated.values())
+        return BulkUpdateTasks(tasks=get_loaders(info).add_tasks(updated.values()), errors=errors)
+
+class BulkUpdateTaskStatus(graphene.Mutation):
+    class Arguments:
+        updates = graphene.List(graphene.NonNull(TaskStatusInput), required=True)
+        allOrNothing = graphene.Boolean()
+
+    tasks = graphene.List(TaskType)
+    errors = graphene.List(BulkItemError)
+
+    @staticmethod
+    @transaction.atomic
+    def mutate(root, info, updates, allOrNothing=False):
+        errors = []
+        found = load_tasks_for_update(info, updates, errors)
+
+        errors.sort(key=lambda error: error.index)
+        if errors and allOrNothing:
+            return BulkUpdateTaskStatus(tasks=[], errors=errors)
+
+        updated = {}
+        previous = {}
+        for index, task in sorted(found.items()):
+            previous.setdefault(task.pk, (task.project_id, task.status))
+            task.status = updates[index].status
+            updated[task.pk] = task
+
+        if updated:
+            save_task_updates(list(updated.values()), previous, {pk: ['status'] for pk in updated})
+            data_changed(info)
+            tasks_changed(info, 'UPDATED', updated.values())
+        return BulkUpdateTaskStatus(tasks=get_loaders(info).add_tasks(updated.values()), errors=errors)
 
 class CreateTaskComment(graphene.Mutation):
     class Arguments:
@@ -277,15 +656,14 @@ class CreateTaskComment(graphene.Mutation):
         try:
             # Convert string taskId to int
             task_id_int = int(taskId)
-            task = Task.objects.get(pk=task_id_int)
-            if task.project.organization != request_org:
-                raise Exception("Not authorized to comment on this task")
+            task = Task.objects.for_org(request_org).get(pk=task_id_int)
             
             comment = TaskComment.objects.create(
                 task=task,
                 content=content,
                 author_email=authorEmail
             )
+            data_changed(info)
             return CreateTaskComment(comment=comment)
         except ValueError:
             raise Exception(f"Invalid task ID: {taskId}")
@@ -314,6 +692,7 @@ class AuthResponse(graphene.ObjectType):
     success = graphene.Boolean()
     message = graphene.String()
     api_key = graphene.String()
+    token = graphene.String()
     organization = graphene.Field(OrganizationType)
 
 class SignUpOrganization(graphene.Mutation):
@@ -345,6 +724,7 @@ class SignUpOrganization(graphene.Mutation):
                 success=True,
                 message="Organization created successfully",
                 api_key=org.api_key,
+                token=issue_token(org),
                 organization=org
             )
         except Exception as e:
@@ -367,12 +747,17 @@ class LoginOrganization(graphene.Mutation):
             org = Organization.objects.get(contact_email=email)
             
             if org.check_password(password):
-                            return AuthResponse(
-                success=True,
-                message="Login successful",
-                api_key=org.api_key,
-                organization=org
-            )
+                if org.password_needs_rehash():
+                    # The configured bcrypt cost changed since this hash was made
+                    org.password = password
+                    org.save(update_fields=['password'])
+                return AuthResponse(
+                    success=True,
+                    message="Login successful",
+                    api_key=org.api_key,
+                    token=issue_token(org),
+                    organization=org
+                )
             else:
                 return AuthResponse(
                     success=False,
@@ -386,6 +771,12 @@ class LoginOrganization(graphene.Mutation):
                 message="Organization not found",
                 api_key=None
             )
+        except PasswordHasherBusy as e:
+            return AuthResponse(
+                success=False,
+                message=str(e),
+                api_key=None
+            )
 
 
 class Mutation(graphene.ObjectType):
@@ -397,7 +788,55 @@ class Mutation(graphene.ObjectType):
     delete_task = DeleteTask.Field()
     delete_project = DeleteProject.Field()
     create_task_comment = CreateTaskComment.Field()
+    bulk_create_tasks = BulkCreateTasks.Field()
+    bulk_update_tasks = BulkUpdateTasks.Field()
+    bulk_update_task_status = BulkUpdateTaskStatus.Field()
     sign_up_organization = SignUpOrganization.Field()
     login_organization = LoginOrganization.Field()
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+class TaskChangedEvent(graphene.ObjectType):
+    action = graphene.String()
+    task = graphene.Field(TaskType)
+
+class ProjectChangedEvent(graphene.ObjectType):
+    action = graphene.String()
+    project = graphene.Field(ProjectType)
+
+def changed_row(model, loader, message):
+    # Events carry a snapshot of the row as it was written; without one (see
+    # PostgresBackend) the current row is loaded instead
+    if message.get('snapshot') is None:
+        return loader.load(message['id'])
+    return from_snapshot(model, message['snapshot'])
+
+class Subscription(graphene.ObjectType):
+    """Served over WebSockets only, see projects.websockets."""
+    task_changed = graphene.Field(TaskChangedEvent, project_id=graphene.String(required=True))
+    project_changed = graphene.Field(ProjectChangedEvent)
+
+    async def subscribe_task_changed(root, info, project_id):
+        project = await get_project_for_tasks(info, project_id)
+        channel = task_channel(info.context.organization.pk, project.pk)
+        async for message in get_broadcaster().subscribe(channel):
+            yield message
+
+    async def subscribe_project_changed(root, info):
+        async for message in get_broadcaster().subscribe(project_channel(info.context.organization.pk)):
+            yield message
+
+    # Each event is resolved like a separate query: rows loaded for earlier
+    # events are stale by now
+
+    def resolve_task_changed(message, info, project_id):
+        loaders = get_loaders(info)
+        loaders.clear()
+        return TaskChangedEvent(action=message['action'], task=changed_row(Task, loaders.tasks, message))
+
+    def resolve_project_changed(message, info):
+        loaders = get_loaders(info)
+        loaders.clear()
+        return ProjectChangedEvent(
+            action=message['action'], project=changed_row(Project, loaders.projects, message)
+        )
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
\ No newline at end of file
@@ -0,0 +1,95 @@
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .broadcast import reset_broadcaster
+from .documents import reset_document_cache
+from .metrics import reset_metrics
+from .models import Organization, Project, Task, TaskComment
+from .org_cache import get_organization_cache, reset_organization_cache
+from .passwords import reset_password_hasher
+from .persisted import reset_persisted_query_store
+from .response_cache import bump_data_version, get_response_cache, reset_response_cache
+from .slow_queries import reset_slow_query_log, slow_query_wrapper
+
+
+@receiver(pre_save, sender=Organization)
+def remember_previous_api_key(sender, instance, **kwargs):
+    # A rotated key must be invalidated too, not only the one being saved
+    instance._previous_api_key = None
+    if instance.pk is not None:
+        instance._previous_api_key = (
+            Organization.objects.filter(pk=instance.pk).values_list('api_key', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_cache(sender, instance, **kwargs):
+    get_organization_cache().invalidate(
+        instance.api_key,
+        getattr(instance, '_previous_api_key', None),
+        organization_id=instance.pk,
+    )
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Mutations bump the data version themselves; this covers writes made
+    # elsewhere (admin, shell, management commands). Bulk writes send no signals.
+    if get_response_cache() is None:
+        return
+    origin = kwargs.get('origin')
+    if isinstance(origin, Model) and origin is not instance:
+        # Cascaded from deleting `origin`, whose own signal bumps the same organization
+        return
+    bump_data_version(get_organization_id(instance))
+
+
+def get_organization_id(instance):
+    if isinstance(instance, Organization):
+        return instance.pk
+    if isinstance(instance, Project):
+        return instance.organization_id
+    if isinstance(instance, Task):
+        if Task.project.is_cached(instance):
+            return instance.project.organization_id
+        project_id = instance.project_id
+    else:
+        project_id = Task.objects.filter(pk=instance.task_id).values_list('project_id', flat=True).first()
+    return Project.objects.filter(pk=project_id).values_list('organization_id', flat=True).first()
+
+
+@receiver(connection_created)
+def install_slow_query_wrapper(sender, connection, **kwargs):
+    # Sent again when the same connection reconnects
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+@receiver(setting_changed)
+def cache_setting_changed(setting, **kwargs):
+    if setting == 'ORGANIZATION_CACHE':
+        reset_organization_cache()
+    elif setting == 'GRAPHQL_DOCUMENT_CACHE':
+        reset_document_cache()
+    elif setting == 'GRAPHQL_PERSISTED_QUERIES':
+        reset_persisted_query_store()
+    elif setting == 'PASSWORD_HASHING':
+        reset_password_hasher()
+    elif setting == 'GRAPHQL_RESPONSE_CACHE':
+        reset_response_cache()
+    elif setting == 'GRAPHQL_SUBSCRIPTIONS':
+        reset_broadcaster()
+    elif setting == 'GRAPHQL_METRICS':
+        reset_metrics()
+    elif setting == 'GRAPHQL_SLOW_QUERIES':
+        reset_slow_query_log()
@@ -0,0 +1,268 @@
+import inspect
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from graphql import get_named_type, is_leaf_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    # Statements taking longer than this are recorded
+    'THRESHOLD_MS': 100,
+    # Also record the plan of each slow statement; EXPLAIN_ANALYZE runs slow
+    # SELECTs again with EXPLAIN ANALYZE where the database supports it (PostgreSQL)
+    'EXPLAIN': False,
+    'EXPLAIN_ANALYZE': False,
+    # Alias from settings.CACHES holding the ring buffer. Give it a cache of its own,
+    # shared with `manage.py slow_queries`: in a local-memory cache the records are
+    # invisible to other processes and evict the entries of everything else
+    'CACHE': 'default',
+    # Records kept; the oldest is overwritten first
+    'SIZE': 500,
+    'TIMEOUT': 7 * 24 * 3600,
+    # Slow statements waiting to be explained and stored; more are dropped
+    'QUEUE_SIZE': 100,
+    # SQL text is truncated to this many characters; parameters are never stored
+    'MAX_SQL_LENGTH': 4000,
+}
+
+# (operation name, organization id) of the GraphQL operation being executed
+current_operation = ContextVar('slow_queries_operation', default=None)
+# graphql-core Path of the resolver that is running
+current_path = ContextVar('slow_queries_path', default=None)
+
+
+class SlowQueryLog:
+    """
+    Records SQL statements slower than THRESHOLD_MS, with the GraphQL
+    operation, resolver path and organization they ran for.
+
+    The wrapper is installed on every database connection (see
+    projects.signals), so it also sees statements run outside of GraphQL and
+    by the async ORM. Timing a statement is all the request thread does:
+    recording, and the optional EXPLAIN, happen on a background thread with
+    its own connection, in a ring buffer of SIZE records kept in the cache.
+    """
+
+    def __init__(self, threshold_ms=100, explain=False, explain_analyze=False, cache_alias='default',
+                 size=500, timeout=7 * 24 * 3600, queue_size=100, max_sql_length=4000):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain or explain_analyze
+        self.explain_analyze = explain_analyze
+        self.cache = caches[cache_alias]
+        self.cache_alias = cache_alias
+        self.size = size
+        self.timeout = timeout
+        self.max_sql_length = max_sql_length
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_SETTINGS, **getattr(settings, 'GRAPHQL_SLOW_QUERIES', {})}
+        if not options['ENABLED']:
+            return None
+        return cls(
+            threshold_ms=options['THRESHOLD_MS'],
+            explain=options['EXPLAIN'],
+            explain_analyze=options['EXPLAIN_ANALYZE'],
+            cache_alias=options['CACHE'],
+            size=options['SIZE'],
+            timeout=options['TIMEOUT'],
+            queue_size=options['QUEUE_SIZE'],
+            max_sql_length=options['MAX_SQL_LENGTH'],
+        )
+
+    def observe(self, alias, sql, params, many, duration):
+        if duration < self.threshold or sql.startswith('EXPLAIN'):
+            return
+        operation_name, organization_id = current_operation.get() or (None, None)
+        path = current_path.get()
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            'many': many,
+            'alias': alias,
+            'operation': operation_name,
+            'path': '.'.join(str(key) for key in path.as_list()) if path is not None else None,
+            'organization_id': organization_id,
+        }
+        try:
+            self._queue.put_nowait((record, sql, params))
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._start_worker()
+
+    @property
+    def is_process_local(self):
+        """Whether the ring buffer lives in a cache only this process can read."""
+        return isinstance(self.cache, LocMemCache)
+
+    def records(self):
+        """Stored records, oldest first."""
+        keys = [self._slot_key(slot) for slot in range(self.size)]
+        return sorted(self.cache.get_many(keys).values(), key=lambda record: record['time'])
+
+    def clear(self):
+        self.cache.delete_many([self._slot_key(slot) for slot in range(self.size)])
+        self.cache.delete(self._counter_key())
+
+    def flush(self):
+        """Wait until every queued statement has been recorded."""
+        self._queue.join()
+
+    def _start_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._work, name='slow-query-log', daemon=True)
+                    self._worker.start()
+
+    def _work(self):
+        while True:
+            record, sql, params = self._queue.get()
+            try:
+                if self.explain:
+                    # The full statement: a truncated one no longer matches the parameters
+                    try:
+                        record['plan'] = self._explain(record, sql, params)
+                    except Exception as e:
+                        logger.warning("Could not explain slow query: %s", e)
+                record['sql'] = sql[:self.max_sql_length]
+                self._store(record)
+            except Exception as e:
+                logger.warning("Could not record slow query: %s", e)
+            finally:
+                connections.close_all()
+                self._queue.task_done()
+
+    def _explain(self, record, sql, params):
+        if record['many']:
+            return None
+        connection = connections[record['alias']]
+        if not connection.features.supports_explaining_query_execution:
+            return None
+        is_select = sql.lstrip()[:6].upper() == 'SELECT'
+        if self.explain_analyze and is_select and connection.vendor == 'postgresql':
+            # ANALYZE executes the statement, so never for writes
+            prefix = connection.ops.explain_query_prefix(analyze=True)
+        else:
+            prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def _store(self, record):
+        key = self._counter_key()
+        self.cache.add(key, 0, None)
+        try:
+            position = self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.set(key, 1, None)
+            position = 1
+        self.cache.set(self._slot_key(position % self.size), record, self.timeout)
+
+    @staticmethod
+    def _slot_key(slot):
+        return f'slow-queries:{slot}'
+
+    @staticmethod
+    def _counter_key():
+        return 'slow-queries:position'
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper() callable timing every statement."""
+    slow_query_log = get_slow_query_log()
+    if slow_query_log is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        slow_query_log.observe(
+            context['connection'].alias, sql, params, many, time.perf_counter() - started
+        )
+
+
+@contextmanager
+def track_slow_queries(operation_name, organization_id):
+    """Label the statements recorded inside the block with the GraphQL operation."""
+    token = current_operation.set((operation_name, organization_id))
+    try:
+        yield
+    finally:
+        current_operation.reset(token)
+
+
+class ResolverPathMiddleware:
+    """
+    Graphene middleware making the path of the running resolver available to
+    the slow query log. Leaf fields below the root run no SQL and are skipped.
+    """
+
+    def __init__(self):
+        self._tracked = {}
+
+    def resolve(self, next, root, info, **args):
+        key = (info.parent_type, info.field_name)
+        tracked = self._tracked.get(key)
+        if tracked is None:
+            tracked = self._tracked[key] = (
+                info.path.prev is None or not is_leaf_type(get_named_type(info.return_type))
+            )
+        if not tracked:
+            return next(root, info, **args)
+        token = current_path.set(info.path)
+        try:
+            result = next(root, info, **args)
+        finally:
+            current_path.reset(token)
+        if inspect.isawaitable(result):
+            return self.resolve_awaitable(result, info.path)
+        return result
+
+    async def resolve_awaitable(self, result, path):
+        token = current_path.set(path)
+        try:
+            return await result
+        finally:
+            current_path.reset(token)
+
+
+resolver_path_middleware = ResolverPathMiddleware()
+
+_slow_query_log = None
+_slow_query_log_loaded = False
+_slow_query_log_lock = threading.Lock()
+
+
+def get_slow_query_log():
+    """Return the configured SlowQueryLog, or None when it is disabled."""
+    global _slow_query_log, _slow_query_log_loaded
+    if not _slow_query_log_loaded:
+        with _slow_query_log_lock:
+            if not _slow_query_log_loaded:
+                _slow_query_log = SlowQueryLog.from_settings()
+                _slow_query_log_loaded = True
+    return _slow_query_log
+
+
+def reset_slow_query_log():
+    global _slow_query_log, _slow_query_log_loaded
+    with _slow_query_log_lock:
+        _slow_query_log = None
+        _slow_query_log_loaded = False
@@ -0,0 +1,178 @@
+import json
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from .documents import hash_query
+from .models import Organization, Project, Task, TaskComment
+from .org_cache import reset_organization_cache
+from .schema import schema
+from .tokens import issue_token
+from .views import AsyncOrganizationGraphQLView
+
+urlpatterns = [
+    path('graphql/', csrf_exempt(AsyncOrganizationGraphQLView.as_view(schema=schema))),
+]
+
+NESTED_QUERY = '''
+{
+    allProjects {
+        name
+        organization { name }
+        taskSet {
+            title
+            project { name }
+            taskcommentSet { content task { title } }
+        }
+    }
+}
+'''
+
+
+@override_settings(ROOT_URLCONF='projects.test_async')
+class AsyncGraphQLViewTest(TestCase):
+    def setUp(self):
+        reset_organization_cache()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.projects = []
+        for i in range(2):
+            project = Project.objects.create(organization=self.org, name=f'Project {i}')
+            self.projects.append(project)
+            for j in range(2):
+                task = Task.objects.create(project=project, title=f'Task {i}.{j}')
+                TaskComment.objects.create(task=task, content=f'Comment {i}.{j}', author_email='a@example.com')
+
+    def post_query(self, query, api_key=None, extra_headers=None, **variables):
+        headers = {'X-API-Key': api_key} if api_key else {}
+        headers.update(extra_headers or {})
+        return async_to_sync(AsyncClient().post)(
+            '/graphql/',
+            data=json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json',
+            headers=headers,
+        )
+
+    def test_nested_query_is_batched(self):
+        """Test that async resolvers batch each nesting level into one query"""
+        # API key, projects, tasks, comments; organization and parents are primed
+        with self.assertNumQueries(4):
+            response = self.post_query(NESTED_QUERY, self.org.api_key)
+        projects = response.json()['data']['allProjects']
+        self.assertEqual([p['name'] for p in projects], ['Project 0', 'Project 1'])
+        self.assertEqual(projects[1]['organization']['name'], 'Test Organization')
+        task = projects[1]['taskSet'][0]
+        self.assertEqual(task['title'], 'Task 1.0')
+        self.assertEqual(task['project']['name'], 'Project 1')
+        self.assertEqual(task['taskcommentSet'][0]['task']['title'], 'Task 1.0')
+
+    def test_sibling_fields_resolve_concurrently(self):
+        """Test that sibling root fields share one batched lookup"""
+        query = '''
+        query Tasks($first: String!, $second: String!) {
+            first: allTasks(projectId: $first) { title }
+            second: allTasks(projectId: $second) { title }
+        }
+        '''
+        # API key, then both projects and both task lists in one IN (...) query each
+        with self.assertNumQueries(3):
+            response = self.post_query(
+                query, self.org.api_key,
+                first=str(self.projects[0].pk), second=str(self.projects[1].pk)
+            )
+        data = response.json()['data']
+        self.assertEqual([t['title'] for t in data['first']], ['Task 0.0', 'Task 0.1'])
+        self.assertEqual([t['title'] for t in data['second']], ['Task 1.0', 'Task 1.1'])
+
+    def test_connection_total_count(self):
+        """Test that keyset pages and totalCount are fetched with the async ORM"""
+        query = '{ allProjectsConnection(first: 1) { totalCount edges { node { name } } } }'
+        response = self.post_query(query, self.org.api_key)
+        connection = response.json()['data']['allProjectsConnection']
+        self.assertEqual(connection['totalCount'], 2)
+        self.assertEqual(connection['edges'][0]['node']['name'], 'Project 0')
+
+    def test_mutations_run_in_a_transaction(self):
+        """Test that mutations still execute through the synchronous path"""
+        query = '''
+        mutation Create($projectId: String!) {
+            createTask(projectId: $projectId, title: "New", status: "DONE") { task { title } }
+        }
+        '''
+        response = self.post_query(query, self.org.api_key, projectId=str(self.projects[0].pk))
+        self.assertEqual(response.json()['data']['createTask']['task']['title'], 'New')
+        self.projects[0].refresh_from_db()
+        self.assertEqual(self.projects[0].done_task_count, 1)
+
+    def test_authentication(self):
+        """Test that the async middleware accepts API keys and tokens and rejects the rest"""
+        response = self.post_query('{ organization { name } }', 'not-a-key')
+        self.assertEqual(response.status_code, 401)
+
+        token = issue_token(self.org)
+        response = self.post_query('{ organization { name } }', token)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+        self.org.revoke_tokens()
+        response = self.post_query('{ organization { name } }', token)
+        self.assertEqual(response.json()['errors'][0]['message'], 'API token has been revoked')
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE={'ETAGS': True})
+    def test_etag_not_modified(self):
+        """Test that the async view answers a matching If-None-Match with 304"""
+        response = self.post_query('{ allProjects { name } }', self.org.api_key)
+        response = self.post_query(
+            '{ allProjects { name } }', self.org.api_key, {'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(
+    ROOT_URLCONF='projects.test_async',
+    CACHES={
+        **settings.CACHES,
+        'persisted_queries': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'test_persisted_queries',
+        },
+    },
+    GRAPHQL_PERSISTED_QUERIES={'CACHE': 'persisted_queries'},
+)
+class AsyncPersistedQueryTest(TestCase):
+    def setUp(self):
+        call_command('createcachetable', 'test_persisted_queries')
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.extensions = {'persistedQuery': {'version': 1, 'sha256Hash': hash_query('{ organization { name } }')}}
+
+    def post(self, payload):
+        return async_to_sync(AsyncClient().post)(
+            '/graphql/', data=json.dumps(payload), content_type='application/json',
+            headers={'X-API-Key': self.org.api_key},
+        )
+
+    def test_round_trip_with_database_cache(self):
+        """Test that APQ registrations and lookups use the async cache API under ASGI"""
+        response = self.post({'extensions': self.extensions})
+        self.assertEqual(response.json()['errors'][0]['message'], 'PersistedQueryNotFound')
+
+        response = self.post({'query': '{ organization { name } }', 'extensions': self.extensions})
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+        response = self.post({'extensions': self.extensions})
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+        response = async_to_sync(AsyncClient().get)(
+            '/graphql/', {'extensions': json.dumps(self.extensions)},
+            headers={'Accept': 'application/json', 'X-API-Key': self.org.api_key},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from .benchmark import BenchmarkData, OPERATIONS, build_plan, compare_results, percentile, summarize
+from .models import Organization
+
+
+class BenchmarkPlanTest(TestCase):
+    def setUp(self):
+        self.data = BenchmarkData(projects=2, tasks=2)
+        self.data.seed()
+
+    def test_plan_is_reproducible(self):
+        """Test that the same seed sends the same requests in exactly the configured mix"""
+        mix = {'GetProjects': 3, 'GetTasks': 2, 'LoginOrganization': 1}
+        plan = build_plan(mix, 7, self.data, seed=1)
+        self.assertEqual(plan, build_plan(mix, 7, self.data, seed=1))
+        self.assertNotEqual(plan, build_plan(mix, 7, self.data, seed=2))
+        names = [name for name, _ in plan]
+        self.assertEqual(
+            {name: names.count(name) for name in mix}, {'GetProjects': 4, 'GetTasks': 2, 'LoginOrganization': 1}
+        )
+
+
+class BenchmarkStatisticsTest(TestCase):
+    def test_percentiles(self):
+        """Test that percentiles use the nearest rank"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_summary_and_comparison(self):
+        """Test that errors and queries are reported per operation and changes in percent"""
+        samples = [('GetProjects', 0.01, None, 1), ('GetProjects', 0.03, 'database is locked', 3)]
+        summary, operations = summarize(samples, elapsed=2)
+        self.assertEqual(summary['throughput'], 1)
+        self.assertEqual(operations['GetProjects']['errors'], 1)
+        self.assertEqual(operations['GetProjects']['error_messages'], {'database is locked': 1})
+        self.assertEqual(operations['GetProjects']['queries_per_request'], 2)
+        self.assertEqual(operations['GetProjects']['latency_ms']['p99'], 30)
+
+        baseline = {'version': 1, 'summary': summary, 'operations': operations}
+        faster = {'version': 1, 'summary': {**summary, 'throughput': 2}, 'operations': operations}
+        self.assertIn(('all', 'throughput', 1, 2, 100.0), compare_results(baseline, faster))
+
+
+@override_settings(PASSWORD_HASHING={'ROUNDS': 4})
+class BenchmarkCommandTest(TestCase):
+    def test_in_process_run(self):
+        """Test that every operation runs without errors and the results are written as JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            options = ['--requests', '10', '--warmup', '5', '--concurrency', '1', '--projects', '2',
+                       '--tasks', '3', '--mix', ','.join(OPERATIONS), '--output', output]
+            stdout = StringIO()
+            call_command('benchmark_graphql', *options, stdout=stdout, stderr=StringIO())
+            with open(output) as f:
+                results = json.load(f)
+
+            call_command('benchmark_graphql', *options, '--compare', output, stdout=stdout, stderr=StringIO())
+
+        self.assertEqual(set(results['operations']), set(OPERATIONS))
+        self.assertEqual(results['summary']['requests'], 10)
+        self.assertEqual(results['summary']['errors'], 0)
+        self.assertEqual(results['environment']['target'], 'in-process')
+        self.assertEqual(results['operations']['GetProjects']['queries_per_request'], 1)
+        self.assertIn('GetTasks           p95 ms', stdout.getvalue())
+        # The benchmark organization is deleted afterwards
+        self.assertFalse(Organization.objects.exists())
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase
+from .models import Organization, Project, Task, TaskComment
+
+
+class QueryIndexTest(TestCase):
+    """
+    Each index in models.py exists for a query shape used by the schema. These
+    tests EXPLAIN that shape so a change to either side cannot silently fall
+    back to a sequential scan. Runs against SQLite and PostgreSQL.
+    """
+
+    def assertUsesIndex(self, queryset, *index_names):
+        if connection.vendor == 'postgresql':
+            # Test tables are tiny, so the planner would otherwise prefer a seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertTrue(
+            any(index_name in plan for index_name in index_names),
+            f"Expected one of {', '.join(index_names)} in plan:\n{plan}"
+        )
+
+    def test_organization_contact_email(self):
+        """SignUpOrganization/LoginOrganization email lookups"""
+        self.assertUsesIndex(
+            Organization.objects.filter(contact_email='test@example.com'),
+            'org_contact_email_idx'
+        )
+
+    def test_projects_of_organization(self):
+        """allProjects and allProjectsConnection pages"""
+        self.assertUsesIndex(
+            Project.objects.filter(organization_id=1, pk__gt=10).order_by('pk'),
+            'project_org_id_idx'
+        )
+
+    def test_projects_by_due_date(self):
+        """Projects of an organization ordered by due date"""
+        self.assertUsesIndex(
+            Project.objects.filter(organization_id=1, due_date__isnull=False).order_by('due_date'),
+            'project_org_due_date_idx'
+        )
+
+    def test_tasks_of_project(self):
+        """allTasks, allTasksConnection pages and the tasks-by-project loader"""
+        self.assertUsesIndex(
+            Task.objects.filter(project_id=1, pk__gt=10).order_by('pk'),
+            'task_project_id_idx'
+        )
+        # Several projects need a sort either way, so any index leading with project works
+        self.assertUsesIndex(
+            Task.objects.filter(project_id__in=[1, 2]).order_by('pk'),
+            'task_project_id_idx', 'task_project_status_idx', 'task_project_due_date_idx'
+        )
+
+    def test_tasks_by_status(self):
+        """Per-status task filters and counts within a project"""
+        self.assertUsesIndex(
+            Task.objects.filter(project_id=1, status='DONE'),
+            'task_project_status_idx'
+        )
+
+    def test_tasks_by_due_date(self):
+        """Tasks of a project ordered by due date"""
+        self.assertUsesIndex(
+            Task.objects.filter(project_id=1, due_date__isnull=False).order_by('due_date'),
+            'task_project_due_date_idx'
+        )
+
+    def test_comments_of_tasks(self):
+        """The comments-by-task loader"""
+        self.assertUsesIndex(
+            TaskComment.objects.filter(task_id__in=[1, 2]).order_by('pk'),
+            'comment_task_id_idx'
+        )
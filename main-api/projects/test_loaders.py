@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test import TestCase
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from .models import Organization, Project, Task, TaskComment
+from .schema import schema
+from .loaders import BatchLoader
+
+
+NESTED_PROJECTS_QUERY = '''
+query {
+    allProjects {
+        id
+        organization { name }
+        taskSet {
+            id
+            project { id }
+            taskcommentSet {
+                content
+                task { id }
+            }
+        }
+    }
+}
+'''
+
+
+class BatchLoaderTest(TestCase):
+    def test_queued_keys_are_loaded_in_one_batch(self):
+        """Test that load() fetches every queued key with a single batch call"""
+        calls = []
+
+        def batch_load(keys):
+            calls.append(list(keys))
+            return {key: key * 10 for key in keys}
+
+        loader = BatchLoader(batch_load)
+        loader.queue([1, 2, 3])
+        self.assertEqual(loader.load(1), 10)
+        self.assertEqual(loader.load(3), 30)
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_missing_keys_use_default(self):
+        """Test that keys absent from the batch result fall back to the default"""
+        loader = BatchLoader(lambda keys: {}, default_factory=list)
+        self.assertEqual(loader.load(1), [])
+
+
+class NestedQueryBatchingTest(TestCase):
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def seed(self, count):
+        for i in range(count):
+            project = Project.objects.create(organization=self.org, name=f'Project {i}')
+            for j in range(2):
+                task = Task.objects.create(project=project, title=f'Task {i}.{j}')
+                TaskComment.objects.create(task=task, content='Comment', author_email='a@example.com')
+
+    def execute(self, query):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        return self.client.execute(query, context_value=request)
+
+    def test_nested_query_count_is_constant(self):
+        """Test that nested relations cost one query per level regardless of row count"""
+        self.seed(1)
+        with self.assertNumQueries(3):
+            result = self.execute(NESTED_PROJECTS_QUERY)
+        self.assertIsNone(result.get('errors'))
+
+        self.seed(9)
+        with self.assertNumQueries(3):
+            result = self.execute(NESTED_PROJECTS_QUERY)
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(len(result['data']['allProjects']), 10)
+        for project in result['data']['allProjects']:
+            self.assertEqual(len(project['taskSet']), 2)
+            self.assertEqual(len(project['taskSet'][0]['taskcommentSet']), 1)
+            self.assertEqual(project['taskSet'][0]['project']['id'], project['id'])
+
+    def test_unselected_relations_are_not_fetched(self):
+        """Test that a root lookup does not fetch the tasks of every project listed beside it"""
+        self.seed(3)
+        project = Project.objects.order_by('pk').first()
+        query = '{ allProjects { id } allTasks(projectId: "%s") { id } }' % project.pk
+        with CaptureQueriesContext(connection) as queries:
+            result = self.execute(query)
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(len(result['data']['allTasks']), 2)
+        [tasks_query] = [query['sql'] for query in queries if 'projects_task' in query['sql']]
+        self.assertIn(f'IN ({project.pk})', tasks_query)
@@ -0,0 +1,115 @@
+import json
+import logging
+import threading
+from django.conf import settings
+from django.test import TestCase
+from .log_queue import BoundedQueueHandler, JsonFormatter, SamplingFilter, configure_logging
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.append(threading.current_thread())
+
+
+class FormattedIn:
+    """Remembers the thread that formatted it."""
+
+    def __str__(self):
+        self.thread = threading.current_thread()
+        return 'formatted'
+
+
+class BoundedQueueHandlerTest(TestCase):
+    def setUp(self):
+        self.target = CollectingHandler('test-collector')
+        self.logger = logging.Logger('test-log-queue')
+
+    def record(self, msg, *args):
+        return self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, msg, args, None)
+
+    def test_records_are_formatted_by_the_writer_thread(self):
+        """Test that records reach the target handlers and are formatted off the calling thread"""
+        handler = BoundedQueueHandler(['test-collector'])
+        argument = FormattedIn()
+        handler.handle(self.record('Value: %s', argument))
+        handler.stop()
+        self.assertEqual(self.target.records, ['Value: formatted'])
+        self.assertIsNot(argument.thread, threading.current_thread())
+        self.assertIs(self.target.threads[0], argument.thread)
+        handler.close()
+
+    def test_full_queue_drops_and_counts(self):
+        """Test that a full queue drops records without blocking and reports how many"""
+        handler = BoundedQueueHandler(['test-collector'], maxsize=2)
+        handler.start()
+        handler.stop()
+        for n in range(4):
+            handler.handle(self.record('Record %d', n))
+        self.assertEqual(handler.dropped, 2)
+
+        handler.queue.get_nowait()
+        handler.queue.get_nowait()
+        handler.handle(self.record('Record %d', 4))
+        handler.listener.start()
+        handler.stop()
+        self.assertEqual(self.target.records, ['Record 4', 'Log queue full, dropped 2 records'])
+        handler.close()
+
+    def test_unknown_handler(self):
+        """Test that a misspelt target handler fails loudly"""
+        with self.assertRaises(ValueError):
+            BoundedQueueHandler(['does-not-exist']).start()
+
+    def test_configured_before_its_targets(self):
+        """Test that LOGGING may define the queue handler before the handlers it writes to"""
+        try:
+            configure_logging({
+                'version': 1,
+                'disable_existing_loggers': False,
+                'handlers': {
+                    'a-queue': {'()': BoundedQueueHandler, 'handlers': ['b-collector']},
+                    'b-collector': {'()': CollectingHandler, 'name': 'b-collector'},
+                },
+                'loggers': {'test-log-queue-config': {'handlers': ['a-queue'], 'propagate': False}},
+            })
+            [handler] = logging.getLogger('test-log-queue-config').handlers
+            handler.handle(self.record('Record'))
+            handler.stop()
+            [target] = handler.listener.handlers
+            self.assertEqual(target.records, ['Record'])
+        finally:
+            logging.getLogger('test-log-queue-config').handlers.clear()
+            configure_logging(settings.LOGGING)
+
+
+class SamplingFilterTest(TestCase):
+    def test_only_low_levels_are_sampled(self):
+        """Test that sampling never drops warnings and errors"""
+        sampling = SamplingFilter(rate=0)
+        logger = logging.Logger('test-sampling')
+        info = logger.makeRecord(logger.name, logging.INFO, __file__, 0, 'info', (), None)
+        warning = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, 'warning', (), None)
+        self.assertFalse(sampling.filter(info))
+        self.assertTrue(sampling.filter(warning))
+        self.assertTrue(SamplingFilter(rate=1).filter(info))
+
+
+class JsonFormatterTest(TestCase):
+    def test_extra_fields(self):
+        """Test that fields passed with extra= become JSON keys"""
+        logger = logging.Logger('test-json')
+        record = logger.makeRecord(
+            logger.name, logging.INFO, __file__, 0, 'Organization found: %s', ('Acme',), None,
+            extra={'organization_id': 7},
+        )
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'Organization found: Acme')
+        self.assertEqual(entry['organization_id'], 7)
+        self.assertEqual(entry['level'], 'INFO')
@@ -0,0 +1,105 @@
+import json
+from django.test import TestCase, Client, override_settings
+from .metrics import Histogram
+from .models import Organization, Project, Task
+
+
+class HistogramTest(TestCase):
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts every observation up to its bound"""
+        histogram = Histogram('latency_seconds', 'Latency.', ('field',), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(('Query.a',), value)
+        self.assertEqual(histogram.expose()[2:], [
+            'latency_seconds_bucket{field="Query.a",le="0.1"} 2',
+            'latency_seconds_bucket{field="Query.a",le="1"} 3',
+            'latency_seconds_bucket{field="Query.a",le="+Inf"} 4',
+            'latency_seconds_sum{field="Query.a"} 3.65',
+            'latency_seconds_count{field="Query.a"} 4',
+        ])
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        project = Project.objects.create(organization=self.org, name='Test Project')
+        Task.objects.create(project=project, title='Task')
+
+    def post_query(self, query, operation_name=None):
+        return Client().post(
+            '/graphql/', data=json.dumps({'query': query, 'operationName': operation_name}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+        )
+
+    def scrape(self, **headers):
+        response = Client().get('/metrics', **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_operation_field_and_sql_metrics(self):
+        """Test that operations are labelled by name and tier, with their fields and SQL"""
+        with override_settings(GRAPHQL_METRICS={'ENABLED': True, 'ORGANIZATION_TIERS': {self.org.pk: 'enterprise'}}):
+            self.post_query('query Projects { allProjects { name taskSet { title } } }')
+            lines = self.scrape()
+
+        labels = '{operation="Projects",type="query",tier="enterprise",cached="no"}'
+        self.assertIn(f'graphql_operation_duration_seconds_count{labels} 1', lines)
+        # Projects and their tasks
+        self.assertIn(
+            'graphql_operation_sql_queries_bucket{operation="Projects",type="query",tier="enterprise",cached="no",le="2"} 1',
+            lines,
+        )
+        self.assertIn(
+            'graphql_operation_sql_queries_bucket{operation="Projects",type="query",tier="enterprise",cached="no",le="1"} 0',
+            lines,
+        )
+        fields = {line.split('{field="')[1].split('"')[0] for line in lines
+                  if line.startswith('graphql_field_duration_seconds_count')}
+        self.assertEqual(fields, {'Query.allProjects', 'ProjectType.taskSet'})
+        self.assertFalse(any(line.startswith('graphql_operation_errors_total{') for line in lines))
+
+    @override_settings(GRAPHQL_METRICS={'ENABLED': True, 'MAX_OPERATIONS': 1})
+    def test_operation_names_are_bounded(self):
+        """Test that client-chosen operation names cannot grow the label set without limit"""
+        self.post_query('query First { organization { name } }')
+        self.post_query('query Second { organization { name } }')
+        self.post_query('query Third { doesNotExist }')
+        lines = self.scrape()
+        self.assertIn(
+            'graphql_operation_duration_seconds_count{operation="First",type="query",tier="default",cached="no"} 1', lines
+        )
+        self.assertIn(
+            'graphql_operation_duration_seconds_count{operation="other",type="query",tier="default",cached="no"} 1', lines
+        )
+
+    @override_settings(GRAPHQL_METRICS={'ENABLED': True, 'TOKEN': 'scrape-secret'})
+    def test_token(self):
+        """Test that a configured token is required to scrape"""
+        self.assertEqual(Client().get('/metrics').status_code, 401)
+        self.assertTrue(self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret'))
+
+    @override_settings(GRAPHQL_METRICS={'ENABLED': True}, GRAPHQL_RESPONSE_CACHE={'ENABLED': True, 'ETAGS': True})
+    def test_cached_operations(self):
+        """Test that response cache hits and 304s are counted apart from executed operations"""
+        response = self.post_query('query Projects { allProjects { name } }')
+        self.post_query('query Projects { allProjects { name } }')
+        Client().post(
+            '/graphql/', data=json.dumps({'query': 'query Projects { allProjects { name } }'}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        lines = self.scrape()
+        for cached in ('no', 'response', 'not_modified'):
+            self.assertIn(
+                'graphql_operation_duration_seconds_count'
+                f'{{operation="Projects",type="query",tier="default",cached="{cached}"}} 1', lines
+            )
+
+    @override_settings(GRAPHQL_METRICS={})
+    def test_disabled(self):
+        """Test that metrics are disabled by default and then have no endpoint"""
+        self.assertEqual(Client().get('/metrics').status_code, 404)
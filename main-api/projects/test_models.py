@@ -1,6 +1,9 @@
-from django.test import TestCase
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils.text import slugify
 from .models import Organization, Project, Task, TaskComment
+from .response_cache import get_response_cache
 from datetime import date, timedelta
 
 
@@ -133,6 +136,122 @@ class TaskModelTest(TestCase):
             self.assertEqual(task.status, status)
 
 
+class TaskCounterTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(
+            organization=self.org,
+            name='Test Project',
+            status='ACTIVE'
+        )
+
+    def test_counters_follow_task_writes(self):
+        """Test that task create, status change and delete keep project counters correct"""
+        task = Task.objects.create(project=self.project, title='Task', status='TODO')
+        Task.objects.create(project=self.project, title='Other', status='DONE')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 2)
+        self.assertEqual(self.project.task_counts(), {'TODO': 1, 'IN_PROGRESS': 0, 'DONE': 1})
+
+        task = Task.objects.get(pk=task.pk)
+        task.status = 'IN_PROGRESS'
+        task.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_counts(), {'TODO': 0, 'IN_PROGRESS': 1, 'DONE': 1})
+
+        task.delete()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 1)
+        self.assertEqual(self.project.task_counts(), {'TODO': 0, 'IN_PROGRESS': 0, 'DONE': 1})
+
+    def test_counters_follow_saves_of_deferred_tasks(self):
+        """Test that saving a task loaded without its status or project still moves the counters"""
+        task = Task.objects.create(project=self.project, title='Task', status='TODO')
+        other = Project.objects.create(organization=self.org, name='Other Project')
+
+        task = Task.objects.only('title').get(pk=task.pk)
+        task.status = 'DONE'
+        task.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_counts(), {'TODO': 0, 'IN_PROGRESS': 0, 'DONE': 1})
+
+        task = Task.objects.defer('status').get(pk=task.pk)
+        task.project = other
+        task.save()
+        self.project.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.project.task_count, 0)
+        self.assertEqual(other.task_counts(), {'TODO': 0, 'IN_PROGRESS': 0, 'DONE': 1})
+
+    def test_adjust_task_counters_many(self):
+        """Test that counters of several projects are adjusted with one UPDATE"""
+        other = Project.objects.create(organization=self.org, name='Other Project')
+        with self.assertNumQueries(1):
+            Project.adjust_task_counters_many(
+                added=[(self.project.pk, 'TODO'), (self.project.pk, 'DONE'), (other.pk, 'IN_PROGRESS')],
+                removed=[(other.pk, 'TODO')],
+            )
+        self.project.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.project.task_count, 2)
+        self.assertEqual(self.project.task_counts(), {'TODO': 1, 'IN_PROGRESS': 0, 'DONE': 1})
+        self.assertEqual(other.task_count, 0)
+        self.assertEqual(other.task_counts(), {'TODO': -1, 'IN_PROGRESS': 1, 'DONE': 0})
+
+    def test_reconcile_task_counters_command(self):
+        """Test that the reconcile command reports and repairs drifted counters"""
+        Task.objects.create(project=self.project, title='Task', status='DONE')
+        Project.objects.filter(pk=self.project.pk).update(task_count=5, done_task_count=0)
+
+        out = StringIO()
+        call_command('reconcile_task_counters', '--dry-run', stdout=out)
+        self.assertIn(f'Project {self.project.pk}: task_count 5 -> 1', out.getvalue())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 5)
+
+        out = StringIO()
+        call_command('reconcile_task_counters', '--batch-size', '1', stdout=out)
+        self.assertIn('1 with drifted counters corrected', out.getvalue())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 1)
+        self.assertEqual(self.project.done_task_count, 1)
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True})
+    def test_reconcile_invalidates_cached_responses(self):
+        """Test that corrected counters are not hidden behind cached responses"""
+        Project.objects.filter(pk=self.project.pk).update(task_count=5)
+        response_cache = get_response_cache()
+        version = response_cache.data_version(self.org.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_task_counters', stdout=StringIO())
+        self.assertNotEqual(response_cache.data_version(self.org.pk), version)
+
+
+class TenantQuerySetTest(TestCase):
+    def test_for_org_only_returns_rows_of_the_organization(self):
+        """Test that for_org() scopes projects, tasks and comments to one organization"""
+        rows = {}
+        for name in ('First', 'Second'):
+            org = Organization.objects.create(
+                name=name, contact_email=f'{name.lower()}@example.com', password='testpassword123'
+            )
+            project = Project.objects.create(organization=org, name=f'{name} Project')
+            task = Task.objects.create(project=project, title=f'{name} Task')
+            comment = TaskComment.objects.create(task=task, content=name, author_email='a@example.com')
+            rows[name] = (org, project, task, comment)
+
+        org, project, task, comment = rows['First']
+        self.assertEqual(list(Project.objects.for_org(org)), [project])
+        self.assertEqual(list(Task.objects.for_org(org.pk)), [task])
+        self.assertEqual(list(TaskComment.objects.for_org(org)), [comment])
+        self.assertFalse(Task.objects.for_org(org).filter(pk=rows['Second'][2].pk).exists())
+        self.assertFalse(Project.objects.for_org(None).exists())
+
+
 class TaskCommentModelTest(TestCase):
     def setUp(self):
         self.org = Organization.objects.create(
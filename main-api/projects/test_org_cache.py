@@ -0,0 +1,106 @@
+import json
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, Client
+from .models import Organization
+from .org_cache import OrganizationCache, get_organization_cache, reset_organization_cache
+
+
+class OrganizationCacheTest(TestCase):
+    def setUp(self):
+        reset_organization_cache()
+        cache.clear()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def post_query(self, api_key):
+        return Client().post(
+            '/graphql/',
+            data=json.dumps({'query': '{ organization { name } }'}),
+            content_type='application/json',
+            HTTP_X_API_KEY=api_key,
+        )
+
+    def test_repeat_requests_skip_the_database(self):
+        """Test that the middleware only looks the API key up once"""
+        self.assertEqual(self.post_query(self.org.api_key).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.post_query(self.org.api_key)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+        stats = get_organization_cache().stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_save_invalidates_entry(self):
+        """Test that saving an organization drops its cached entry"""
+        self.post_query(self.org.api_key)
+        self.org.name = 'Renamed Organization'
+        self.org.save()
+        response = self.post_query(self.org.api_key)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Renamed Organization')
+
+    def test_rotated_and_deleted_keys_are_rejected(self):
+        """Test that old API keys stop working after rotation or deletion"""
+        old_key = self.org.api_key
+        self.post_query(old_key)
+        self.org.api_key = 'rotated-key'
+        self.org.save()
+        self.assertEqual(self.post_query(old_key).status_code, 401)
+
+        self.post_query('rotated-key')
+        self.org.delete()
+        self.assertEqual(self.post_query('rotated-key').status_code, 401)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full"""
+        other = Organization.objects.create(
+            name='Other Organization',
+            contact_email='other@example.com',
+            password='testpassword123'
+        )
+        org_cache = OrganizationCache(max_size=1)
+        org_cache.get_organization(self.org.api_key)
+        org_cache.get_organization(other.api_key)
+        self.assertEqual(org_cache.stats()['evictions'], 1)
+        self.assertEqual(org_cache.stats()['size'], 1)
+
+    def test_shared_backend(self):
+        """Test that a second worker is served from the shared backend"""
+        OrganizationCache(backend='default').get_organization(self.org.api_key)
+        other_worker = OrganizationCache(backend='default')
+        with self.assertNumQueries(0):
+            organization = other_worker.get_organization(self.org.api_key)
+        self.assertEqual(organization.pk, self.org.pk)
+        self.assertEqual(other_worker.stats()['shared_hits'], 1)
+
+    def test_shared_backend_holds_no_secrets(self):
+        """Test that neither the API key nor the password hash is written to the shared backend"""
+        OrganizationCache(backend='default').get_organization(self.org.api_key)
+        fields = cache.get(OrganizationCache._shared_key(self.org.api_key))
+        self.assertEqual(fields['name'], 'Test Organization')
+        self.assertNotIn('api_key', fields)
+        self.assertNotIn('password', fields)
+
+        organization = OrganizationCache(backend='default').get_organization(self.org.api_key)
+        self.assertEqual(organization.api_key, self.org.api_key)
+        # The password is read from the database when needed
+        with self.assertNumQueries(1):
+            self.assertTrue(organization.check_password('testpassword123'))
+
+    def test_load_racing_invalidation_is_not_shared(self):
+        """Test that an entry loaded before an invalidation is not written back to the shared backend"""
+        get = Organization.objects.get
+        for invalidating_worker in (OrganizationCache(backend='default'), None):
+            worker = OrganizationCache(backend='default')
+
+            def get_then_invalidate(**kwargs):
+                organization = get(**kwargs)
+                (invalidating_worker or worker).invalidate(self.org.api_key)
+                return organization
+
+            with mock.patch.object(Organization.objects, 'get', get_then_invalidate):
+                worker.get_organization(self.org.api_key)
+            self.assertIsNone(cache.get(OrganizationCache._shared_key(self.org.api_key)))
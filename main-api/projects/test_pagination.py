@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.test import RequestFactory
+from graphene.test import Client
+from .models import Organization, Project, Task
+from .schema import schema
+from .pagination import encode_cursor
+
+PROJECTS_PAGE = '''
+query Page($first: Int, $after: String, $last: Int, $before: String) {
+    allProjectsConnection(first: $first, after: $after, last: $last, before: $before) {
+        edges { cursor node { name } }
+        pageInfo { hasNextPage hasPreviousPage endCursor startCursor }
+    }
+}
+'''
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.projects = [
+            Project.objects.create(organization=self.org, name=f'Project {i}') for i in range(5)
+        ]
+
+    def execute(self, query, **variables):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        return self.client.execute(query, context_value=request, variable_values=variables)
+
+    def test_forward_pagination(self):
+        """Test that first/after walks through projects with a seek on the primary key"""
+        with self.assertNumQueries(1):
+            result = self.execute(PROJECTS_PAGE, first=2)
+        page = result['data']['allProjectsConnection']
+        self.assertEqual([e['node']['name'] for e in page['edges']], ['Project 0', 'Project 1'])
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+
+        result = self.execute(PROJECTS_PAGE, first=2, after=page['pageInfo']['endCursor'])
+        page = result['data']['allProjectsConnection']
+        self.assertEqual([e['node']['name'] for e in page['edges']], ['Project 2', 'Project 3'])
+
+        result = self.execute(PROJECTS_PAGE, first=2, after=page['pageInfo']['endCursor'])
+        page = result['data']['allProjectsConnection']
+        self.assertEqual([e['node']['name'] for e in page['edges']], ['Project 4'])
+        self.assertFalse(page['pageInfo']['hasNextPage'])
+
+    def test_backward_pagination(self):
+        """Test that last/before returns the page just before the cursor in order"""
+        result = self.execute(PROJECTS_PAGE, last=2, before=encode_cursor(self.projects[3].pk))
+        page = result['data']['allProjectsConnection']
+        self.assertEqual([e['node']['name'] for e in page['edges']], ['Project 1', 'Project 2'])
+        self.assertTrue(page['pageInfo']['hasPreviousPage'])
+
+    def test_total_count_only_when_selected(self):
+        """Test that totalCount is computed on demand and tasks use the project counter"""
+        query = '{ allProjectsConnection(first: 1) { totalCount } }'
+        with self.assertNumQueries(2):
+            result = self.execute(query)
+        self.assertEqual(result['data']['allProjectsConnection']['totalCount'], 5)
+
+        project = self.projects[0]
+        for i in range(3):
+            Task.objects.create(project=project, title=f'Task {i}')
+        query = '''
+        query Tasks($projectId: String!) {
+            allTasksConnection(projectId: $projectId, first: 2) {
+                totalCount
+                edges { node { title } }
+            }
+        }
+        '''
+        with self.assertNumQueries(2):
+            result = self.execute(query, projectId=str(project.pk))
+        connection = result['data']['allTasksConnection']
+        self.assertEqual(connection['totalCount'], 3)
+        self.assertEqual([e['node']['title'] for e in connection['edges']], ['Task 0', 'Task 1'])
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is reported as an error"""
+        result = self.execute(PROJECTS_PAGE, first=2, after='not-a-cursor')
+        self.assertEqual(result['errors'][0]['message'], 'Invalid cursor: not-a-cursor')
@@ -0,0 +1,57 @@
+import threading
+from django.test import TestCase, RequestFactory, override_settings
+from graphene.test import Client
+from .models import Organization
+from .passwords import PasswordHasher, PasswordHasherBusy, get_rounds
+from .schema import schema
+
+
+@override_settings(PASSWORD_HASHING={'ROUNDS': 4})
+class PasswordHashingTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def login(self, password='testpassword123'):
+        return Client(schema).execute(
+            '''
+            mutation Login($email: String!, $password: String!) {
+                loginOrganization(email: $email, password: $password) { success message }
+            }
+            ''',
+            context_value=RequestFactory().post('/graphql/'),
+            variable_values={'email': 'test@example.com', 'password': password},
+        )['data']['loginOrganization']
+
+    def test_configured_rounds_are_used(self):
+        """Test that new hashes use the configured work factor"""
+        self.assertEqual(get_rounds(self.org.password), 4)
+        self.assertTrue(self.org.check_password('testpassword123'))
+
+    def test_rehash_on_login_when_cost_changes(self):
+        """Test that a successful login upgrades a hash made with an old work factor"""
+        with override_settings(PASSWORD_HASHING={'ROUNDS': 5}):
+            self.assertFalse(self.login('wrongpassword')['success'])
+            self.org.refresh_from_db()
+            self.assertEqual(get_rounds(self.org.password), 4)
+
+            self.assertTrue(self.login()['success'])
+            self.org.refresh_from_db()
+            self.assertEqual(get_rounds(self.org.password), 5)
+            self.assertTrue(self.org.check_password('testpassword123'))
+
+    def test_busy_hasher_refuses_work(self):
+        """Test that operations beyond the concurrency cap are refused, not queued forever"""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_queued=0, queue_timeout=0.01)
+        release = threading.Event()
+        blocked = hasher.submit(release.wait)
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                hasher.hash('password')
+        finally:
+            release.set()
+        blocked.result()
+        hasher.shutdown()
@@ -0,0 +1,98 @@
+import json
+import tempfile
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from .documents import hash_query
+from .models import Organization
+
+QUERY = '{ organization { name } }'
+
+
+class PersistedQueryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def post(self, query_hash, query=None, api_key=True):
+        payload = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': query_hash}}}
+        if query is not None:
+            payload['query'] = query
+        headers = {'HTTP_X_API_KEY': self.org.api_key} if api_key else {}
+        return Client().post(
+            '/graphql/',
+            data=json.dumps(payload),
+            content_type='application/json',
+            **headers,
+        )
+
+    def test_unknown_hash_then_registration(self):
+        """Test the APQ round trip: not found, register on retry, then hash only"""
+        response = self.post(hash_query(QUERY))
+        self.assertEqual(response.status_code, 200)
+        error = response.json()['errors'][0]
+        self.assertEqual(error['message'], 'PersistedQueryNotFound')
+        self.assertEqual(error['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+        response = self.post(hash_query(QUERY), QUERY)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+        response = self.post(hash_query(QUERY))
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+    def test_unauthenticated_requests_register_nothing(self):
+        """Test that a query sent without a valid API key is not stored in the cache"""
+        response = self.post(hash_query(QUERY), QUERY, api_key=False)
+        self.assertEqual(response.status_code, 401)
+        self.assertIsNone(cache.get('apq:' + hash_query(QUERY)))
+
+        login = 'mutation { loginOrganization(email: "a@example.com", password: "x") { success } }'
+        self.post(hash_query(login), login, api_key=False)
+        self.assertEqual(cache.get('apq:' + hash_query(login)), login)
+
+    @override_settings(GRAPHQL_PERSISTED_QUERIES={'MAX_QUERY_LENGTH': 10})
+    def test_long_queries_are_not_registered(self):
+        """Test that queries over MAX_QUERY_LENGTH run but are not stored"""
+        response = self.post(hash_query(QUERY), QUERY)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+        self.assertIsNone(cache.get('apq:' + hash_query(QUERY)))
+
+    def test_hash_mismatch_is_rejected(self):
+        """Test that a query is never registered under someone else's hash"""
+        response = self.post(hash_query('{ allProjects { id } }'), QUERY)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'Provided sha256Hash does not match query')
+
+    def test_get_request_with_hash(self):
+        """Test that GET requests resolve registered hashes too"""
+        self.post(hash_query(QUERY), QUERY)
+        extensions = json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': hash_query(QUERY)}})
+        response = Client().get(
+            '/graphql/', {'extensions': extensions},
+            HTTP_ACCEPT='application/json', HTTP_X_API_KEY=self.org.api_key,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+    def test_allow_list_mode(self):
+        """Test that only allow-listed documents run in allow-list mode"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as allow_list:
+            json.dump([QUERY], allow_list)
+            allow_list.flush()
+            with override_settings(GRAPHQL_PERSISTED_QUERIES={
+                'ALLOW_LIST_ONLY': True,
+                'ALLOW_LIST_FILE': allow_list.name,
+            }):
+                response = self.post(hash_query(QUERY))
+                self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+                other = '{ allProjects { id } }'
+                response = self.post(hash_query(other), other)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['errors'][0]['message'], 'Query is not in the allow list')
+
+                response = self.post(hash_query(other))
+                self.assertEqual(response.json()['errors'][0]['message'], 'PersistedQueryNotFound')
@@ -0,0 +1,53 @@
+import json
+import os
+import pstats
+import tempfile
+from django.test import TestCase, Client, override_settings
+from .models import Organization
+from .profiling import issue_profile_token
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(GRAPHQL_PROFILING={'DIRECTORY': self.directory})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def post_query(self, **headers):
+        return Client().post(
+            '/graphql/', data=json.dumps({'query': 'query Board { allProjects { name } }'}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key, **headers,
+        )
+
+    def test_signed_header_writes_a_profile(self):
+        """Test that a valid X-Profile header profiles the request into the directory"""
+        response = self.post_query(HTTP_X_PROFILE=issue_profile_token())
+        self.assertEqual(response.json()['data']['allProjects'], [])
+        [name] = os.listdir(self.directory)
+        self.assertTrue(name.startswith('Board-') and name.endswith('.prof'))
+        stats = pstats.Stats(os.path.join(self.directory, name))
+        self.assertTrue(any(function == 'resolve_all_projects' for _, _, function in stats.stats))
+
+    def test_unsigned_or_other_organization_headers_are_ignored(self):
+        """Test that forged headers and tokens for another organization profile nothing"""
+        self.post_query(HTTP_X_PROFILE='*')
+        self.post_query(HTTP_X_PROFILE=issue_profile_token(self.org.pk + 1))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.post_query(HTTP_X_PROFILE=issue_profile_token(self.org.pk))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_sample_rate(self):
+        """Test that a sample rate profiles requests without a header"""
+        with override_settings(GRAPHQL_PROFILING={'DIRECTORY': self.directory, 'SAMPLE_RATE': 1}):
+            self.post_query()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.post_query()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
@@ -0,0 +1,286 @@
+from django.test import TestCase, RequestFactory, override_settings
+from graphene.test import Client
+from .models import Organization, Project, Task, TaskComment
+from .query_budget import assert_query_budget, normalize_sql, query_budget
+from .schema import schema
+
+PROJECT_FIELDS = '''
+    id name taskCount completedTasks
+    taskCountsByStatus { status count }
+    organization { name }
+    taskSet { id title project { id } taskcommentSet { content task { id } } }
+'''
+
+TASK_FIELDS = '''
+    id title status version
+    project { name taskCount taskSet { id } }
+    taskcommentSet { content task { title } }
+'''
+
+
+class QueryBudgetHelperTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def test_normalize_sql(self):
+        """Test that statements differing only in their literals compare equal"""
+        self.assertEqual(
+            normalize_sql('SELECT "a" FROM "t1" WHERE "b" = 12 AND "c" = \'it\'\'s\' AND "d" IN (1, 2, 3)'),
+            'SELECT "a" FROM "t1" WHERE "b" = ? AND "c" = ? AND "d" IN (...)',
+        )
+
+    def test_report_lists_repeated_statements(self):
+        """Test that an N+1 fails with the statement that was repeated"""
+        def prepare(rows):
+            Project.objects.bulk_create(
+                Project(organization=self.org, name=f'Project {n}') for n in range(rows)
+            )
+            return lambda: [project.organization.name for project in Project.objects.all()]
+
+        with self.assertRaises(AssertionError) as raised:
+            assert_query_budget(self, prepare, sizes=(1, 10), name='project organizations')
+        report = str(raised.exception)
+        self.assertIn('project organizations ran 1 rows: 2, 10 rows: 11 SQL queries', report)
+        self.assertIn('  10x SELECT "projects_organization"', report)
+
+    def test_rows_are_rolled_back_between_sizes(self):
+        """Test that each size starts from the data of setUp"""
+        seen = []
+
+        def prepare(rows):
+            seen.append(Project.objects.count())
+            Project.objects.bulk_create(
+                Project(organization=self.org, name=f'Project {n}') for n in range(rows)
+            )
+            return lambda: None
+
+        self.assertEqual(assert_query_budget(self, prepare, max_queries=0), {1: 0, 10: 0, 100: 0})
+        self.assertEqual(seen, [0, 0, 0])
+
+
+class SchemaQueryBudgetTest(TestCase):
+    """
+    Every query and mutation of the schema runs a constant number of SQL
+    queries whether it touches 1, 10 or 100 rows.
+    """
+
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+
+    def execute(self, query, **variables):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        result = self.client.execute(query, context_value=request, variable_values=variables)
+        self.assertIsNone(result.get('errors'))
+        return result
+
+    def seed_tasks(self, project, rows):
+        """`rows` tasks in `project`, each with a comment."""
+        tasks = Task.objects.bulk_create(
+            Task(project=project, title=f'Task {n}', status=('TODO', 'DONE')[n % 2]) for n in range(rows)
+        )
+        Project.adjust_task_counters_many(added=[(task.project_id, task.status) for task in tasks])
+        TaskComment.objects.bulk_create(
+            TaskComment(task=task, content='Comment', author_email='author@example.com') for task in tasks
+        )
+        return tasks
+
+    def seed_projects(self, rows):
+        """`rows` projects, each with a task and its comment."""
+        projects = Project.objects.bulk_create(
+            Project(organization=self.org, name=f'Project {n}') for n in range(rows)
+        )
+        for project in projects:
+            self.seed_tasks(project, 1)
+        return projects
+
+    def seed_organizations(self, rows):
+        Organization.objects.bulk_create(
+            Organization(
+                name=f'Organization {n}', slug=f'organization-{n}', contact_email=f'org{n}@example.com',
+                api_key=f'api-key-{n}', password=self.org.password,
+            ) for n in range(rows)
+        )
+
+    # Queries
+
+    @query_budget(0)
+    def test_organization(self, rows):
+        self.seed_organizations(rows)
+        return lambda: self.execute('query { organization { id name slug contactEmail } }')
+
+    @query_budget(3)
+    def test_all_projects(self, rows):
+        self.seed_projects(rows)
+        return lambda: self.execute(f'query {{ allProjects {{ {PROJECT_FIELDS} }} }}')
+
+    @query_budget(3)
+    def test_all_tasks(self, rows):
+        self.seed_tasks(self.project, rows)
+        return lambda: self.execute(
+            f'query Tasks($projectId: String!) {{ allTasks(projectId: $projectId) {{ {TASK_FIELDS} }} }}',
+            projectId=str(self.project.pk),
+        )
+
+    @query_budget(4)
+    def test_all_projects_connection(self, rows):
+        self.seed_projects(rows)
+        return lambda: self.execute(f'''
+            query {{
+                allProjectsConnection(first: 100) {{
+                    totalCount
+                    pageInfo {{ hasNextPage endCursor }}
+                    edges {{ cursor node {{ {PROJECT_FIELDS} }} }}
+                }}
+            }}
+        ''')
+
+    @query_budget(4)
+    def test_all_tasks_connection(self, rows):
+        self.seed_tasks(self.project, rows)
+        return lambda: self.execute(f'''
+            query Tasks($projectId: String!) {{
+                allTasksConnection(projectId: $projectId, first: 100) {{
+                    totalCount
+                    edges {{ node {{ {TASK_FIELDS} }} }}
+                }}
+            }}
+        ''', projectId=str(self.project.pk))
+
+    # Mutations
+
+    @query_budget(1)
+    def test_create_organization(self, rows):
+        self.seed_organizations(rows)
+        return lambda: self.execute('''
+            mutation { createOrganization(name: "New", contactEmail: "new@example.com") { organization { id } } }
+        ''')
+
+    @query_budget(2)
+    def test_sign_up_organization(self, rows):
+        self.seed_organizations(rows)
+        return lambda: self.execute('''
+            mutation {
+                signUpOrganization(name: "New", contactEmail: "new@example.com", password: "secret123") {
+                    success organization { id }
+                }
+            }
+        ''')
+
+    @query_budget(1)
+    def test_login_organization(self, rows):
+        self.seed_organizations(rows)
+        return lambda: self.execute('''
+            mutation {
+                loginOrganization(email: "test@example.com", password: "testpassword123") {
+                    success organization { name }
+                }
+            }
+        ''')
+
+    @query_budget(3)
+    def test_create_project(self, rows):
+        self.seed_projects(rows)
+        return lambda: self.execute(f'''
+            mutation {{ createProject(name: "New", description: "") {{ project {{ {PROJECT_FIELDS} }} }} }}
+        ''')
+
+    @query_budget(6)
+    def test_delete_project(self, rows):
+        self.seed_tasks(self.project, rows)
+        return lambda: self.execute(
+            'mutation Delete($projectId: String!) { deleteProject(projectId: $projectId) { success } }',
+            projectId=str(self.project.pk),
+        )
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True})
+    def test_delete_project_with_response_cache(self):
+        """Test that deleting a project's tasks does not look up the organization per row"""
+        self.test_delete_project()
+
+    @query_budget(8)
+    def test_create_task(self, rows):
+        self.seed_tasks(self.project, rows)
+        return lambda: self.execute(f'''
+            mutation Create($projectId: String!) {{
+                createTask(projectId: $projectId, title: "New") {{ task {{ {TASK_FIELDS} }} }}
+            }}
+        ''', projectId=str(self.project.pk))
+
+    @query_budget(8)
+    def test_update_task(self, rows):
+        task = self.seed_tasks(self.project, rows)[0]
+        return lambda: self.execute(f'''
+            mutation Update($taskId: String!) {{
+                updateTask(taskId: $taskId, title: "Renamed", status: "IN_PROGRESS") {{ task {{ {TASK_FIELDS} }} }}
+            }}
+        ''', taskId=str(task.pk))
+
+    @query_budget(8)
+    def test_update_task_status(self, rows):
+        task = self.seed_tasks(self.project, rows)[0]
+        return lambda: self.execute(f'''
+            mutation Status($taskId: String!) {{
+                updateTaskStatus(taskId: $taskId, status: "IN_PROGRESS") {{ task {{ {TASK_FIELDS} }} }}
+            }}
+        ''', taskId=str(task.pk))
+
+    @query_budget(9)
+    def test_delete_task(self, rows):
+        task = self.seed_tasks(self.project, rows)[0]
+        return lambda: self.execute(
+            'mutation Delete($taskId: String!) { deleteTask(taskId: $taskId) { success } }',
+            taskId=str(task.pk),
+        )
+
+    @query_budget(6)
+    def test_create_task_comment(self, rows):
+        task = self.seed_tasks(self.project, rows)[0]
+        return lambda: self.execute('''
+            mutation Comment($taskId: String!) {
+                createTaskComment(taskId: $taskId, content: "Hi", authorEmail: "a@example.com") {
+                    comment { content task { title project { taskSet { id } } taskcommentSet { content } } }
+                }
+            }
+        ''', taskId=str(task.pk))
+
+    @query_budget(8)
+    def test_bulk_create_tasks(self, rows):
+        projects = self.seed_projects(rows)
+        tasks = [{'projectId': str(project.pk), 'title': 'New'} for project in projects]
+        return lambda: self.execute(f'''
+            mutation Bulk($tasks: [TaskInput!]!) {{
+                bulkCreateTasks(tasks: $tasks) {{ tasks {{ {TASK_FIELDS} }} errors {{ index message }} }}
+            }}
+        ''', tasks=tasks)
+
+    @query_budget(8)
+    def test_bulk_update_tasks(self, rows):
+        tasks = [{'taskId': str(task.pk), 'title': 'Renamed', 'status': 'IN_PROGRESS'}
+                 for task in self.seed_tasks(self.project, rows)]
+        return lambda: self.execute(f'''
+            mutation Bulk($tasks: [TaskUpdateInput!]!) {{
+                bulkUpdateTasks(tasks: $tasks) {{ tasks {{ {TASK_FIELDS} }} errors {{ index message }} }}
+            }}
+        ''', tasks=tasks)
+
+    @query_budget(8)
+    def test_bulk_update_task_status(self, rows):
+        updates = [{'taskId': str(task.pk), 'status': 'IN_PROGRESS'}
+                   for task in self.seed_tasks(self.project, rows)]
+        return lambda: self.execute(f'''
+            mutation Bulk($updates: [TaskStatusInput!]!) {{
+                bulkUpdateTaskStatus(updates: $updates) {{ tasks {{ {TASK_FIELDS} }} errors {{ index message }} }}
+            }}
+        ''', updates=updates)
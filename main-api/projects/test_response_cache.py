@@ -0,0 +1,147 @@
+import json
+import tempfile
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from .models import Organization, Project, Task
+from .org_cache import reset_organization_cache
+from .tokens import issue_token
+
+TASKS_QUERY = '''
+query Tasks($projectId: String!) {
+    allTasks(projectId: $projectId) { title status }
+}
+'''
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True})
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_organization_cache()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+        self.task = Task.objects.create(project=self.project, title='Task', status='TODO')
+
+    def post_query(self, query, api_key=None, **variables):
+        return Client().post(
+            '/graphql/',
+            data=json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json',
+            HTTP_X_API_KEY=api_key or self.org.api_key,
+        ).json()
+
+    def tasks(self, api_key=None, project=None):
+        result = self.post_query(TASKS_QUERY, api_key, projectId=str((project or self.project).pk))
+        return result.get('data') and result['data']['allTasks']
+
+    def test_repeated_query_is_served_from_cache(self):
+        """Test that an identical query, whitespace aside, runs no resolvers"""
+        self.assertEqual(self.tasks(), [{'title': 'Task', 'status': 'TODO'}])
+        with self.assertNumQueries(0):
+            result = self.post_query(' '.join(TASKS_QUERY.split()), projectId=str(self.project.pk))
+        self.assertEqual(result['data']['allTasks'], [{'title': 'Task', 'status': 'TODO'}])
+
+        # Other variables are another entry
+        other = Project.objects.create(organization=self.org, name='Other Project')
+        self.assertEqual(self.tasks(project=other), [])
+
+    def test_mutations_invalidate(self):
+        """Test that a mutation makes the organization's cached responses unreachable"""
+        self.tasks()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_query('''
+            mutation Status($taskId: String!) {
+                updateTaskStatus(taskId: $taskId, status: "DONE") { task { id } }
+            }
+            ''', taskId=str(self.task.pk))
+        self.assertEqual(self.tasks(), [{'title': 'Task', 'status': 'DONE'}])
+
+    def test_model_signals_invalidate(self):
+        """Test that writes outside GraphQL also bump the data version"""
+        self.tasks()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, title='Second')
+        self.assertEqual([task['title'] for task in self.tasks()], ['Task', 'Second'])
+
+    def test_revoked_tokens_miss_the_cache(self):
+        """Test that cached responses are not served to a revoked token"""
+        token = issue_token(self.org)
+        self.assertEqual(len(self.tasks(token)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.org.revoke_tokens()
+        result = self.post_query(TASKS_QUERY, token, projectId=str(self.project.pk))
+        self.assertEqual(result['errors'][0]['message'], 'API token has been revoked')
+
+    def test_file_based_backend(self):
+        """Test that responses survive pickling by the file cache backend"""
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=caches, GRAPHQL_RESPONSE_CACHE={'ENABLED': True}):
+                self.assertEqual(len(self.tasks()), 1)
+                with self.assertNumQueries(0):
+                    self.assertEqual(len(self.tasks()), 1)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE={'ETAGS': True})
+class ETagTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_organization_cache()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+
+    def get(self, query, **headers):
+        return Client().get(
+            '/graphql/', {'query': query},
+            HTTP_ACCEPT='application/json', HTTP_X_API_KEY=self.org.api_key, **headers
+        )
+
+    def test_matching_etag_is_not_modified(self):
+        """Test that a matching If-None-Match is answered with 304 without running resolvers"""
+        response = self.get('{ allProjects { name } }')
+        etag = response['ETag']
+        self.assertEqual(response.json()['data']['allProjects'], [{'name': 'Test Project'}])
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('X-API-Key', response['Vary'])
+
+        with self.assertNumQueries(0):
+            response = self.get('{ allProjects { name } }', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # POST requests revalidate the same way
+        response = Client().post(
+            '/graphql/', data=json.dumps({'query': '{ allProjects { name } }'}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+            HTTP_IF_NONE_MATCH=f'W/{etag}',
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_data(self):
+        """Test that a write gives the same query a new ETag"""
+        etag = self.get('{ allProjects { name } }')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(organization=self.org, name='Second Project')
+        response = self.get('{ allProjects { name } }', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']['allProjects']), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_queries_require_an_api_key(self):
+        """Test that GET queries are authenticated like POST ones"""
+        response = Client().get(
+            '/graphql/', {'query': '{ allProjects { name } }'}, HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(Client().get('/graphql/', HTTP_ACCEPT='text/html').status_code, 200)
@@ -1,4 +1,8 @@
+from unittest import mock
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import AnonymousUser
 from graphene.test import Client
 from django.test import RequestFactory
@@ -246,3 +250,416 @@ class GraphQLSchemaTest(TestCase):
         data = result.get('data', {})
         self.assertIn('createTaskComment', data)
         self.assertEqual(data['createTaskComment']['comment']['content'], 'A test comment')
+
+    def test_projects_task_counts_query(self):
+        """Test that task counts are served without extra queries"""
+        Task.objects.create(project=self.project, title='Done Task', status='DONE')
+        other = Project.objects.create(organization=self.org, name='Other Project')
+        Task.objects.create(project=other, title='Other Task', status='IN_PROGRESS')
+        query = '''
+        query {
+            allProjects {
+                name
+                taskCount
+                completedTasks
+                taskCountsByStatus {
+                    status
+                    count
+                }
+            }
+        }
+        '''
+
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+
+        with self.assertNumQueries(1):
+            result = self.client.execute(query, context_value=request)
+
+        self.assertIsNone(result.get('errors'))
+        projects = {p['name']: p for p in result['data']['allProjects']}
+        self.assertEqual(projects['Test Project']['taskCount'], 2)
+        self.assertEqual(projects['Test Project']['completedTasks'], 1)
+        self.assertEqual(
+            projects['Test Project']['taskCountsByStatus'],
+            [{'status': 'TODO', 'count': 1}, {'status': 'IN_PROGRESS', 'count': 0}, {'status': 'DONE', 'count': 1}]
+        )
+        self.assertEqual(projects['Other Project']['taskCount'], 1)
+        self.assertEqual(projects['Other Project']['completedTasks'], 0)
+
+    def test_task_counts_in_mutation_payload(self):
+        """Test that task counts in a mutation payload include the new task"""
+        mutation = '''
+        mutation CreateTask($projectId: String!, $title: String!) {
+            createTask(projectId: $projectId, title: $title, status: "DONE") {
+                task {
+                    project {
+                        taskCount
+                        completedTasks
+                    }
+                }
+            }
+        }
+        '''
+
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+
+        result = self.client.execute(
+            mutation,
+            context_value=request,
+            variable_values={'projectId': str(self.project.id), 'title': 'Finished'}
+        )
+
+        self.assertIsNone(result.get('errors'))
+        project = result['data']['createTask']['task']['project']
+        self.assertEqual(project['taskCount'], 2)
+        self.assertEqual(project['completedTasks'], 1)
+
+
+class TenantScopedMutationTest(TestCase):
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        other_org = Organization.objects.create(
+            name='Other Organization',
+            contact_email='other@example.com',
+            password='testpassword123'
+        )
+        self.other_project = Project.objects.create(organization=other_org, name='Other Project')
+        self.other_task = Task.objects.create(project=self.other_project, title='Other Task')
+
+    def execute(self, query, variables):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        return self.client.execute(query, context_value=request, variable_values=variables)
+
+    def test_other_organizations_tasks_are_not_found(self):
+        """Test that the tenant check is part of the lookup and leaks nothing"""
+        query = '''
+        mutation UpdateStatus($taskId: String!) {
+            updateTaskStatus(taskId: $taskId, status: "DONE") { task { id } }
+        }
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            result = self.execute(query, {'taskId': str(self.other_task.id)})
+        self.assertEqual(
+            result['errors'][0]['message'], f'Task with ID {self.other_task.id} does not exist'
+        )
+        selects = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('"projects_project"."organization_id"', selects[0])
+        self.other_task.refresh_from_db()
+        self.assertEqual(self.other_task.status, 'TODO')
+
+        query = '''
+        mutation Comment($taskId: String!) {
+            createTaskComment(taskId: $taskId, content: "Hi", authorEmail: "a@example.com") { comment { id } }
+        }
+        '''
+        result = self.execute(query, {'taskId': str(self.other_task.id)})
+        self.assertEqual(result['errors'][0]['message'], f'Task {self.other_task.id} does not exist')
+
+        query = '''
+        query Tasks($projectId: String!) { allTasks(projectId: $projectId) { id } }
+        '''
+        result = self.execute(query, {'projectId': str(self.other_project.id)})
+        self.assertEqual(
+            result['errors'][0]['message'], f'Project with ID {self.other_project.id} does not exist'
+        )
+
+
+class PartialTaskUpdateTest(TestCase):
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+        self.task = Task.objects.create(
+            project=self.project, title='Task', description='x' * 1000, status='TODO',
+            due_date=date(2030, 1, 1)
+        )
+
+    def execute(self, query, variables):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        return self.client.execute(query, context_value=request, variable_values=variables)
+
+    def update_title(self, title, expected_version=None):
+        query = '''
+        mutation Update($taskId: String!, $title: String, $expectedVersion: Int) {
+            updateTask(taskId: $taskId, title: $title, expectedVersion: $expectedVersion) {
+                task { title description dueDate version }
+            }
+        }
+        '''
+        return self.execute(query, {
+            'taskId': str(self.task.id), 'title': title, 'expectedVersion': expected_version
+        })
+
+    def test_update_writes_only_changed_columns(self):
+        """Test that UpdateTask is one UPDATE of the given columns that returns the row"""
+        with CaptureQueriesContext(connection) as queries:
+            result = self.update_title('Renamed')
+        task = result['data']['updateTask']['task']
+        self.assertEqual(task, {
+            'title': 'Renamed', 'description': 'x' * 1000, 'dueDate': '2030-01-01', 'version': 2
+        })
+        statements = [
+            q['sql'] for q in queries.captured_queries
+            if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+        self.assertNotIn('"description" =', statements[0])
+
+    def test_update_without_returning(self):
+        """Test that backends without UPDATE ... RETURNING get the same result"""
+        with mock.patch('projects.models.supports_update_returning', return_value=False):
+            result = self.update_title('Renamed')
+        self.assertEqual(result['data']['updateTask']['task']['title'], 'Renamed')
+        self.assertEqual(result['data']['updateTask']['task']['dueDate'], '2030-01-01')
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.version), ('Renamed', 2))
+
+    def test_expected_version(self):
+        """Test that a stale expectedVersion is rejected without writing"""
+        result = self.update_title('First', expected_version=1)
+        self.assertEqual(result['data']['updateTask']['task']['version'], 2)
+        result = self.update_title('Second', expected_version=1)
+        self.assertEqual(
+            result['errors'][0]['message'],
+            f'Task {self.task.id} was modified by someone else (current version is 2)'
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'First')
+
+        query = '''
+        mutation Status($taskId: String!, $expectedVersion: Int) {
+            updateTaskStatus(taskId: $taskId, status: "DONE", expectedVersion: $expectedVersion) { task { version } }
+        }
+        '''
+        result = self.execute(query, {'taskId': str(self.task.id), 'expectedVersion': 1})
+        self.assertIn('was modified by someone else', result['errors'][0]['message'])
+        result = self.execute(query, {'taskId': str(self.task.id), 'expectedVersion': 2})
+        self.assertEqual(result['data']['updateTaskStatus']['task']['version'], 3)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_counts(), {'TODO': 0, 'IN_PROGRESS': 0, 'DONE': 1})
+
+    def test_update_without_fields_writes_nothing(self):
+        """Test that an UpdateTask without fields returns the task unchanged and publishes nothing"""
+        with mock.patch('projects.schema.data_changed') as changed, \
+                mock.patch('projects.schema.tasks_changed') as published, \
+                CaptureQueriesContext(connection) as queries:
+            result = self.update_title(None, expected_version=1)
+        self.assertEqual(result['data']['updateTask']['task']['version'], 1)
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in queries.captured_queries))
+        changed.assert_not_called()
+        published.assert_not_called()
+
+        result = self.update_title(None, expected_version=2)
+        self.assertIn('was modified by someone else', result['errors'][0]['message'])
+
+    def test_save_increments_version_in_the_database(self):
+        """Test that Task.save() does not lose a version bump made concurrently"""
+        task = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=self.task.pk).update(version=F('version') + 1)
+        task.title = 'Saved'
+        task.save()
+        self.assertEqual(task.version, 3)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.version, 3)
+
+
+class BulkTaskMutationTest(TestCase):
+    def setUp(self):
+        self.client = Client(schema)
+        self.factory = RequestFactory()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+        other_org = Organization.objects.create(
+            name='Other Organization',
+            contact_email='other@example.com',
+            password='testpassword123'
+        )
+        self.other_project = Project.objects.create(organization=other_org, name='Other Project')
+
+    def execute(self, query, variables):
+        request = self.factory.post('/graphql/')
+        request.organization = self.org
+        return self.client.execute(query, context_value=request, variable_values=variables)
+
+    def test_bulk_create_tasks(self):
+        """Test that valid tasks are created and invalid items are reported by index"""
+        mutation = '''
+        mutation BulkCreate($tasks: [TaskInput!]!) {
+            bulkCreateTasks(tasks: $tasks) {
+                tasks { title status }
+                errors { index message }
+            }
+        }
+        '''
+        result = self.execute(mutation, {'tasks': [
+            {'projectId': str(self.project.id), 'title': 'First'},
+            {'projectId': str(self.other_project.id), 'title': 'Not mine'},
+            {'projectId': str(self.project.id), 'title': 'Second', 'status': 'DONE'},
+            {'projectId': str(self.project.id), 'title': 'Bad date', 'dueDate': 'soon'},
+        ]})
+
+        self.assertIsNone(result.get('errors'))
+        payload = result['data']['bulkCreateTasks']
+        self.assertEqual([t['title'] for t in payload['tasks']], ['First', 'Second'])
+        self.assertEqual(payload['errors'], [
+            {'index': 1, 'message': f'Project with ID {self.other_project.id} does not exist'},
+            {'index': 3, 'message': 'Invalid date format'},
+        ])
+        self.assertEqual(Task.objects.filter(project=self.other_project).count(), 0)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 2)
+        self.assertEqual(self.project.done_task_count, 1)
+
+    def test_bulk_create_all_or_nothing(self):
+        """Test that allOrNothing writes nothing when any item fails"""
+        mutation = '''
+        mutation BulkCreate($tasks: [TaskInput!]!) {
+            bulkCreateTasks(tasks: $tasks, allOrNothing: true) {
+                tasks { title }
+                errors { index message }
+            }
+        }
+        '''
+        result = self.execute(mutation, {'tasks': [
+            {'projectId': str(self.project.id), 'title': 'First'},
+            {'projectId': 'abc', 'title': 'Broken'},
+        ]})
+
+        payload = result['data']['bulkCreateTasks']
+        self.assertEqual(payload['tasks'], [])
+        self.assertEqual(payload['errors'], [{'index': 1, 'message': 'Invalid project ID: abc'}])
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_bulk_update_task_status_query_count(self):
+        """Test that the number of queries does not grow with the number of tasks"""
+        mutation = '''
+        mutation BulkStatus($updates: [TaskStatusInput!]!) {
+            bulkUpdateTaskStatus(updates: $updates) {
+                tasks { id status }
+                errors { index message }
+            }
+        }
+        '''
+        foreign = Task.objects.create(project=self.other_project, title='Foreign')
+
+        def run(count):
+            tasks = [Task.objects.create(project=self.project, title=f'Task {i}') for i in range(count)]
+            updates = [{'taskId': str(task.id), 'status': 'DONE'} for task in tasks]
+            updates.append({'taskId': str(foreign.id), 'status': 'DONE'})
+            with CaptureQueriesContext(connection) as queries:
+                result = self.execute(mutation, {'updates': updates})
+            self.assertEqual(len(result['data']['bulkUpdateTaskStatus']['tasks']), count)
+            self.assertEqual(
+                result['data']['bulkUpdateTaskStatus']['errors'],
+                [{'index': count, 'message': f'Task {foreign.id} does not exist'}]
+            )
+            return len(queries)
+
+        self.assertEqual(run(2), run(10))
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'TODO')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.done_task_count, 12)
+        self.assertEqual(self.project.todo_task_count, 0)
+
+    def test_bulk_update_tasks(self):
+        """Test that bulk updates change only the given fields"""
+        task = Task.objects.create(project=self.project, title='Task', description='Keep me')
+        mutation = '''
+        mutation BulkUpdate($tasks: [TaskUpdateInput!]!) {
+            bulkUpdateTasks(tasks: $tasks) {
+                tasks { title description status dueDate }
+                errors { index message }
+            }
+        }
+        '''
+        result = self.execute(mutation, {'tasks': [
+            {'taskId': str(task.id), 'title': 'Renamed', 'status': 'IN_PROGRESS', 'dueDate': '2030-01-02'},
+        ]})
+
+        payload = result['data']['bulkUpdateTasks']
+        self.assertEqual(payload['errors'], [])
+        self.assertEqual(payload['tasks'], [{
+            'title': 'Renamed', 'description': 'Keep me', 'status': 'IN_PROGRESS', 'dueDate': '2030-01-02'
+        }])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.in_progress_task_count, 1)
+        self.assertEqual(self.project.todo_task_count, 0)
+
+    def test_bulk_update_writes_each_rows_own_fields(self):
+        """Test that bulk updates skip items without changes and write only each row's changed columns"""
+        renamed = Task.objects.create(project=self.project, title='Renamed', description='Old')
+        described = Task.objects.create(project=self.project, title='Described', description='Old')
+        untouched = Task.objects.create(project=self.project, title='Untouched', description='Old')
+        mutation = '''
+        mutation BulkUpdate($tasks: [TaskUpdateInput!]!) {
+            bulkUpdateTasks(tasks: $tasks) {
+                tasks { id title description version }
+                errors { index message }
+            }
+        }
+        '''
+        # Someone else edits the rows between our read and our write
+        def concurrent_edit(*args, **kwargs):
+            Task.objects.filter(pk=renamed.pk).update(description='Theirs')
+            Task.objects.filter(pk=described.pk).update(title='Theirs')
+            return original(*args, **kwargs)
+
+        original = Task.objects.bulk_update
+        with mock.patch.object(Task.objects, 'bulk_update', side_effect=concurrent_edit), \
+                mock.patch('projects.schema.tasks_changed') as published:
+            result = self.execute(mutation, {'tasks': [
+                {'taskId': str(renamed.id), 'title': 'New title'},
+                {'taskId': str(described.id), 'description': 'New description'},
+                {'taskId': str(untouched.id)},
+            ]})
+
+        payload = result['data']['bulkUpdateTasks']
+        self.assertEqual(payload['errors'], [])
+        self.assertEqual([task['id'] for task in payload['tasks']], [str(renamed.id), str(described.id)])
+        self.assertEqual([task.pk for task in published.call_args.args[2]], [renamed.id, described.id])
+
+        renamed.refresh_from_db()
+        described.refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual((renamed.title, renamed.description, renamed.version), ('New title', 'Theirs', 2))
+        self.assertEqual((described.title, described.description, described.version), ('Theirs', 'New description', 2))
+        self.assertEqual(untouched.version, 1)
+
+    def test_bulk_update_without_changes_publishes_nothing(self):
+        """Test that a bulk update whose items change nothing writes and publishes nothing"""
+        task = Task.objects.create(project=self.project, title='Task')
+        mutation = '''
+        mutation BulkUpdate($tasks: [TaskUpdateInput!]!) {
+            bulkUpdateTasks(tasks: $tasks) { tasks { id } errors { index message } }
+        }
+        '''
+        with mock.patch('projects.schema.data_changed') as changed, \
+                mock.patch('projects.schema.tasks_changed') as published:
+            result = self.execute(mutation, {'tasks': [{'taskId': str(task.id)}]})
+        self.assertEqual(result['data']['bulkUpdateTasks'], {'tasks': [], 'errors': []})
+        changed.assert_not_called()
+        published.assert_not_called()
+        task.refresh_from_db()
+        self.assertEqual(task.version, 1)
@@ -0,0 +1,122 @@
+import json
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client, override_settings
+from .models import Organization, Project, Task
+from .slow_queries import SlowQueryLog, get_slow_query_log
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        project = Project.objects.create(organization=self.org, name='Test Project')
+        Task.objects.create(project=project, title='Task')
+
+    def post_query(self, query, operation_name=None):
+        response = Client().post(
+            '/graphql/', data=json.dumps({'query': query, 'operationName': operation_name}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+        )
+        get_slow_query_log().flush()
+        return response
+
+    def records(self):
+        return [record for record in get_slow_query_log().records() if record['operation']]
+
+    @override_settings(GRAPHQL_SLOW_QUERIES={'ENABLED': True, 'THRESHOLD_MS': 0})
+    def test_records_operation_path_and_organization(self):
+        """Test that slow statements are labelled with the operation, resolver path and organization"""
+        get_slow_query_log().clear()
+        self.post_query('query Projects { allProjects { name taskSet { title } } }')
+        records = self.records()
+        self.assertEqual([record['path'] for record in records], ['allProjects', 'allProjects.0.taskSet'])
+        for record in records:
+            self.assertEqual(record['operation'], 'Projects')
+            self.assertEqual(record['organization_id'], self.org.pk)
+            self.assertNotIn('plan', record)
+        self.assertIn('projects_task', records[1]['sql'])
+
+    @override_settings(GRAPHQL_SLOW_QUERIES={'ENABLED': True, 'THRESHOLD_MS': 0, 'EXPLAIN': True})
+    def test_explain(self):
+        """Test that the plan of each slow statement is captured"""
+        get_slow_query_log().clear()
+        self.post_query('query Projects { allProjects { name } }')
+        [record] = self.records()
+        self.assertTrue(record['plan'])
+
+    @override_settings(GRAPHQL_SLOW_QUERIES={'ENABLED': True, 'THRESHOLD_MS': 60000})
+    def test_threshold(self):
+        """Test that statements below the threshold are not recorded"""
+        get_slow_query_log().clear()
+        self.post_query('query Projects { allProjects { name } }')
+        self.assertEqual(self.records(), [])
+
+    def test_ring_buffer_is_bounded(self):
+        """Test that the oldest records are overwritten once SIZE is reached"""
+        slow_query_log = SlowQueryLog(threshold_ms=0, size=3)
+        slow_query_log.clear()
+        for n in range(5):
+            slow_query_log.observe('default', f'SELECT {n}', (), False, 1)
+        slow_query_log.flush()
+        self.assertEqual([record['sql'] for record in slow_query_log.records()],
+                         ['SELECT 2', 'SELECT 3', 'SELECT 4'])
+        slow_query_log.clear()
+
+    def test_long_statement_is_explained_in_full(self):
+        """Test that EXPLAIN runs on the full statement and only the stored SQL is truncated"""
+        slow_query_log = SlowQueryLog(threshold_ms=0, explain=True, max_sql_length=20)
+        slow_query_log.clear()
+        slow_query_log.observe('default', 'SELECT ' + ', '.join(['%s'] * 50), list(range(50)), False, 1)
+        slow_query_log.flush()
+        [record] = slow_query_log.records()
+        self.assertEqual(len(record['sql']), 20)
+        self.assertTrue(record['plan'])
+        slow_query_log.clear()
+
+    def test_failed_explain_still_records(self):
+        """Test that a statement EXPLAIN fails on is recorded without a plan"""
+        slow_query_log = SlowQueryLog(threshold_ms=0, explain=True)
+        slow_query_log.clear()
+        with self.assertLogs('projects.slow_queries', 'WARNING'):
+            slow_query_log.observe('default', 'SELECT * FROM missing_table', (), False, 1)
+            slow_query_log.flush()
+        [record] = slow_query_log.records()
+        self.assertEqual(record['sql'], 'SELECT * FROM missing_table')
+        self.assertNotIn('plan', record)
+        slow_query_log.clear()
+
+    def test_disabled_by_default(self):
+        """Test that the slow query log is off unless enabled"""
+        with override_settings(GRAPHQL_SLOW_QUERIES={}):
+            self.assertIsNone(get_slow_query_log())
+
+    def test_command(self):
+        """Test that the management command prints the records as JSON"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                **settings.CACHES,
+                'slow_queries': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+                },
+            },
+            GRAPHQL_SLOW_QUERIES={'ENABLED': True, 'THRESHOLD_MS': 0, 'CACHE': 'slow_queries'},
+        ):
+            self.post_query('query Projects { allProjects { name } }')
+            out = StringIO()
+            call_command('slow_queries', '--json', '--clear', stdout=out, stderr=StringIO())
+            records = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertIn('Projects', [record['operation'] for record in records])
+            self.assertEqual(get_slow_query_log().records(), [])
+
+    @override_settings(GRAPHQL_SLOW_QUERIES={'ENABLED': True})
+    def test_command_refuses_local_memory_cache(self):
+        """Test that the command does not report an empty log from its own local-memory cache"""
+        with self.assertRaisesMessage(CommandError, 'set GRAPHQL_SLOW_QUERIES'):
+            call_command('slow_queries', stdout=StringIO(), stderr=StringIO())
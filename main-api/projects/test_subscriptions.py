@@ -0,0 +1,210 @@
+import asyncio
+import json
+import threading
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from unittest import mock
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from graphene.test import Client
+from .broadcast import InMemoryBackend, get_broadcaster, project_channel, task_channel
+from .models import Organization, Project, Task
+from .org_cache import reset_organization_cache
+from .schema import schema
+from .tokens import issue_token
+from .websockets import PROTOCOL, GraphQLWebSocketApplication, execute
+
+TASK_CHANGED = '''
+subscription TaskChanged($projectId: String!) {
+    taskChanged(projectId: $projectId) { action task { title status version project { name } } }
+}
+'''
+
+
+class InMemoryBackendTest(TestCase):
+    async def test_publish_from_another_thread(self):
+        """Test that events published from worker threads reach subscribers on the event loop"""
+        backend = InMemoryBackend()
+        events = backend.subscribe('channel')
+        received = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+
+        thread = threading.Thread(target=backend.publish, args=('channel', {'n': 1}))
+        thread.start()
+        thread.join()
+        backend.publish('other', {'n': 2})
+        self.assertEqual(await asyncio.wait_for(received, 1), {'n': 1})
+        await events.aclose()
+        self.assertEqual(backend._subscribers, {})
+
+    async def test_slow_subscribers_drop_events(self):
+        """Test that a full subscriber queue drops new events instead of growing"""
+        backend = InMemoryBackend(queue_size=1)
+        events = backend.subscribe('channel')
+        received = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        for n in range(3):
+            backend.publish('channel', {'n': n})
+        # The first event filled the queue before the subscriber could take it
+        self.assertEqual(await asyncio.wait_for(received, 1), {'n': 0})
+        backend.publish('channel', {'n': 3})
+        self.assertEqual(await asyncio.wait_for(events.__anext__(), 1), {'n': 3})
+        await events.aclose()
+
+
+# Committed data: each connection runs its sync work in a thread of its own,
+# outside the test transaction
+class SubscriptionTest(TransactionTestCase):
+    def setUp(self):
+        reset_organization_cache()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+        self.project = Project.objects.create(organization=self.org, name='Test Project')
+        self.other_project = Project.objects.create(organization=self.org, name='Other Project')
+        self.task = Task.objects.create(project=self.project, title='Task', status='TODO')
+
+    async def connect(self, api_key=None):
+        communicator = ApplicationCommunicator(GraphQLWebSocketApplication(schema), {
+            'type': 'websocket', 'path': '/graphql/', 'subprotocols': [PROTOCOL],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['subprotocol'], PROTOCOL)
+        await self.send(communicator, {
+            'type': 'connection_init', 'payload': {'X-API-Key': api_key or self.org.api_key},
+        })
+        return communicator
+
+    async def send(self, communicator, message):
+        await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def receive(self, communicator):
+        output = await communicator.receive_output(1)
+        self.assertEqual(output['type'], 'websocket.send', output)
+        return json.loads(output['text'])
+
+    async def subscribe(self, communicator, query, channel, **variables):
+        await self.send(communicator, {
+            'id': '1', 'type': 'subscribe', 'payload': {'query': query, 'variables': variables},
+        })
+        # Wait until the subscription is listening before anything is published
+        broadcaster = get_broadcaster()
+        for _ in range(100):
+            if channel in broadcaster._subscribers:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f'Nothing subscribed to {channel}')
+
+    def mutate(self, query, **variables):
+        request = RequestFactory().post('/graphql/')
+        request.organization = self.org
+        result = Client(schema).execute(query, context_value=request, variable_values=variables)
+        self.assertNotIn('errors', result)
+        return result
+
+    async def test_task_changed(self):
+        """Test that task mutations reach the subscribers of that project only"""
+        communicator = await self.connect()
+        self.assertEqual(await self.receive(communicator), {'type': 'connection_ack'})
+        await self.subscribe(
+            communicator, TASK_CHANGED, task_channel(self.org.pk, self.project.pk),
+            projectId=str(self.project.pk),
+        )
+
+        await sync_to_async(self.mutate)('''
+        mutation Create($projectId: String!) { createTask(projectId: $projectId, title: "Elsewhere") { task { id } } }
+        ''', projectId=str(self.other_project.pk))
+        await sync_to_async(self.mutate)('''
+        mutation Status($taskId: String!) { updateTaskStatus(taskId: $taskId, status: "DONE") { task { id } } }
+        ''', taskId=str(self.task.pk))
+
+        message = await self.receive(communicator)
+        self.assertEqual(message['id'], '1')
+        self.assertEqual(message['type'], 'next')
+        self.assertEqual(message['payload']['data']['taskChanged'], {
+            'action': 'UPDATED',
+            'task': {'title': 'Task', 'status': 'DONE', 'version': 2, 'project': {'name': 'Test Project'}},
+        })
+
+        await self.send(communicator, {'id': '1', 'type': 'complete'})
+        await self.send(communicator, {'type': 'ping'})
+        self.assertEqual(await self.receive(communicator), {'type': 'pong'})
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+
+    async def test_project_changed(self):
+        """Test that signed tokens can subscribe to the organization's project events"""
+        token = await sync_to_async(issue_token)(self.org)
+        communicator = await self.connect(token)
+        self.assertEqual(await self.receive(communicator), {'type': 'connection_ack'})
+        await self.subscribe(
+            communicator, 'subscription { projectChanged { action project { name taskCount } } }',
+            project_channel(self.org.pk),
+        )
+        await sync_to_async(self.mutate)('mutation { createProject(name: "New", description: "") { project { id } } }')
+        message = await self.receive(communicator)
+        self.assertEqual(message['payload']['data']['projectChanged'], {
+            'action': 'CREATED', 'project': {'name': 'New', 'taskCount': 0},
+        })
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+
+    async def test_other_organizations_projects(self):
+        """Test that another organization's project cannot be subscribed to"""
+        other_org = await Organization.objects.acreate(
+            name='Other Organization', contact_email='other@example.com', password='testpassword123'
+        )
+        communicator = await self.connect(other_org.api_key)
+        self.assertEqual(await self.receive(communicator), {'type': 'connection_ack'})
+        await self.send(communicator, {'id': '1', 'type': 'subscribe', 'payload': {
+            'query': TASK_CHANGED, 'variables': {'projectId': str(self.project.pk)},
+        }})
+        message = await self.receive(communicator)
+        self.assertEqual(message['type'], 'error')
+        self.assertEqual(message['payload'][0]['message'], f'Project with ID {self.project.pk} does not exist')
+
+    async def test_connections_run_sync_work_in_their_own_threads(self):
+        """Test that mutations of different connections do not share a worker thread"""
+        threads = []
+
+        def recording_execute(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return execute(*args, **kwargs)
+
+        communicators = [await self.connect(), await self.connect()]
+        with mock.patch('projects.websockets.execute', side_effect=recording_execute):
+            for communicator in communicators:
+                self.assertEqual(await self.receive(communicator), {'type': 'connection_ack'})
+                await self.send(communicator, {'id': '1', 'type': 'subscribe', 'payload': {
+                    'query': 'mutation { createProject(name: "New", description: "") { project { name } } }',
+                }})
+                message = await self.receive(communicator)
+                self.assertEqual(message['payload']['data']['createProject'], {'project': {'name': 'New'}})
+        self.assertEqual(len(set(threads)), 2)
+        self.assertNotIn(threading.get_ident(), threads)
+        for communicator in communicators:
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+
+    async def test_authentication(self):
+        """Test that connections are closed without a valid key, or before connection_init"""
+        communicator = await self.connect('not-a-key')
+        self.assertEqual((await communicator.receive_output(1))['code'], 4403)
+
+        communicator = ApplicationCommunicator(GraphQLWebSocketApplication(schema), {
+            'type': 'websocket', 'path': '/graphql/', 'subprotocols': [PROTOCOL],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        await communicator.receive_output(1)
+        await self.send(communicator, {'id': '1', 'type': 'subscribe', 'payload': {'query': TASK_CHANGED}})
+        self.assertEqual((await communicator.receive_output(1))['code'], 4401)
+
+    def test_not_over_http(self):
+        """Test that subscriptions sent to the HTTP endpoint are rejected"""
+        from django.test import Client as HttpClient
+        response = HttpClient().post(
+            '/graphql/', data=json.dumps({'query': 'subscription { projectChanged { action } }'}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+        )
+        self.assertEqual(response.json()['errors'][0]['message'], 'Subscriptions are only served over WebSockets')
@@ -0,0 +1,84 @@
+import json
+from django.test import TestCase, Client
+from .models import Organization
+from .tokens import issue_token, verify_token
+
+
+class OrganizationTokenTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def post_query(self, query, api_key=None):
+        headers = {'HTTP_X_API_KEY': api_key} if api_key else {}
+        return Client().post(
+            '/graphql/',
+            data=json.dumps({'query': query}),
+            content_type='application/json',
+            **headers,
+        )
+
+    def test_login_issues_token(self):
+        """Test that loginOrganization returns a signed token next to the api key"""
+        response = self.post_query('''
+        mutation {
+            loginOrganization(email: "test@example.com", password: "testpassword123") {
+                apiKey
+                token
+            }
+        }
+        ''')
+        payload = response.json()['data']['loginOrganization']
+        self.assertEqual(payload['apiKey'], self.org.api_key)
+        self.assertEqual(verify_token(payload['token']), (self.org.pk, 1))
+
+    def test_token_is_checked_against_the_cached_organization(self):
+        """Test that the key version of a token is checked through the organization cache"""
+        token = issue_token(self.org)
+        self.assertEqual(self.post_query('{ __typename }', token).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.post_query('{ __typename }', token)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.post_query('{ organization { name } }', token)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+    def test_tampered_token_is_rejected(self):
+        """Test that a token with a forged organization id is rejected"""
+        other = Organization.objects.create(
+            name='Other Organization',
+            contact_email='other@example.com',
+            password='testpassword123'
+        )
+        token = issue_token(self.org).replace(f'org_{self.org.pk}.', f'org_{other.pk}.')
+        self.assertEqual(self.post_query('{ __typename }', token).status_code, 401)
+
+    def test_revoked_token_is_rejected(self):
+        """Test that bumping the key version revokes previously issued tokens"""
+        token = issue_token(self.org)
+        self.assertEqual(self.post_query('{ organization { name } }', token).status_code, 200)
+        self.org.revoke_tokens()
+        response = self.post_query('{ organization { name } }', token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['errors'][0]['message'], 'API token has been revoked')
+
+        response = self.post_query('{ organization { name } }', issue_token(self.org))
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+    def test_revoked_token_cannot_run_operations_that_ignore_the_organization(self):
+        """Test that a revoked token is rejected even if no resolver reads the organization"""
+        token = issue_token(self.org)
+        self.org.revoke_tokens()
+        response = self.post_query('''
+        mutation {
+            createOrganization(name: "Created", contactEmail: "created@example.com") {
+                organization { name }
+            }
+        }
+        ''', token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['errors'][0]['message'], 'API token has been revoked')
+        self.assertFalse(Organization.objects.filter(name='Created').exists())
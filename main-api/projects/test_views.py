@@ -0,0 +1,132 @@
+import json
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from .documents import DocumentCache, get_document_cache, reset_document_cache
+from .models import Organization
+from .schema import schema
+
+
+class OrganizationGraphQLViewTest(TestCase):
+    def setUp(self):
+        reset_document_cache()
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def post_query(self, query, api_key=None, **payload):
+        headers = {'HTTP_X_API_KEY': api_key} if api_key else {}
+        return Client().post(
+            '/graphql/',
+            data=json.dumps({'query': query, **payload}),
+            content_type='application/json',
+            **headers,
+        )
+
+    def test_document_is_parsed_once(self):
+        """Test that the view reuses the document parsed by the middleware"""
+        with mock.patch('projects.views.parse', side_effect=AssertionError('parsed twice')):
+            response = self.post_query('{ organization { name } }', self.org.api_key)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+
+    def test_auth_exemption_uses_root_fields(self):
+        """Test that mentioning an auth mutation elsewhere in the query does not skip auth"""
+        response = self.post_query('query loginOrganization { allProjects { name } }')
+        self.assertEqual(response.status_code, 401)
+
+        response = self.post_query('''
+        mutation {
+            loginOrganization(email: "test@example.com", password: "testpassword123") { success }
+            createProject(name: "Sneaky") { project { id } }
+        }
+        ''')
+        self.assertEqual(response.status_code, 401)
+
+        response = self.post_query('''
+        mutation Login {
+            loginOrganization(email: "test@example.com", password: "testpassword123") { success }
+        }
+        ''')
+        self.assertTrue(response.json()['data']['loginOrganization']['success'])
+
+    def test_syntax_errors_are_reported(self):
+        """Test that an unparsable query still gets a GraphQL error response"""
+        response = self.post_query('{ organization {', self.org.api_key)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Syntax Error', response.json()['errors'][0]['message'])
+
+    def test_repeat_documents_skip_parsing_and_validation(self):
+        """Test that a repeated query is served from the document cache"""
+        self.post_query('{ organization { name } }', self.org.api_key)
+        with mock.patch('projects.documents.parse', side_effect=AssertionError('parsed again')), \
+                mock.patch('projects.documents.validate', side_effect=AssertionError('validated again')):
+            response = self.post_query('{ organization { name } }', self.org.api_key)
+        self.assertEqual(response.json()['data']['organization']['name'], 'Test Organization')
+        stats = get_document_cache().stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_validation_errors_are_cached(self):
+        """Test that an invalid document keeps returning its validation errors"""
+        for _ in range(2):
+            response = self.post_query('{ doesNotExist }', self.org.api_key)
+            self.assertIn("Cannot query field 'doesNotExist'", response.json()['errors'][0]['message'])
+        self.assertEqual(get_document_cache().stats()['hits'], 1)
+
+
+@override_settings(GRAPHQL_DEBUG={'TOKEN': 'debug-secret'})
+class DebugMiddlewareTest(TestCase):
+    QUERY = '{ allProjects { name } _debug { sql { rawSql } } }'
+
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name='Test Organization',
+            contact_email='test@example.com',
+            password='testpassword123'
+        )
+
+    def post_query(self, **headers):
+        return Client().post(
+            '/graphql/', data=json.dumps({'query': self.QUERY}), content_type='application/json',
+            HTTP_X_API_KEY=self.org.api_key, **headers,
+        ).json()['data']
+
+    def test_debug_is_off_by_default(self):
+        """Test that requests without the debug header are not instrumented"""
+        with mock.patch('projects.debug.DjangoDebugMiddleware', side_effect=AssertionError('installed')):
+            self.assertIsNone(self.post_query()['_debug'])
+            self.assertIsNone(self.post_query(HTTP_X_GRAPHQL_DEBUG='wrong-secret')['_debug'])
+
+    def test_debug_header_records_sql(self):
+        """Test that the debug header with the configured token records the request's SQL"""
+        data = self.post_query(HTTP_X_GRAPHQL_DEBUG='debug-secret')
+        self.assertEqual(data['allProjects'], [])
+        self.assertIn('projects_project', data['_debug']['sql'][0]['rawSql'])
+        self.assertFalse(hasattr(connection, '_graphene_cursor'))
+
+    def test_cursor_is_unwrapped_without_debug_field(self):
+        """Test that a debug request not selecting _debug stops recording afterwards"""
+        Client().post(
+            '/graphql/', data=json.dumps({'query': '{ allProjects { name } }'}),
+            content_type='application/json', HTTP_X_API_KEY=self.org.api_key,
+            HTTP_X_GRAPHQL_DEBUG='debug-secret',
+        )
+        self.assertFalse(hasattr(connection, '_graphene_cursor'))
+
+
+class DocumentCacheTest(TestCase):
+    def test_least_recently_used_document_is_evicted(self):
+        """Test that the cache stays within its configured size"""
+        document_cache = DocumentCache(schema, max_size=2)
+        document_cache.get('{ organization { id } }')
+        document_cache.get('{ allProjects { id } }')
+        document_cache.get('{ organization { id } }')
+        document_cache.get('{ organization { name } }')
+        stats = document_cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        document_cache.get('{ organization { id } }')
+        self.assertEqual(document_cache.stats()['hits'], 2)
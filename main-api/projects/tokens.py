@@ -0,0 +1,33 @@
+from django.core import signing
+
+# Distinguishes signed tokens from the plain UUID api_key in the X-API-Key header
+TOKEN_PREFIX = 'org_'
+
+_signer = signing.Signer(salt='projects.organization-token')
+
+
+def issue_token(organization):
+    """Return a signed token carrying the organization id and its current key version."""
+    return TOKEN_PREFIX + _signer.sign(f"{organization.pk}.{organization.key_version}")
+
+
+def is_token(api_key):
+    return api_key.startswith(TOKEN_PREFIX)
+
+
+def verify_token(token):
+    """
+    Check the token signature without touching the database.
+
+    Returns (organization_id, key_version); raises signing.BadSignature if the
+    token was not issued by this deployment.
+    """
+    if not is_token(token):
+        raise signing.BadSignature("Not an organization token")
+    payload = _signer.unsign(token[len(TOKEN_PREFIX):])
+    try:
+        organization_id, key_version = (int(part) for part in payload.split('.'))
+    except ValueError:
+        raise signing.BadSignature("Malformed organization token")
+    return organization_id, key_version
+
@@ -1,3 +1,395 @@
-from django.shortcuts import render
+import inspect
+from contextlib import nullcontext
+from time import perf_counter
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.db import connection, transaction
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound,
+    HttpResponseNotModified,
+)
+from django.utils.cache import patch_vary_headers
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, validate,
+)
+from .debug import debug_requested, get_debug_middleware, stop_debug
+from .documents import ParsedDocument, get_document_cache
+from .metrics import get_metrics
+from .persisted import PersistedQueryError, PersistedQueryNotFound, get_persisted_query_store
+from .profiling import profile_operation, profile_requested
+from .response_cache import etag_matches, get_response_cache
+from .slow_queries import get_slow_query_log, resolver_path_middleware, track_slow_queries
 
-# Create your views here.
+
+SUBSCRIPTIONS_OVER_HTTP = "Subscriptions are only served over WebSockets"
+
+
+def get_operation_name(operation_ast, operation_name=None):
+    if operation_name is None and operation_ast is not None and operation_ast.name is not None:
+        return operation_ast.name.value
+    return operation_name
+
+
+class NotModified(Exception):
+    """Raised when the client's If-None-Match already matches the response's ETag."""
+
+
+def persisted_query_http_error(error):
+    if isinstance(error, PersistedQueryNotFound):
+        return HttpError(HttpResponse(), str(error))
+    return HttpError(HttpResponseBadRequest(), str(error))
+
+
+class OrganizationGraphQLView(GraphQLView):
+    """
+    GraphQLView that reuses the body and document already parsed by
+    OrganizationAuthMiddleware instead of decoding and parsing them again.
+    Documents come from the shared DocumentCache, so repeated queries also
+    skip validation. Read queries are answered from the ResponseCache when it
+    is enabled, and get an ETag so an unchanged result is answered with 304 Not
+    Modified without running any resolver. DjangoDebugMiddleware and the
+    profiler are only used for requests that ask for them (see projects.debug
+    and projects.profiling).
+    """
+
+    def parse_body(self, request):
+        payload = getattr(request, 'graphql_payload', None)
+        if payload is not None and not self.batch:
+            return payload
+        return super().parse_body(request)
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        # POST bodies are resolved by the middleware; GET requests are resolved here
+        persisted_queries = get_persisted_query_store()
+        if persisted_queries is not None and getattr(request, 'graphql_payload', None) is None:
+            extensions = request.GET.get('extensions') or data.get('extensions')
+            try:
+                query, _ = persisted_queries.resolve(query, extensions)
+            except (PersistedQueryNotFound, PersistedQueryError) as e:
+                raise persisted_query_http_error(e)
+        return query, variables, operation_name, id
+
+    def get_document(self, request, query):
+        document = getattr(request, 'graphql_document', None)
+        if document is not None and getattr(request, 'graphql_query', None) == query:
+            return document
+        document_cache = get_document_cache()
+        if document_cache.schema is self.schema:
+            return document_cache.get(query)
+        document = parse(query)
+        return ParsedDocument(document, tuple(validate(self.schema.graphql_schema, document)))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except NotModified:
+            response = HttpResponseNotModified()
+        return self.add_etag(request, response)
+
+    def add_etag(self, request, response):
+        etag = getattr(request, 'graphql_etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Revalidate on every use, and never share responses between API keys
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['X-API-Key'])
+        return response
+
+    def store_result(self, request, response_cache, cache_key, result):
+        if not cache_key:
+            return
+        if result.errors:
+            request.graphql_etag = None
+        else:
+            response_cache.set(cache_key, result.data)
+
+    def get_middleware(self, request):
+        middleware = [*(super().get_middleware(request) or []), *get_debug_middleware(request)]
+        metrics = get_metrics()
+        if metrics is not None:
+            middleware.append(metrics.middleware)
+        if get_slow_query_log() is not None:
+            middleware.append(resolver_path_middleware)
+        return middleware
+
+    def track_slow_queries(self, request, operation_ast, operation_name):
+        # Labels the statements the slow query log records during the operation
+        if get_slow_query_log() is None:
+            return nullcontext()
+        return track_slow_queries(
+            get_operation_name(operation_ast, operation_name), getattr(request, 'organization_id', None)
+        )
+
+    def track_operation(self, request, operation_ast, operation_name, record_sql=True):
+        """Context manager recording the operation's metrics; yields a callback for its result."""
+        metrics = get_metrics()
+        if metrics is None:
+            return nullcontext(lambda result: None)
+        operation_type = operation_ast.operation.value if operation_ast is not None else 'unknown'
+        return metrics.track_operation(
+            request, operation_type, get_operation_name(operation_ast, operation_name), record_sql
+        )
+
+    def record_cached(self, request, operation_ast, operation_name, cached, started):
+        # Operations answered from the response cache never reach track_operation()
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.record_cached(
+                request, operation_ast.operation.value, get_operation_name(operation_ast, operation_name),
+                cached, perf_counter() - started,
+            )
+
+    def should_profile(self, request):
+        # Decided once per request, since sampling is random
+        if not hasattr(request, 'graphql_profile'):
+            request.graphql_profile = profile_requested(request)
+        return request.graphql_profile
+
+    def profile_operation(self, request, operation_ast, operation_name):
+        if not self.should_profile(request):
+            return nullcontext()
+        return profile_operation(get_operation_name(operation_ast, operation_name))
+
+    def get_execute_options(self, request, variables, operation_name):
+        options = {
+            "root_value": self.get_root_value(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "context_value": self.get_context(request),
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            options["execution_context_class"] = self.execution_context_class
+        return options
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        try:
+            document, validation_errors = self.get_document(request, query)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if request.method.lower() == "get":
+            if operation_ast and operation_ast.operation != OperationType.QUERY:
+                if show_graphiql:
+                    return None
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["POST"],
+                        "Can only perform a {} operation from a POST request.".format(
+                            operation_ast.operation.value
+                        ),
+                    )
+                )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=list(validation_errors))
+        if operation_ast is not None and operation_ast.operation == OperationType.SUBSCRIPTION:
+            return ExecutionResult(errors=[GraphQLError(SUBSCRIPTIONS_OVER_HTTP)])
+
+        response_cache = get_response_cache()
+        cache_key = None
+        is_query = operation_ast is not None and operation_ast.operation == OperationType.QUERY
+        # Debug and profiled requests always execute
+        if (
+            response_cache is not None and is_query
+            and not debug_requested(request) and not self.should_profile(request)
+        ):
+            started = perf_counter()
+            cache_key = response_cache.get_key(request, query, variables, operation_name)
+            if cache_key:
+                request.graphql_etag = response_cache.get_etag(cache_key)
+                if etag_matches(request, request.graphql_etag):
+                    self.record_cached(request, operation_ast, operation_name, 'not_modified', started)
+                    raise NotModified()
+                data = response_cache.get(cache_key)
+                if data is not None:
+                    self.record_cached(request, operation_ast, operation_name, 'response', started)
+                    return ExecutionResult(data=data)
+
+        try:
+            with self.track_operation(request, operation_ast, operation_name) as record_result, \
+                    self.track_slow_queries(request, operation_ast, operation_name), \
+                    self.profile_operation(request, operation_ast, operation_name):
+                options = self.get_execute_options(request, variables, operation_name)
+
+                if (
+                    operation_ast
+                    and operation_ast.operation == OperationType.MUTATION
+                    and (
+                        graphene_settings.ATOMIC_MUTATIONS is True
+                        or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                    )
+                ):
+                    with transaction.atomic():
+                        result = execute(self.schema.graphql_schema, document, **options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                    record_result(result)
+                    return result
+
+                result = execute(self.schema.graphql_schema, document, **options)
+                record_result(result)
+            self.store_result(request, response_cache, cache_key, result)
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        finally:
+            stop_debug(request)
+
+
+class AsyncOrganizationGraphQLView(OrganizationGraphQLView):
+    """
+    OrganizationGraphQLView for the ASGI handler.
+
+    Queries execute on the event loop: resolvers get an async LoaderRegistry,
+    fetch rows with the async ORM and return awaitables, so sibling fields are
+    resolved concurrently and a slow client or query does not hold a worker
+    thread. Mutations keep running synchronously in a worker thread because
+    they rely on transaction.atomic and select_for_update. GraphiQL and
+    batched requests are also delegated to the synchronous view.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        markcoroutinefunction(view)
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method.lower() not in ("get", "post") or self.batch:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            query, variables, operation_name, _ = await self.aget_graphql_params(request, data)
+            try:
+                execution_result = await self.aexecute_graphql_request(
+                    request, data, query, variables, operation_name
+                )
+            except NotModified:
+                return self.add_etag(request, HttpResponseNotModified())
+
+            status_code = 200
+            response = {}
+            if execution_result.errors:
+                response["errors"] = [self.format_error(e) for e in execution_result.errors]
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            return self.add_etag(request, HttpResponse(
+                status=status_code,
+                content=self.json_encode(request, response),
+                content_type="application/json",
+            ))
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+            return response
+
+    async def aget_graphql_params(self, request, data):
+        # get_graphql_params() with the persisted query store's async cache calls
+        query, variables, operation_name, id = GraphQLView.get_graphql_params(request, data)
+        persisted_queries = get_persisted_query_store()
+        if persisted_queries is not None and getattr(request, 'graphql_payload', None) is None:
+            extensions = request.GET.get('extensions') or data.get('extensions')
+            try:
+                query, _ = await persisted_queries.aresolve(query, extensions)
+            except (PersistedQueryNotFound, PersistedQueryError) as e:
+                raise persisted_query_http_error(e)
+        return query, variables, operation_name, id
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        if not query:
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        try:
+            document, validation_errors = self.get_document(request, query)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        # DjangoDebugMiddleware records the cursor of the thread running the
+        # queries and cProfile the calls of one thread, so debug and profiled
+        # requests run synchronously too
+        if (
+            operation_ast is None
+            or operation_ast.operation != OperationType.QUERY
+            or debug_requested(request)
+            or self.should_profile(request)
+        ):
+            return await sync_to_async(self.execute_graphql_request)(
+                request, data, query, variables, operation_name
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=list(validation_errors))
+
+        response_cache = get_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            started = perf_counter()
+            cache_key = await response_cache.aget_key(request, query, variables, operation_name)
+            if cache_key:
+                request.graphql_etag = response_cache.get_etag(cache_key)
+                if etag_matches(request, request.graphql_etag):
+                    self.record_cached(request, operation_ast, operation_name, 'not_modified', started)
+                    raise NotModified()
+                data = await response_cache.aget(cache_key)
+                if data is not None:
+                    self.record_cached(request, operation_ast, operation_name, 'response', started)
+                    return ExecutionResult(data=data)
+
+        try:
+            # Read by get_loaders() to hand out async loaders for this request
+            request.graphql_async = True
+            # The async ORM runs queries in another thread, out of reach of
+            # the execute_wrapper that counts them
+            with self.track_operation(request, operation_ast, operation_name, record_sql=False) as record_result, \
+                    self.track_slow_queries(request, operation_ast, operation_name):
+                result = execute(
+                    self.schema.graphql_schema, document,
+                    **self.get_execute_options(request, variables, operation_name)
+                )
+                if inspect.isawaitable(result):
+                    result = await result
+                record_result(result)
+            if cache_key and result.errors:
+                request.graphql_etag = None
+            elif cache_key:
+                await response_cache.aset(cache_key, result.data)
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def metrics_view(request):
+    """Operation, field and SQL metrics of this process in the Prometheus text format."""
+    metrics = get_metrics()
+    if metrics is None:
+        return HttpResponseNotFound()
+    if not metrics.check_token(request):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,243 @@
+import asyncio
+import inspect
+import json
+import logging
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core import signing
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, subscribe
+from .documents import get_document_cache
+from .org_cache import get_organization_cache
+from .tokens import is_token, verify_token
+
+logger = logging.getLogger(__name__)
+
+# https://github.com/enisdenjo/graphql-ws/blob/master/PROTOCOL.md
+PROTOCOL = 'graphql-transport-ws'
+
+
+class OperationContext:
+    """Stands in for the HttpRequest as info.context of operations run over a WebSocket."""
+
+    def __init__(self, organization, graphql_async):
+        self.organization = organization
+        self.organization_id = organization.pk
+        self.graphql_async = graphql_async
+
+
+class CloseConnection(Exception):
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+class GraphQLWebSocketApplication:
+    """
+    ASGI application serving the schema over WebSockets with the
+    graphql-transport-ws protocol, as spoken by the graphql-ws and Apollo
+    Client libraries.
+
+    Browsers cannot set headers on a WebSocket, so the API key or token is sent
+    as {"X-API-Key": ...} in the connection_init payload. Subscriptions receive
+    the events published by the mutations (see projects.broadcast); queries run
+    on the event loop like AsyncOrganizationGraphQLView, and mutations in a
+    worker thread of the connection.
+    """
+
+    def __init__(self, schema, path='/graphql/', connection_init_timeout=10):
+        self.schema = schema
+        self.path = path
+        self.connection_init_timeout = connection_init_timeout
+
+    async def __call__(self, scope, receive, send):
+        # Like Django's ASGIHandler does per request: the connection's sync work
+        # (ORM calls, mutations, password checks) gets a thread of its own
+        # instead of queueing behind every other socket on the shared one
+        async with ThreadSensitiveContext():
+            await GraphQLWebSocketConnection(self, scope, receive, send).run()
+
+
+class GraphQLWebSocketConnection:
+    def __init__(self, application, scope, receive, send):
+        self.application = application
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.organization = None
+        self.init_received = False
+        self.operations = {}
+        self.closed = False
+
+    async def run(self):
+        event = await self.receive()
+        if event['type'] != 'websocket.connect':
+            return
+        if self.scope['path'] != self.application.path:
+            await self.send({'type': 'websocket.close', 'code': 4404})
+            return
+        if PROTOCOL not in self.scope.get('subprotocols', ()):
+            await self.send({'type': 'websocket.close', 'code': 4406})
+            return
+        await self.send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+        timeout = asyncio.create_task(self.close_unless_initialized())
+        try:
+            while not self.closed:
+                event = await self.receive()
+                if event['type'] == 'websocket.disconnect':
+                    self.closed = True
+                    break
+                try:
+                    await self.handle(event.get('text') or event.get('bytes') or '')
+                except CloseConnection as e:
+                    await self.close(e.code, e.reason)
+        finally:
+            timeout.cancel()
+            for task in self.operations.values():
+                task.cancel()
+
+    async def close_unless_initialized(self):
+        await asyncio.sleep(self.application.connection_init_timeout)
+        if self.organization is None:
+            await self.close(4408, 'Connection initialisation timeout')
+
+    async def close(self, code, reason):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code, 'reason': reason})
+
+    async def send_message(self, message):
+        if not self.closed:
+            await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            raise CloseConnection(4400, 'Invalid message received')
+        if not isinstance(message, dict) or not isinstance(message.get('type'), str):
+            raise CloseConnection(4400, 'Invalid message received')
+
+        message_type = message['type']
+        if message_type == 'connection_init':
+            await self.initialize(message.get('payload') or {})
+        elif message_type == 'ping':
+            await self.send_message({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif message_type == 'subscribe':
+            if self.organization is None:
+                raise CloseConnection(4401, 'Unauthorized')
+            operation_id = message.get('id')
+            payload = message.get('payload')
+            if not isinstance(operation_id, str) or not isinstance(payload, dict):
+                raise CloseConnection(4400, 'Invalid message received')
+            if operation_id in self.operations:
+                raise CloseConnection(4409, f'Subscriber for {operation_id} already exists')
+            self.operations[operation_id] = asyncio.create_task(self.run_operation(operation_id, payload))
+        elif message_type == 'complete':
+            task = self.operations.pop(message.get('id'), None)
+            if task is not None:
+                task.cancel()
+        else:
+            raise CloseConnection(4400, f'Unexpected message type: {message_type}')
+
+    async def initialize(self, payload):
+        if self.init_received:
+            raise CloseConnection(4429, 'Too many initialisation requests')
+        self.init_received = True
+        api_key = payload.get('X-API-Key') if isinstance(payload, dict) else None
+        try:
+            self.organization = await self.authenticate(api_key)
+        except Exception as e:
+            logger.warning("WebSocket authentication failed: %s", e)
+            raise CloseConnection(4403, 'Forbidden')
+        await self.send_message({'type': 'connection_ack'})
+
+    async def authenticate(self, api_key):
+        if not isinstance(api_key, str) or not api_key:
+            raise Exception("API key is required")
+        if is_token(api_key):
+            try:
+                organization_id, key_version = verify_token(api_key)
+            except signing.BadSignature:
+                raise Exception("Invalid API key")
+            organization = await get_organization_cache().aget_organization_by_id(organization_id)
+            if organization is None:
+                raise Exception("Invalid API key")
+            # The connection outlives the check: revoking tokens later does not
+            # close connections that are already open
+            if organization.key_version != key_version:
+                raise Exception("API token has been revoked")
+            return organization
+        organization = await get_organization_cache().aget_organization(api_key)
+        if organization is None:
+            raise Exception("Invalid API key")
+        return organization
+
+    async def run_operation(self, operation_id, payload):
+        try:
+            query = payload.get('query')
+            if not isinstance(query, str) or not query:
+                await self.send_errors(operation_id, [GraphQLError("Must provide query string.")])
+                return
+            try:
+                document, validation_errors = get_document_cache().get(query)
+            except GraphQLError as e:
+                await self.send_errors(operation_id, [e])
+                return
+            if validation_errors:
+                await self.send_errors(operation_id, validation_errors)
+                return
+
+            operation_name = payload.get('operationName')
+            variables = payload.get('variables')
+            operation_ast = get_operation_ast(document, operation_name)
+            schema = self.application.schema.graphql_schema
+            if operation_ast is not None and operation_ast.operation == OperationType.SUBSCRIPTION:
+                results = await subscribe(
+                    schema, document, context_value=OperationContext(self.organization, True),
+                    variable_values=variables, operation_name=operation_name,
+                )
+                if isinstance(results, ExecutionResult):
+                    await self.send_errors(operation_id, results.errors)
+                    return
+                try:
+                    async for result in results:
+                        await self.send_result(operation_id, result)
+                finally:
+                    await results.aclose()
+            elif operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+                # Mutations rely on transaction.atomic and select_for_update
+                result = await sync_to_async(execute)(
+                    schema, document, context_value=OperationContext(self.organization, False),
+                    variable_values=variables, operation_name=operation_name,
+                )
+                await self.send_result(operation_id, result)
+            else:
+                result = execute(
+                    schema, document, context_value=OperationContext(self.organization, True),
+                    variable_values=variables, operation_name=operation_name,
+                )
+                if inspect.isawaitable(result):
+                    result = await result
+                await self.send_result(operation_id, result)
+
+            await self.send_message({'id': operation_id, 'type': 'complete'})
+        except asyncio.CancelledError:
+            # Completed by the client, or the connection is gone
+            raise
+        except Exception as e:
+            logger.error("WebSocket operation failed: %s", e)
+            await self.send_errors(operation_id, [GraphQLError(str(e))])
+        finally:
+            if self.operations.get(operation_id) is asyncio.current_task():
+                del self.operations[operation_id]
+
+    async def send_result(self, operation_id, result):
+        await self.send_message({'id': operation_id, 'type': 'next', 'payload': result.formatted})
+
+    async def send_errors(self, operation_id, errors):
+        await self.send_message({
+            'id': operation_id, 'type': 'error', 'payload': [error.formatted for error in errors],
+        })